@@ -3,10 +3,20 @@
 from .setup_agent import SetupAgent
 from .gameplay_agent import GameplayAgent
 from .prompt_loader import load_prompt_from_file, extract_system_prompt
+from .opener_pool import OpenerPool, get_opener_pool
+from .response_cache import ResponseCache, get_response_cache
+from .world_state import apply_world_update, empty_world_state, render_world_state
 
 __all__ = [
     "SetupAgent",
     "GameplayAgent", 
     "load_prompt_from_file",
-    "extract_system_prompt"
+    "extract_system_prompt",
+    "OpenerPool",
+    "get_opener_pool",
+    "ResponseCache",
+    "get_response_cache",
+    "apply_world_update",
+    "empty_world_state",
+    "render_world_state"
 ] 
\ No newline at end of file
@@ -10,6 +10,11 @@ from langgraph.types import Command
 import logging
 
 from .prompt_loader import load_prompt_from_file, extract_system_prompt
+from .llm_runner import run_llm
+from .world_state import WORLD_STATE_INSTRUCTION, render_world_state
+from ..config import settings
+from ..models import to_provider_messages
+from ..services.stream_pipeline import StreamContext
 
 logger = logging.getLogger(__name__)
 
@@ -37,19 +42,8 @@ class GameplayAgent:
             logger.error(f"Error loading Gameplay Agent prompt: {e}")
             self.system_prompt = "Du bist ein Gameplay Agent für TextRPG. Erstelle eine fesselnde interaktive Geschichte."
     
-    def process_message(self, messages: List[BaseMessage], state: Dict[str, Any]) -> str:
-        """
-        Verarbeitet Message mit LLM und Gameplay-Prompt
-        
-        Args:
-            messages: Message history
-            state: Current state with handoff_data etc.
-            
-        Returns:
-            Story/gameplay response as string
-        """
-        
-        # Bereite Context für LLM vor
+    def _build_llm_messages(self, messages: List[BaseMessage], state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Bereitet System-Prompt, Setup-Kontext, Spielwelt-Zustand und Message History für das LLM vor"""
         llm_messages = [{"role": "system", "content": self.system_prompt}]
         
         # Füge Setup-Kontext hinzu falls vorhanden
@@ -58,21 +52,45 @@ class GameplayAgent:
             setup_context = f"Setup-Kontext: {handoff_data['handoff_data']}"
             llm_messages.append({"role": "system", "content": setup_context})
         
-        # Füge Message History hinzu
-        for msg in messages[-10:]:  # Letzte 10 Messages
-            role = "user" if msg.type == "human" else "assistant"
-            llm_messages.append({"role": role, "content": msg.content})
+        # Spielwelt-Zustand als kompakter Block - ersetzt einen Teil der rohen Historie
+        history_limit = 10
+        if settings.world_state_enabled:
+            world_block = render_world_state(state.get("world_state"), state.get("chapter_count", 0))
+            if world_block:
+                history_limit = settings.world_state_history_messages
+            llm_messages.append({
+                "role": "system",
+                "content": f"{world_block}\n\n{WORLD_STATE_INSTRUCTION}" if world_block else WORLD_STATE_INSTRUCTION
+            })
         
-        # LLM-Aufruf für Story/Gameplay
-        response = self.llm.invoke(llm_messages)
+        # Füge Message History hinzu (Provider-Format pro Message ID gecacht)
+        llm_messages.extend(to_provider_messages(messages[-history_limit:]))
         
-        # WICHTIG: Extrahiere nur den content als String
-        if hasattr(response, 'content'):
-            content = str(response.content)
-        else:
-            content = str(response)
+        return llm_messages
+    
+    async def aprocess_message(
+        self,
+        messages: List[BaseMessage],
+        state: Dict[str, Any],
+        context: Optional[StreamContext] = None
+    ) -> str:
+        """
+        Verarbeitet Message mit LLM und Gameplay-Prompt
+        
+        Einziger Einstiegspunkt: die Antwort läuft immer durch die Generation
+        Pipeline, [ZUSTAND]-Block und Marker erreichen den Spieler nie.
+        
+        Args:
+            messages: Message history
+            state: Current state with handoff_data etc.
+            context: Stream-Kontext, in dem Marker und Zustands-Block landen
+            
+        Returns:
+            Story/gameplay response as string
+        """
+        content = await run_llm(self.llm, self._build_llm_messages(messages, state), self.name, context)
         
-        logger.info(f"Gameplay agent response generated: {content[:100]}...")
+        logger.debug("Gameplay agent response generated: %.100s", content)
         
         return content
     
@@ -0,0 +1,153 @@
+"""
+LLM Runner für TextRPG Agents
+Async LLM-Aufruf mit Concurrency-Limit, Timing (Queue-Wait, TTFT, Generation) und Usage Accounting
+
+Der Token-Stream läuft durch die gemeinsame Generation-Pipeline (Repetition Guard,
+Marker, Cleanup). Degenerierte Ausgaben (Schleifen, Wiederholung der vorigen Antwort)
+brechen den Call ab, er wird einmal mit frequency_penalty wiederholt - danach bleibt
+der saubere Anfang der Ausgabe oder eine Fallback-Antwort.
+"""
+
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from langchain_core.language_models import BaseChatModel
+import logging
+import time
+
+from ..config import settings
+from ..services.llm_limiter import get_llm_limiter
+from ..services.metrics import get_metrics_registry
+from ..services.stream_pipeline import DegenerateOutput, StreamContext, get_generation_pipeline
+from ..services.timing import get_turn_timer, record_stage
+from ..services.usage import get_token_reservation, record_llm_usage
+
+logger = logging.getLogger(__name__)
+
+
+def get_model_name(llm: BaseChatModel) -> str:
+    """Model-Name des LLM (für Metrik-Labels)"""
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+def _previous_response(llm_messages: List[Dict[str, Any]]) -> Optional[str]:
+    """Letzte Assistant-Antwort im Prompt (Vergleich für den Repetition Guard)"""
+    previous = next((m["content"] for m in reversed(llm_messages) if m["role"] == "assistant"), None)
+    return previous if isinstance(previous, str) else None
+
+
+async def _stream_llm(
+    llm: Any,
+    llm_messages: List[Dict[str, Any]],
+    model_name: str,
+    session_id: Optional[str],
+    context: StreamContext
+) -> Tuple[str, Optional[DegenerateOutput]]:
+    """
+    Ein gestreamter LLM-Call durch die Generation-Pipeline (Limiter-Slot, TTFT/Generation, Usage)
+
+    Returns:
+        (Response-Text nach der Pipeline, Abbruch durch den Repetition Guard oder None)
+    """
+    aggregated = None
+
+    async def tokens() -> AsyncIterator[str]:
+        nonlocal aggregated
+        first_token_at = None
+        stream = llm.astream(llm_messages)
+        try:
+            async for chunk in stream:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    record_stage("llm_ttft", first_token_at - start)
+                # Chunks addieren - der letzte Chunk trägt die Usage (stream_usage)
+                aggregated = chunk if aggregated is None else aggregated + chunk
+                if chunk.content:
+                    yield chunk.content if isinstance(chunk.content, str) else str(chunk.content)
+        finally:
+            # Abbruch schließt den Provider-Stream sofort (keine weiteren Tokens)
+            await stream.aclose()
+            record_stage("llm_generation", time.perf_counter() - (first_token_at or start))
+
+    pieces: List[str] = []
+    degenerate = None
+    async with get_llm_limiter().slot():
+        start = time.perf_counter()
+        try:
+            async with aclosing(get_generation_pipeline().run(tokens(), context)) as output:
+                async for piece in output:
+                    pieces.append(piece)
+        except DegenerateOutput as e:
+            degenerate = e
+
+    if aggregated is not None:
+        # Abgebrochene Streams haben keinen Usage-Block - record_llm_usage loggt das nur
+        record_llm_usage(model_name, aggregated, session_id)
+
+    return "".join(pieces), degenerate
+
+
+async def run_llm(
+    llm: BaseChatModel,
+    llm_messages: List[Dict[str, Any]],
+    agent_name: str,
+    context: Optional[StreamContext] = None
+) -> str:
+    """
+    Führt einen LLM-Call über astream aus, ohne den Event Loop zu blockieren
+
+    Args:
+        llm: Chat Model des Agents
+        llm_messages: Rollen-Messages (system/user/assistant)
+        agent_name: Agent-Name für Metrik-Labels
+        context: Stream-Kontext des Aufrufers (gesammelte Marker/Blöcke), None = eigener
+
+    Returns:
+        Vollständiger Response-Text (nach der Generation-Pipeline)
+    """
+    model_name = get_model_name(llm)
+    timer = get_turn_timer()
+    if timer is not None:
+        timer.agent = agent_name
+        timer.model = model_name
+    session_id = timer.session_id if timer else None
+
+    # Reserviertes Budget (spekulative Turns): Completion-Tokens hart begrenzen
+    reservation = get_token_reservation()
+    if reservation is not None:
+        llm = llm.bind(max_tokens=max(reservation.remaining, 1))
+    if context is None:
+        context = StreamContext(agent=agent_name)
+    context.previous = _previous_response(llm_messages)
+    content, degenerate = await _stream_llm(llm, llm_messages, model_name, session_id, context)
+    if context.markers:
+        logger.info("%s markers stripped from response: %s", agent_name, context.markers, extra={"session_id": session_id})
+    if degenerate is None:
+        return content
+
+    counter = get_metrics_registry().counter(
+        "textrpg_degenerate_generations_total",
+        "LLM generations aborted as degenerate by agent, reason (loop/repeat_previous) and action (retry/fallback)"
+    )
+    logger.warning(
+        "Degenerate %s output (%s) aborted after %d chars",
+        agent_name, degenerate.reason, len(degenerate.detector.text), extra={"session_id": session_id}
+    )
+
+    penalty = settings.repetition_retry_frequency_penalty
+    if penalty is not None and (reservation is None or reservation.remaining > 0):
+        counter.inc(labels={"agent": agent_name, "reason": degenerate.reason, "action": "retry"})
+        context.reset_results()
+        content, retry_degenerate = await _stream_llm(
+            llm.bind(frequency_penalty=penalty), llm_messages, model_name, session_id, context
+        )
+        if retry_degenerate is None:
+            return content
+        degenerate = retry_degenerate
+
+    counter.inc(labels={"agent": agent_name, "reason": degenerate.reason, "action": "fallback"})
+    # Sauberer Anfang der Ausgabe (ebenfalls durch die Pipeline), sofern lang genug - sonst Fallback
+    prefix = degenerate.detector.clean_prefix()
+    context.reset_results()
+    if len(prefix.split()) >= settings.repetition_min_shingles:
+        return await get_generation_pipeline().process(prefix, context, exclude={"repetition_guard"})
+    return settings.repetition_fallback_message
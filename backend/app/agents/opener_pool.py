@@ -0,0 +1,199 @@
+"""
+Opener Pool für den Setup Agent
+Vorab generierte Eröffnungsnachrichten für neue Sessions
+
+Der erste Turn jeder Session läuft mit praktisch identischem Kontext (Setup-Prompt
++ "Hi"). Der Pool hält einige fertige Antworten pro Prompt-Version und Model
+bereit und füllt sich im Hintergrund nach. Ändert sich der Prompt (Hash) oder das
+Model, werden die gehaltenen Opener verworfen. Generische Eröffnungen ("Hi",
+"Hallo", "Start", ...) werden direkt aus dem Pool bedient.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import logging
+import re
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Sequence, Tuple
+
+from .llm_runner import get_model_name
+from ..models import MessageRecord
+from ..services.metrics import get_metrics_registry
+from ..services.usage import capture_usage
+
+logger = logging.getLogger(__name__)
+
+# Erste Nachrichten, auf die der Setup Agent ohnehin gleich antwortet
+GENERIC_OPENINGS = frozenset({
+    "", "hi", "hallo", "hey", "hello", "moin", "servus", "hallöchen", "guten tag", "guten abend",
+    "start", "starten", "los", "los gehts", "los geht's", "lass uns anfangen", "neues spiel", "new game"
+})
+_PUNCTUATION = re.compile(r"[\s!.?,:;]+")
+
+# Eingabe, mit der die Opener generiert werden
+_POOL_PROMPT = "Hi"
+
+
+def is_generic_opening(message: str) -> bool:
+    """Ist die erste Nachricht eine generische Begrüßung?"""
+    return _PUNCTUATION.sub(" ", message).strip().casefold() in GENERIC_OPENINGS
+
+
+def pool_key(agent: Any) -> Tuple[str, str]:
+    """Prompt-Version (Hash des System-Prompts) und Model eines Agents"""
+    prompt_hash = hashlib.sha256(agent.system_prompt.encode("utf-8")).hexdigest()[:16]
+    return prompt_hash, get_model_name(agent.llm)
+
+
+class Opener:
+    """Vorab generierte Eröffnung inkl. Usage der Generierung (pro Model)"""
+
+    __slots__ = ("content", "usage_by_model")
+
+    def __init__(self, content: str, usage_by_model: Dict[str, Dict[str, Any]]):
+        self.content = content
+        self.usage_by_model = usage_by_model
+
+
+class OpenerPool:
+    """
+    Hintergrund-gefüllter Pool von Setup-Openern
+    """
+
+    def __init__(self, size: int = 4):
+        """
+        Args:
+            size: Ziel-Anzahl gehaltener Opener
+        """
+        self.size = size
+        self.key: Optional[Tuple[str, str]] = None
+        self.started = False
+        self._openers: Deque[Opener] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+
+        self.generated = 0
+        self.invalidations = 0
+
+        registry = get_metrics_registry()
+        self._requests_counter = registry.counter(
+            "textrpg_opener_pool_requests_total",
+            "First-turn opener requests by result (hit/miss/not_generic)"
+        )
+
+    def __len__(self) -> int:
+        return len(self._openers)
+
+    async def start(self, agent: Any) -> None:
+        """Aktiviert den Pool und startet die erste Befüllung"""
+        self.started = True
+        self.refill(agent)
+
+    async def stop(self) -> None:
+        """Deaktiviert den Pool und bricht eine laufende Befüllung ab"""
+        self.started = False
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            await asyncio.gather(self._refill_task, return_exceptions=True)
+            self._refill_task = None
+
+    def take(self, agent: Any, messages: Sequence[Any]) -> Optional[Opener]:
+        """
+        Opener für den ersten Turn einer Session
+
+        Args:
+            agent: Setup Agent (bestimmt Prompt-Version und Model)
+            messages: Bisherige Messages der Session (nur die erste User Message)
+
+        Returns:
+            Opener oder None (nicht erster Turn, nicht generisch oder Pool leer)
+        """
+        if not self.started or len(messages) != 1 or messages[0].type != "human":
+            return None
+        if not is_generic_opening(messages[0].content):
+            self._requests_counter.inc(labels={"result": "not_generic"})
+            return None
+
+        self.refill(agent)
+        opener = self._openers.popleft() if self._openers else None
+        self._requests_counter.inc(labels={"result": "hit" if opener else "miss"})
+        self.refill(agent)
+        return opener
+
+    def _check_key(self, agent: Any) -> None:
+        key = pool_key(agent)
+        if key != self.key:
+            if self._openers:
+                self.invalidations += 1
+                logger.info("Opener pool invalidated (prompt or model changed), dropped %d openers", len(self._openers))
+            self._openers.clear()
+            self.key = key
+
+    def refill(self, agent: Any) -> None:
+        """Startet die Hintergrund-Befüllung, falls der Pool nicht voll ist"""
+        if not self.started:
+            return
+        previous_key = self.key
+        self._check_key(agent)
+        if self._refill_task is not None and not self._refill_task.done():
+            if self.key == previous_key:
+                return
+            # Befüllung für eine veraltete Prompt-Version abbrechen
+            self._refill_task.cancel()
+        if len(self._openers) >= self.size:
+            return
+        # Eigener leerer Context: Usage/Stages gehören zu keinem Turn
+        self._refill_task = contextvars.Context().run(asyncio.create_task, self._fill(agent))
+
+    async def _fill(self, agent: Any) -> None:
+        key = self.key
+        while self.started and self.key == key and len(self._openers) < self.size:
+            try:
+                with capture_usage() as usage:
+                    result = await agent.aprocess_message([MessageRecord.create("human", _POOL_PROMPT)], {})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Opener generation failed: %s", e)
+                return
+            # Setup-Abschluss direkt im ersten Turn ist kein generischer Opener
+            if not isinstance(result, str) or not result.strip():
+                return
+            if self.key != key:
+                return
+            self._openers.append(Opener(result, {model: dict(values) for model, values in usage.models.items()}))
+            self.generated += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Füllstand, Prompt-Version und Zähler"""
+        return {
+            "enabled": self.started,
+            "size": self.size,
+            "available": len(self._openers),
+            "prompt_hash": self.key[0] if self.key else None,
+            "model": self.key[1] if self.key else None,
+            "generated": self.generated,
+            "invalidations": self.invalidations,
+            "refilling": self._refill_task is not None and not self._refill_task.done()
+        }
+
+
+# Global Opener Pool Instance
+_opener_pool: Optional[OpenerPool] = None
+
+
+def get_opener_pool() -> OpenerPool:
+    """
+    Singleton Getter für den Opener Pool (Größe aus den Settings)
+
+    Returns:
+        OpenerPool instance
+    """
+    global _opener_pool
+
+    if _opener_pool is None:
+        from ..config import settings
+
+        _opener_pool = OpenerPool(settings.opener_pool_size)
+
+    return _opener_pool
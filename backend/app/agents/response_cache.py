@@ -0,0 +1,301 @@
+"""
+Response Cache für Agent-Antworten
+Wiederkehrende Setup-Dialoge ohne LLM Call beantworten
+
+Key ist der normalisierte jüngste Kontext (letzte N Messages) zusammen mit
+Route, Prompt-Version und Model des Agents - ändert sich der Prompt einer Route,
+werden nur deren Einträge verworfen. Neben dem exakten Hash gibt es optional einen lokalen Similarity-Index:
+bei identischem Vorkontext wird die letzte User Message per MinHash über
+Zeichen-Trigramme verglichen ("Überrasch mich!" ≈ "überrasche mich").
+
+Einträge haben eine TTL und werden per LRU verdrängt. Gecacht wird nur für
+Routes (Graph Nodes), die explizit freigeschaltet sind. Der Gameplay Agent ist
+ausgeschlossen: seine Antworten hängen am Setup-Kontext und Spielwelt-Zustand
+(nicht im Key), und ein Treffer würde das Zustands-Update der Antwort verlieren.
+"""
+
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .opener_pool import pool_key
+from ..services.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+_NORMALIZE_PATTERN = re.compile(r"[^\w]+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Routes, deren Antworten vom Session State abhängen und nie gecacht werden
+UNCACHEABLE_ROUTES = frozenset({"gameplay_agent"})
+
+
+def normalize_text(text: str) -> str:
+    """Kleinschreibung, Satzzeichen und Whitespace vereinheitlicht"""
+    return _NORMALIZE_PATTERN.sub(" ", text.casefold()).strip()
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class MinHasher:
+    """MinHash-Signaturen über Zeichen-n-Gramme (Jaccard-Schätzung ohne externe Dienste)"""
+
+    def __init__(self, num_perm: int = 32, ngram: int = 3, seed: int = 1):
+        self.ngram = ngram
+        # Hash-Familie (a * x + b) mod p, deterministisch aus dem Seed
+        seeds = hashlib.sha256(str(seed).encode()).digest()
+        self._params = []
+        for index in range(num_perm):
+            value = int.from_bytes(hashlib.blake2b(seeds + index.to_bytes(2, "big"), digest_size=16).digest(), "big")
+            self._params.append(((value >> 64) % (_MERSENNE_PRIME - 1) + 1, (value & ((1 << 64) - 1)) % _MERSENNE_PRIME))
+
+    def shingles(self, text: str) -> List[int]:
+        padded = f" {text} "
+        grams = {padded[index:index + self.ngram] for index in range(max(len(padded) - self.ngram + 1, 1))}
+        return [int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest(), "big") for gram in grams]
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        shingles = self.shingles(text)
+        return tuple(
+            min(((a * shingle + b) % _MERSENNE_PRIME) & _MAX_HASH for shingle in shingles)
+            for a, b in self._params
+        )
+
+    @staticmethod
+    def similarity(left: Sequence[int], right: Sequence[int]) -> float:
+        """Geschätzter Jaccard-Index zweier Signaturen"""
+        return sum(a == b for a, b in zip(left, right)) / len(left)
+
+
+class CachedResponse:
+    """Gecachte Antwort mit Ablaufzeit und Similarity-Signatur der User Message"""
+
+    __slots__ = ("content", "route", "prefix", "signature", "expires_at", "hits")
+
+    def __init__(self, content: str, route: str, prefix: str, signature: Optional[Tuple[int, ...]], expires_at: float):
+        self.content = content
+        self.route = route
+        self.prefix = prefix
+        self.signature = signature
+        self.expires_at = expires_at
+        self.hits = 0
+
+
+class ResponseCache:
+    """
+    Exakt- und Similarity-Cache für Agent-Antworten mit TTL und LRU
+    """
+
+    def __init__(
+        self,
+        routes: Sequence[str] = (),
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 1000,
+        context_messages: int = 4,
+        similarity_threshold: Optional[float] = None
+    ):
+        """
+        Args:
+            routes: Freigeschaltete Routes (Graph Nodes, z.B. "setup_agent")
+            ttl_seconds: Lebensdauer eines Eintrags
+            max_entries: Maximale Einträge (LRU-Verdrängung)
+            context_messages: Anzahl jüngster Messages im Key
+            similarity_threshold: Mindest-Jaccard für Similarity-Treffer (None = nur exakt)
+        """
+        rejected = sorted(set(routes) & UNCACHEABLE_ROUTES)
+        if rejected:
+            logger.warning("Response cache disabled for state-dependent routes: %s", rejected)
+        self.routes = frozenset(routes) - UNCACHEABLE_ROUTES
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.context_messages = context_messages
+        self.similarity_threshold = similarity_threshold
+        self.minhash = MinHasher() if similarity_threshold is not None else None
+
+        # Route → Prompt-Version und Model (pool_key) der gecachten Einträge
+        self._versions: Dict[str, Tuple[str, str]] = {}
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        # Vorkontext → Keys der Einträge (Kandidaten für den Similarity-Vergleich)
+        self._prefixes: Dict[str, List[str]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self.invalidations = 0
+
+        registry = get_metrics_registry()
+        self._requests_counter = registry.counter(
+            "textrpg_response_cache_requests_total",
+            "Agent response cache lookups by route and result (exact/similar/miss)"
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def enabled_for(self, route: str) -> bool:
+        return route in self.routes
+
+    def _context(self, route: str, agent: Any, messages: Sequence[Any]) -> Tuple[str, str, str]:
+        """(Prefix-Hash des Vorkontexts, Key-Hash, normalisierte letzte User Message)"""
+        recent = list(messages[-self.context_messages:])
+        last = normalize_text(recent[-1].content) if recent else ""
+        prefix_parts = [f"{message.type}:{normalize_text(message.content)}" for message in recent[:-1]]
+        prefix = _digest(route, agent.name, *self._versions[route], *prefix_parts)
+        return prefix, _digest(prefix, last), last
+
+    def _check_version(self, route: str, agent: Any) -> None:
+        """Verwirft die Einträge einer Route, wenn sich deren Prompt oder Model geändert hat"""
+        version = pool_key(agent)
+        previous = self._versions.get(route)
+        if version == previous:
+            return
+        self._versions[route] = version
+        if previous is None:
+            return
+        stale = [key for key, entry in self._entries.items() if entry.route == route]
+        if stale:
+            self.invalidations += 1
+            logger.info("Response cache invalidated for %s (prompt or model changed), dropped %d entries", route, len(stale))
+        for key in stale:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._prefixes.clear()
+        self._versions.clear()
+
+    def lookup(self, route: str, agent: Any, messages: Sequence[Any]) -> Optional[Tuple[str, str]]:
+        """
+        Sucht eine gecachte Antwort für den aktuellen Kontext
+
+        Args:
+            route: Route (Graph Node)
+            agent: Agent (Prompt-Version und Model)
+            messages: Messages inkl. aktueller User Message
+
+        Returns:
+            (Antwort, "exact" | "similar") oder None
+        """
+        if not self.enabled_for(route) or not messages or messages[-1].type != "human":
+            return None
+        self._check_version(route, agent)
+        prefix, key, last = self._context(route, agent, messages)
+        now = time.monotonic()
+
+        match, result = self._live(key, now), "exact"
+        if match is None and self.minhash is not None:
+            match, result = self._similar(prefix, last, now), "similar"
+
+        route_stats = self._stats.setdefault(route, {"exact": 0, "similar": 0, "miss": 0})
+        if match is None:
+            route_stats["miss"] += 1
+            self._requests_counter.inc(labels={"route": route, "result": "miss"})
+            return None
+        match.hits += 1
+        route_stats[result] += 1
+        self._requests_counter.inc(labels={"route": route, "result": result})
+        return match.content, result
+
+    def _live(self, key: str, now: float) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _similar(self, prefix: str, last: str, now: float) -> Optional[CachedResponse]:
+        signature = self.minhash.signature(last)
+        best_key, best_score = None, self.similarity_threshold
+        for key in list(self._prefixes.get(prefix, ())):
+            entry = self._live(key, now)
+            if entry is None or entry.signature is None:
+                continue
+            score = MinHasher.similarity(signature, entry.signature)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return self._entries.get(best_key) if best_key is not None else None
+
+    def store(self, route: str, agent: Any, messages: Sequence[Any], content: str) -> None:
+        """
+        Speichert eine Antwort für den Kontext (nur freigeschaltete Routes)
+
+        Args:
+            route: Route (Graph Node)
+            agent: Agent (Prompt-Version und Model)
+            messages: Messages inkl. der beantworteten User Message
+            content: Antwort des Agents
+        """
+        if not self.enabled_for(route) or not messages or messages[-1].type != "human":
+            return
+        self._check_version(route, agent)
+        prefix, key, last = self._context(route, agent, messages)
+        if key in self._entries:
+            self._remove(key)
+        signature = self.minhash.signature(last) if self.minhash is not None else None
+        self._entries[key] = CachedResponse(content, route, prefix, signature, time.monotonic() + self.ttl_seconds)
+        self._prefixes.setdefault(prefix, []).append(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._prefixes.get(entry.prefix)
+        if keys is not None:
+            keys.remove(key)
+            if not keys:
+                del self._prefixes[entry.prefix]
+
+    def stats(self) -> Dict[str, Any]:
+        """Einträge und Hit Rate pro Route"""
+        routes = {}
+        for route, counts in self._stats.items():
+            lookups = counts["exact"] + counts["similar"] + counts["miss"]
+            routes[route] = {
+                **counts,
+                "hit_rate": round((counts["exact"] + counts["similar"]) / lookups, 4) if lookups else None
+            }
+        return {
+            "routes_enabled": sorted(self.routes),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "similarity_threshold": self.similarity_threshold,
+            "invalidations": self.invalidations,
+            "routes": routes
+        }
+
+
+# Global Response Cache Instance
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Singleton Getter für den Response Cache (konfiguriert über Settings)
+
+    Returns:
+        ResponseCache instance
+    """
+    global _response_cache
+
+    if _response_cache is None:
+        from ..config import settings
+
+        _response_cache = ResponseCache(
+            routes=settings.response_cache_routes,
+            ttl_seconds=settings.response_cache_ttl_seconds,
+            max_entries=settings.response_cache_max_entries,
+            context_messages=settings.response_cache_context_messages,
+            similarity_threshold=(
+                settings.response_cache_similarity_threshold if settings.response_cache_similarity_enabled else None
+            )
+        )
+
+    return _response_cache
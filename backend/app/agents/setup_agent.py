@@ -11,6 +11,8 @@ import logging
 
 
 from .prompt_loader import load_prompt_from_file, extract_system_prompt
+from .llm_runner import run_llm
+from ..models import to_provider_messages
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +39,15 @@ class SetupAgent:
             logger.error(f"Error loading Setup Agent prompt: {e}")
             self.system_prompt = "Du bist ein Setup Agent für TextRPG."
     
+    def _build_llm_messages(self, messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+        """Bereitet System-Prompt und Conversation History für das LLM vor"""
+        llm_messages = [{"role": "system", "content": self.system_prompt}]
+        
+        # Füge Conversation History hinzu (letzte 10 Messages, Provider-Format pro Message ID gecacht)
+        llm_messages.extend(to_provider_messages(messages[-10:]))
+        
+        return llm_messages
+    
     def process_message(self, messages: List[BaseMessage], state: Dict[str, Any]) -> Command[Literal["gameplay_agent"]] | str:
         """
         Einfache Message-Verarbeitung - alles durch LLM mit md-Prompt
@@ -48,16 +59,8 @@ class SetupAgent:
         Returns:
             Command oder string response
         """
-        # Bereite Messages für LLM vor
-        llm_messages = [{"role": "system", "content": self.system_prompt}]
-        
-        # Füge Conversation History hinzu
-        for msg in messages[-10:]:  # Letzte 10 Messages
-            role = "user" if msg.type == "human" else "assistant"
-            llm_messages.append({"role": role, "content": msg.content})
-        
         # LLM-Aufruf
-        response = self.llm.invoke(llm_messages)
+        response = self.llm.invoke(self._build_llm_messages(messages))
         
         # WICHTIG: Extrahiere content als String, nicht das ganze AIMessage-Objekt!
         if hasattr(response, 'content'):
@@ -65,20 +68,37 @@ class SetupAgent:
         else:
             content = str(response)
         
-        logger.info(f"Agent response extracted: {content[:100]}...")
+        logger.debug("Agent response extracted: %.100s", content)
         
         # Erkenne Setup-Completion und erstelle Command oder return string
         return self._check_setup_complete(content, state) or content
     
+    async def aprocess_message(self, messages: List[BaseMessage], state: Dict[str, Any]) -> Command[Literal["gameplay_agent"]] | str:
+        """
+        Async Variante von process_message - blockiert den Event Loop nicht
+        
+        Args:
+            messages: Conversation history
+            state: Current state
+            
+        Returns:
+            Command oder string response
+        """
+        content = await run_llm(self.llm, self._build_llm_messages(messages), self.name)
+        
+        logger.debug("Agent response extracted: %.100s", content)
+        
+        return self._check_setup_complete(content, state) or content
+    
     def _check_setup_complete(self, response: str, state: Dict[str, Any]) -> Optional[Command[Literal["gameplay_agent"]]]:
         """
         Prüft ob Setup abgeschlossen ist basierend auf LLM Response
         Das LLM signalisiert Completion mit [SETUP-COMPLETE]
         """
-        logger.info(f"Checking for [SETUP-COMPLETE] in response: {response[:200]}...")
+        logger.debug("Checking for [SETUP-COMPLETE] in response: %.200s", response)
         
         if "[SETUP-COMPLETE]" not in response:
-            logger.info("No [SETUP-COMPLETE] marker found in response")
+            logger.debug("No [SETUP-COMPLETE] marker found in response")
             return None
         
         logger.info("SETUP-COMPLETE marker detected! Creating LangGraph Command...")
@@ -0,0 +1,131 @@
+"""
+Strukturierter Spielwelt-Zustand für den Gameplay Agent
+Ort, Inventar, Gefährten, offene Quests und Kapitel als kompakter Prompt-Block
+
+Statt die komplette Historie erneut zu lesen, bekommt der Gameplay Agent den
+Zustand als kurzen System-Block und hängt Änderungen als Delta-Block an seine
+Antwort an:
+
+    [ZUSTAND]
+    Ort: Hafen von Kessel
+    Inventar: +Fremde Münze, -Brief
+    Quests: +Finde den Absender, ✓Erreiche den Hafen
+    [/ZUSTAND]
+
+Der Block wird in der Generation-Pipeline aus dem Stream entfernt (der Spieler
+sieht ihn nie) und ohne zusätzlichen LLM Call geparst. Der Zustand liegt als
+Dict auf dem ChatState (journalisiert, in Snapshots enthalten).
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WORLD_STATE_TAG = "ZUSTAND"
+NEW_CHAPTER_MARKER = "[NEUES-KAPITEL]"
+
+# Zeilen-Label → Feld (Listen-Felder mit Obergrenze, damit der Block kompakt bleibt)
+_LIST_FIELDS = {
+    "inventar": ("inventory", 20),
+    "gefährten": ("party", 8),
+    "gruppe": ("party", 8),
+    "quests": ("quests", 10),
+    "offene quests": ("quests", 10)
+}
+_LOCATION_LABELS = frozenset({"ort", "location"})
+_MAX_ITEM_CHARS = 80
+_ITEM_SPLIT = re.compile(r"[,;]")
+_REMOVE_PREFIXES = ("-", "✓", "✔", "x ", "[x]")
+
+_LABELS = {"inventory": "Inventar", "party": "Gefährten", "quests": "Offene Quests"}
+
+WORLD_STATE_INSTRUCTION = (
+    "Hänge Änderungen am Spielwelt-Zustand am Ende deiner Antwort als Block an "
+    f"(nur geänderte Zeilen, ohne Änderungen kein Block):\n[{WORLD_STATE_TAG}]\n"
+    "Ort: <aktueller Ort>\nInventar: +neuer Gegenstand, -verbrauchter Gegenstand\n"
+    "Gefährten: +neu dabei, -nicht mehr dabei\nQuests: +neue Quest, ✓erledigte Quest\n"
+    f"[/{WORLD_STATE_TAG}]"
+)
+
+
+def empty_world_state() -> Dict[str, Any]:
+    """Leerer Spielwelt-Zustand"""
+    return {"location": None, "inventory": [], "party": [], "quests": []}
+
+
+def _clean_item(item: str) -> str:
+    return item.strip().strip("\"'„“*").strip()[:_MAX_ITEM_CHARS]
+
+
+def _apply_list_update(items: List[str], value: str, limit: int) -> List[str]:
+    items = list(items)
+    for raw in _ITEM_SPLIT.split(value):
+        entry = raw.strip()
+        remove = entry.startswith(_REMOVE_PREFIXES)
+        if remove or entry.startswith("+"):
+            entry = entry.lstrip("+-✓✔").removeprefix("[x]").removeprefix("x ")
+        entry = _clean_item(entry)
+        if not entry or entry == "-":
+            continue
+        existing = [item for item in items if item.casefold() == entry.casefold()]
+        if remove:
+            items = [item for item in items if item not in existing]
+        elif not existing:
+            items.append(entry)
+    # Älteste Einträge fallen bei Überlauf heraus
+    return items[-limit:]
+
+
+def apply_world_update(world_state: Optional[Dict[str, Any]], block: str) -> Dict[str, Any]:
+    """
+    Wendet einen Delta-Block auf den Zustand an (unbekannte Zeilen werden ignoriert)
+
+    Args:
+        world_state: Bisheriger Zustand (None = leer)
+        block: Inhalt zwischen [ZUSTAND] und [/ZUSTAND]
+
+    Returns:
+        Neuer Zustand (der bisherige bleibt unverändert)
+    """
+    updated = {**empty_world_state(), **(world_state or {})}
+    for line in block.splitlines():
+        label, separator, value = line.partition(":")
+        if not separator:
+            continue
+        label = label.strip(" -*#").casefold()
+        if label in _LOCATION_LABELS:
+            location = _clean_item(value)
+            if location and location != "-":
+                updated["location"] = location
+        elif label in _LIST_FIELDS:
+            field, limit = _LIST_FIELDS[label]
+            updated[field] = _apply_list_update(updated[field], value, limit)
+        else:
+            logger.debug("Unknown world state line ignored: %.80s", line)
+    return updated
+
+
+def render_world_state(world_state: Optional[Dict[str, Any]], chapter: int = 0) -> Optional[str]:
+    """
+    Kompakter Prompt-Block des Zustands
+
+    Args:
+        world_state: Zustand (None/leer = kein Block)
+        chapter: Aktuelles Kapitel
+
+    Returns:
+        Block-Text oder None ohne bekannten Zustand
+    """
+    world_state = world_state or {}
+    lines = []
+    if world_state.get("location"):
+        lines.append(f"Ort: {world_state['location']}")
+    for field, label in _LABELS.items():
+        if world_state.get(field):
+            lines.append(f"{label}: {', '.join(world_state[field])}")
+    if not lines and not chapter:
+        return None
+    header = f"Spielwelt-Zustand (Kapitel {chapter}):" if chapter else "Spielwelt-Zustand:"
+    return "\n".join([header, *lines])
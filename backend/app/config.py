@@ -5,7 +5,7 @@ Pydantic Settings für sichere Environment Variable-Verwaltung
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
-from typing import Optional
+from typing import Any, Dict, Literal, Optional
 import os
 from pathlib import Path
 
@@ -24,7 +24,7 @@ class Settings(BaseSettings):
     
     openrouter_base_url: str = Field(
         default="https://openrouter.ai/api/v1",
-        description="OpenRouter API Base URL"
+        description="OpenRouter API Base URL (lokaler Stand-in: http://127.0.0.1:8100/api/v1)"
     )
     
     # LLM Model Configuration
@@ -71,6 +71,17 @@ class Settings(BaseSettings):
         description="LangSmith Project Name"
     )
     
+    langsmith_sample_rate: float = Field(
+        default=1.0,
+        alias="LANGSMITH_SAMPLE_RATE",
+        description="Anteil getracter Sessions (deterministisch per Hash der session_id, 0.0 - 1.0)"
+    )
+    
+    langsmith_max_tracked_sessions: int = Field(
+        default=1000,
+        description="Maximale Anzahl Sessions im SessionTracker (LRU)"
+    )
+    
     # API Configuration
     api_host: str = Field(default="0.0.0.0", description="FastAPI Host")
     api_port: int = Field(default=8000, description="FastAPI Port")
@@ -87,12 +98,288 @@ class Settings(BaseSettings):
     
     # Logging Configuration
     log_level: str = Field(default="info", description="Logging Level")
+    log_mode: Literal["development", "production"] = Field(
+        default="development",
+        description="development: Console-Renderer synchron | production: JSON über Queue + Background-Writer"
+    )
+    log_queue_size: int = Field(
+        default=10000,
+        description="Queue-Größe des Background-Log-Writers (volle Queue verwirft und zählt Zeilen)"
+    )
+    log_sampling: bool = Field(
+        default=True,
+        description="Sampling und Rate Limiting pro event_type (Policies in logging_config.PHASE2_EVENT_TYPES)"
+    )
+    log_sampling_overrides: Dict[str, Dict[str, Any]] = Field(
+        default_factory=dict,
+        description="Policies pro event_type überschreiben, z.B. {\"session_lookup\": {\"sample_rate\": 0.1}}"
+    )
+    log_summary_interval_seconds: float = Field(
+        default=60.0,
+        description="Intervall für Summaries unterdrückter Log-Events in Sekunden"
+    )
+    
+    # Event Loop Monitor
+    event_loop_monitor_enabled: bool = Field(
+        default=True,
+        description="Watchdog für Event-Loop-Lag mit Stack-Capture aktivieren"
+    )
+    event_loop_monitor_interval_ms: int = Field(
+        default=100,
+        description="Mess-Intervall des Event-Loop-Watchdogs in Millisekunden"
+    )
+    event_loop_lag_threshold_ms: int = Field(
+        default=250,
+        description="Lag ab dem eine Blockade geloggt und gezählt wird (Millisekunden)"
+    )
+    event_loop_capture_stacks: bool = Field(
+        default=True,
+        description="Stack des blockierenden Frames über Sampling-Thread erfassen"
+    )
+
+    # LLM Pricing (USD pro 1M Tokens) für Cost Accounting
+    llm_pricing: Dict[str, Dict[str, float]] = Field(
+        default={
+            "google/gemini-2.5-pro-preview": {"prompt": 1.25, "completion": 10.0, "cached": 0.31},
+            "google/gemini-2.5-flash-preview-05-20": {"prompt": 0.15, "completion": 0.60, "cached": 0.0375},
+            "google/gemini-2.0-flash-exp": {"prompt": 0.0, "completion": 0.0, "cached": 0.0},
+        },
+        description="Preise pro Model: prompt/completion/cached in USD pro 1M Tokens (JSON via LLM_PRICING)"
+    )
+    
+    # Session Snapshots
+    snapshot_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        description="Maximale dekomprimierte Größe eines Snapshots beim Restore (Bytes)"
+    )
+    
+    # Provider Message Cache
+    llm_message_cache_size: int = Field(
+        default=4096,
+        description="Anzahl Messages, deren Provider-Format (Dict + JSON-Bytes) pro Message ID gecacht wird"
+    )
+    
+    # LLM Concurrency
+    llm_max_concurrency: int = Field(
+        default=0,
+        description="Maximale Anzahl paralleler LLM-Calls (0 = unbegrenzt), Wartezeit wird als llm_queue_wait gemessen"
+    )
     
+    # Streaming-Frames (Segmentierung an Absatz-, Zeilen- und Satzgrenzen)
+    stream_segment_min_chars: int = Field(
+        default=40,
+        description="Mindestgröße eines Frames, bevor an einem Satzende geschnitten wird"
+    )
+    stream_segment_max_chars: int = Field(
+        default=400,
+        description="Maximale Frame-Größe - darüber wird an Teilsatz- bzw. Wortgrenzen geschnitten"
+    )
+    stream_segment_max_latency_ms: int = Field(
+        default=250,
+        description="Maximale Pufferzeit im Segmenter, danach gehen vollständige Wörter raus"
+    )
+    
+    # Stream Pipeline (Nachbearbeitung des LLM Token-Streams, für alle Agents gleich)
+    stream_strip_markers: list[str] = Field(
+        default=["[NEUES-KAPITEL]", "[SESSION-ENDE]"],
+        description="System-Marker, die aus Antworten entfernt werden ([SETUP-COMPLETE] wertet der Setup Agent aus)"
+    )
+    stream_cleanup_enabled: bool = Field(
+        default=True,
+        description="Whitespace/Satzzeichen im Token-Stream bereinigen (Markdown-sicher)"
+    )
+    
+    # Degenerierte Ausgaben (Schleifen / Wiederholung des letzten Turns) im Stream erkennen
+    repetition_detection_enabled: bool = Field(
+        default=True,
+        description="LLM-Streams mit Schleifen oder wiederholter voriger Antwort frühzeitig abbrechen"
+    )
+    repetition_ngram: int = Field(
+        default=4,
+        description="Wörter pro Shingle (Rolling Hash)"
+    )
+    repetition_window: int = Field(
+        default=64,
+        description="Gleitendes Fenster in Shingles für die Schleifen-Erkennung"
+    )
+    repetition_min_shingles: int = Field(
+        default=24,
+        description="Mindestanzahl Shingles im Stream bevor abgebrochen werden kann"
+    )
+    repetition_loop_ratio: float = Field(
+        default=0.5,
+        description="Anteil doppelter Shingles im Fenster, ab dem eine Schleife erkannt wird"
+    )
+    repetition_previous_ratio: float = Field(
+        default=0.8,
+        description="Anteil der Shingles aus der vorigen Antwort, ab dem eine Wiederholung erkannt wird"
+    )
+    repetition_retry_frequency_penalty: Optional[float] = Field(
+        default=0.7,
+        description="frequency_penalty für den erneuten Versuch nach einem Abbruch (None = kein Retry)"
+    )
+    repetition_fallback_message: str = Field(
+        default="Die Erzählung stockt für einen Moment. Beschreibe bitte noch einmal, was du als Nächstes tun möchtest.",
+        description="Antwort, wenn auch der Retry degeneriert und kein verwertbarer Anfang bleibt"
+    )
+    
+    # Spielwelt-Zustand (kompakter Prompt-Block statt langer Historie)
+    world_state_enabled: bool = Field(
+        default=True,
+        description="Spielwelt-Zustand aus Gameplay-Antworten parsen und in den Gameplay Prompt einfügen"
+    )
+    world_state_history_messages: int = Field(
+        default=6,
+        description="Messages Historie im Gameplay Prompt, sobald ein Spielwelt-Zustand vorliegt (sonst 10)"
+    )
+
     # Session Configuration
     default_session_timeout: int = Field(
         default=3600, 
         description="Standard Session Timeout in Sekunden"
     )
+    
+    # Geteiltes Session-Backend (mehrere Worker-Prozesse)
+    session_backend: Literal["memory", "sqlite", "redis"] = Field(
+        default="memory",
+        description="Session-Backend: memory (nur im Prozess, 1 Worker), sqlite (lokale Datei) oder redis"
+    )
+    session_sqlite_path: str = Field(
+        default="sessions.db",
+        description="SQLite-Datei für session_backend=sqlite"
+    )
+    session_redis_url: str = Field(
+        default="redis://localhost:6379/0",
+        description="Redis URL für session_backend=redis (memory:// = In-Process Stand-in)"
+    )
+    session_lock_timeout_seconds: float = Field(
+        default=30.0,
+        description="Maximale Wartezeit auf den Session-Lock eines Turns"
+    )
+    session_lock_ttl_seconds: float = Field(
+        default=300.0,
+        description="Lease-Dauer eines Session-Locks (Schutz vor abgestürzten Workern)"
+    )
+    session_affinity_nodes: list[str] = Field(
+        default_factory=list,
+        description="Worker-Namen für den Consistent-Hash Affinity-Hinweis (leer = deaktiviert)"
+    )
+    session_affinity_node: Optional[str] = Field(
+        default=None,
+        description="Name dieses Workers im Affinity-Ring (für Hit/Miss-Metriken)"
+    )
+    session_affinity_cookie: str = Field(
+        default="textrpg_affinity",
+        description="Cookie-Name für den Affinity-Hinweis"
+    )
+    
+    # Cold History (Kompression idle Sessions im Speicher)
+    cold_history_enabled: bool = Field(
+        default=True,
+        description="Message-Historie idle Sessions komprimieren, Entpacken beim nächsten Zugriff"
+    )
+    cold_history_idle_seconds: float = Field(
+        default=600.0,
+        description="Sekunden ohne Update/Zugriff, nach denen eine Session eingefroren wird"
+    )
+    cold_history_interval_seconds: float = Field(
+        default=60.0,
+        description="Prüf-Intervall des History Compactors in Sekunden"
+    )
+    cold_history_block_messages: int = Field(
+        default=64,
+        description="Maximale Messages pro komprimiertem Block"
+    )
+    cold_history_hot_messages: int = Field(
+        default=20,
+        description="Jüngste Messages, die beim Einfrieren unkomprimiert bleiben (Agent-Kontext, Metadaten)"
+    )
+    cold_history_codec: Optional[Literal["zstd", "zlib", "none"]] = Field(
+        default=None,
+        description="Kompressions-Codec (default: zstd wenn installiert, sonst zlib)"
+    )
+    
+    # Turn Journal (Write-ahead Log für Generierungen)
+    turn_journal_enabled: bool = Field(
+        default=False,
+        description="Turns journalisieren, damit Generierungen Crashes und Disconnects überleben (opt-in)"
+    )
+    turn_journal_dir: str = Field(
+        default=".turn_journal",
+        description="Verzeichnis für Turn-Journal Segmente (im Betrieb absoluter Pfad, gleich für alle Worker eines Hosts)"
+    )
+    turn_journal_fsync_interval_ms: float = Field(
+        default=50.0,
+        description="Maximale Wartezeit bis zum gebündelten fsync in Millisekunden"
+    )
+    turn_journal_segment_bytes: int = Field(
+        default=16 * 1024 * 1024,
+        description="Segment-Größe, ab der das Journal rotiert"
+    )
+    
+    # Idempotency Keys (Client-Retries von Turn-Submissions)
+    idempotency_ttl_seconds: float = Field(
+        default=600.0,
+        description="Zeitfenster, in dem ein Turn-Ergebnis für denselben Idempotency-Key wiederholt wird"
+    )
+    idempotency_max_entries: int = Field(
+        default=10000,
+        description="Maximale Anzahl gehaltener Idempotency-Ergebnisse (älteste zuerst verdrängt)"
+    )
+    
+    # Spekulative Vorab-Generierung (Folge-Turns für angebotene Optionen)
+    speculation_enabled: bool = Field(
+        default=False,
+        description="Folge-Turns für die angebotenen Spieler-Optionen im Hintergrund vorab generieren (opt-in)"
+    )
+    speculation_top_k: int = Field(
+        default=2,
+        description="Anzahl Optionen, die pro Gameplay-Turn vorab generiert werden"
+    )
+    speculation_max_concurrency: int = Field(
+        default=2,
+        description="Maximale gleichzeitige Spekulationen pro Prozess (kein Slot frei = keine Spekulation)"
+    )
+    speculation_session_token_budget: int = Field(
+        default=20000,
+        description="Maximale spekulative Tokens pro Session"
+    )
+    
+    # Opener Pool (vorab generierte Setup-Eröffnungen)
+    opener_pool_enabled: bool = Field(
+        default=False,
+        description="Generische erste Nachrichten neuer Sessions aus vorab generierten Setup-Openern bedienen (opt-in; kostet pro Worker opener_pool_size bezahlte LLM Calls beim Start plus einen pro ausgeliefertem Opener)"
+    )
+    opener_pool_size: int = Field(
+        default=4,
+        description="Anzahl vorgehaltener Opener pro Prompt-Version und Model"
+    )
+    
+    # Response Cache (wiederkehrende Agent-Antworten ohne LLM Call)
+    response_cache_routes: list[str] = Field(
+        default=[],
+        description="Graph Nodes, deren Antworten gecacht werden (opt-in pro Route, z.B. [\"setup_agent\"]; gameplay_agent ist ausgeschlossen)"
+    )
+    response_cache_ttl_seconds: float = Field(
+        default=3600.0,
+        description="Lebensdauer einer gecachten Antwort in Sekunden"
+    )
+    response_cache_max_entries: int = Field(
+        default=1000,
+        description="Maximale Anzahl gecachter Antworten (LRU-Verdrängung)"
+    )
+    response_cache_context_messages: int = Field(
+        default=4,
+        description="Anzahl jüngster Messages, die den Cache-Key bilden"
+    )
+    response_cache_similarity_enabled: bool = Field(
+        default=False,
+        description="Ähnliche User Messages (MinHash über Zeichen-Trigramme) ebenfalls aus dem Cache bedienen"
+    )
+    response_cache_similarity_threshold: float = Field(
+        default=0.8,
+        description="Mindest-Ähnlichkeit (geschätzter Jaccard-Index) für einen Similarity-Treffer"
+    )
 
     model_config = SettingsConfigDict(
         # .env liegt im root directory
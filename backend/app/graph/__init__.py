@@ -27,6 +27,20 @@ from .session_manager import (
     get_session_manager
 )
 
+from .session_index import SessionIndex
+from .history_compactor import HistoryCompactor
+from .idempotency import IdempotencyCache, session_id_for_key
+from .speculation import Speculator, parse_options
+from .session_store import (
+    SessionStore,
+    SQLiteSessionStore,
+    RedisSessionStore,
+    SessionLockTimeout,
+    create_session_store
+)
+from .turn_journal import TurnJournal, JournalTurn
+from .message_history import UnknownMessageCursor, paginate_hot_tail, paginate_messages
+
 from ..models.state import ChatState
 
 import logging
@@ -108,5 +122,27 @@ __all__ = [
     
     # Session Management
     "SessionManager",
-    "get_session_manager"
+    "SessionIndex",
+    "HistoryCompactor",
+    "IdempotencyCache",
+    "session_id_for_key",
+    "Speculator",
+    "parse_options",
+    "get_session_manager",
+    
+    # Shared Session Backend (Multi-Worker)
+    "SessionStore",
+    "SQLiteSessionStore",
+    "RedisSessionStore",
+    "SessionLockTimeout",
+    "create_session_store",
+    
+    # Turn Journal (Write-ahead Log)
+    "TurnJournal",
+    "JournalTurn",
+    
+    # Message History
+    "UnknownMessageCursor",
+    "paginate_hot_tail",
+    "paginate_messages"
 ] 
\ No newline at end of file
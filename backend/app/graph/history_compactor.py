@@ -0,0 +1,263 @@
+"""
+TextRPG History Compactor
+Friert die Message-Historie idle Sessions in komprimierte Blöcke ein
+
+Ein Background Task prüft periodisch alle Sessions: wer länger als der
+Idle-Threshold weder aktualisiert noch gelesen wurde, bekommt seine Messages bis
+auf einen heißen Tail in ColdHistory-Blöcke gepackt. Metadaten und Reads aus dem
+Tail entpacken nichts; der SessionManager taut eine Session erst auf, wenn die
+vollständige Historie gebraucht wird (Turn, Export, Store). Kompressionsrate und Kosten der
+Zugriffe werden als Stats und Prometheus-Metriken geführt.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+
+import structlog
+
+from ..models import ChatState, ColdHistory
+from ..services.metrics import get_metrics_registry
+from ..services.timing import record_stage
+
+logger = structlog.get_logger()
+
+
+class HistoryCompactor:
+    """
+    Cold-History Verwaltung: Einfrieren idle Sessions, Auftauen bei Zugriff
+    """
+
+    def __init__(
+        self,
+        idle_seconds: float = 600.0,
+        interval: float = 60.0,
+        block_size: int = 64,
+        codec: Optional[str] = None,
+        level: int = 3,
+        hot_messages: int = 20
+    ):
+        """
+        Args:
+            idle_seconds: Zeit ohne Update/Zugriff bis zum Einfrieren
+            interval: Prüf-Intervall des Background Tasks in Sekunden
+            block_size: Maximale Messages pro komprimiertem Block
+            codec: zstd | zlib | none (default: zstd wenn installiert)
+            level: Kompressionslevel
+            hot_messages: Jüngste Messages, die unkomprimiert bleiben
+        """
+        self.idle_seconds = idle_seconds
+        self.interval = interval
+        self.block_size = block_size
+        self.codec = codec
+        self.level = level
+        self.hot_messages = hot_messages
+
+        self.frozen_sessions = 0
+        self.freezes = 0
+        self.thaws = 0
+        self.freeze_seconds = 0.0
+        self.thaw_seconds = 0.0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+        self._task: Optional[asyncio.Task] = None
+
+        registry = get_metrics_registry()
+        self._freeze_counter = registry.counter(
+            "textrpg_cold_history_freezes_total",
+            "Sessions whose message history was compressed"
+        )
+        self._thaw_counter = registry.counter(
+            "textrpg_cold_history_thaws_total",
+            "Accesses that decompressed a frozen session history"
+        )
+        self._thaw_histogram = registry.histogram(
+            "textrpg_cold_history_thaw_seconds",
+            "Time spent decompressing a frozen session history"
+        )
+        self._frozen_gauge = registry.gauge(
+            "textrpg_cold_history_frozen_sessions",
+            "Sessions with a currently frozen message history"
+        )
+        self._ratio_gauge = registry.gauge(
+            "textrpg_cold_history_compression_ratio",
+            "Packed (uncompressed) bytes per compressed byte of frozen histories"
+        )
+
+    def touch(self, state: ChatState, thaw: bool = True) -> None:
+        """Markiert einen Zugriff und taut eine eingefrorene Historie optional auf"""
+        cold = state.cold_history
+        if cold is None:
+            cold = state.cold_history = ColdHistory()
+        cold.last_access = time.monotonic()
+        if thaw and cold.frozen:
+            self.thaw(state)
+
+    def idle_for(self, state: ChatState, now: Optional[datetime] = None) -> float:
+        """Sekunden seit dem letzten Update bzw. Zugriff"""
+        idle = ((now or datetime.utcnow()) - state.last_updated).total_seconds()
+        if state.cold_history is not None:
+            idle = min(idle, time.monotonic() - state.cold_history.last_access)
+        return idle
+
+    def freeze(self, state: ChatState) -> bool:
+        """
+        Packt die Messages einer Session in komprimierte Blöcke
+
+        Returns:
+            True wenn eingefroren
+        """
+        cold = state.cold_history
+        if cold is None:
+            cold = state.cold_history = ColdHistory()
+        if cold.frozen or state.processing or len(state.messages) <= self.hot_messages:
+            return False
+
+        start = time.perf_counter()
+        state.messages = cold.freeze(state.messages, self.block_size, self.codec, self.level, self.hot_messages)
+        elapsed = time.perf_counter() - start
+
+        self.freezes += 1
+        self.freeze_seconds += elapsed
+        self.frozen_sessions += 1
+        self.raw_bytes += cold.raw_bytes
+        self.compressed_bytes += cold.compressed_bytes
+        self._freeze_counter.inc()
+        self._update_gauges()
+
+        logger.debug("Session history frozen",
+                    session_id=state.session_id,
+                    messages=cold.packed_count,
+                    blocks=len(cold.blocks),
+                    raw_bytes=cold.raw_bytes,
+                    compressed_bytes=cold.compressed_bytes,
+                    duration_ms=round(elapsed * 1000, 2),
+                    event_type="cold_history")
+        return True
+
+    def thaw(self, state: ChatState) -> None:
+        """Entpackt die Historie einer eingefrorenen Session"""
+        cold = state.cold_history
+        if cold is None or not cold.frozen:
+            return
+
+        # Stats vor dem Entpacken abziehen - thaw() verwirft die Blöcke
+        self.forget(state)
+        start = time.perf_counter()
+        state.messages = cold.thaw(state.messages)
+        elapsed = time.perf_counter() - start
+
+        self.thaws += 1
+        self.thaw_seconds += elapsed
+        record_stage("cold_history_thaw", elapsed)
+        self._thaw_counter.inc()
+        self._thaw_histogram.observe(elapsed)
+
+        logger.debug("Session history thawed",
+                    session_id=state.session_id,
+                    messages=len(state.messages),
+                    duration_ms=round(elapsed * 1000, 2),
+                    event_type="cold_history")
+
+    def forget(self, state: ChatState) -> None:
+        """Nimmt eine eingefrorene Session aus den Stats (Auftauen oder Löschen)"""
+        cold = state.cold_history
+        if cold is None or not cold.frozen:
+            return
+        self.frozen_sessions -= 1
+        self.raw_bytes -= cold.raw_bytes
+        self.compressed_bytes -= cold.compressed_bytes
+        self._update_gauges()
+
+    def compact(self, sessions: Iterable[ChatState]) -> int:
+        """
+        Friert alle Sessions ein, die länger als idle_seconds idle sind
+
+        Returns:
+            Anzahl neu eingefrorener Sessions
+        """
+        now = datetime.utcnow()
+        frozen = 0
+        for state in list(sessions):
+            if self.idle_for(state, now) >= self.idle_seconds and self.freeze(state):
+                frozen += 1
+        self._log_compaction(frozen)
+        return frozen
+
+    def _log_compaction(self, frozen: int) -> None:
+        if frozen:
+            logger.info("Idle session histories compressed",
+                       sessions=frozen,
+                       event_type="cold_history",
+                       **self.stats())
+
+    def stats(self) -> Dict[str, Any]:
+        """Kompressionsrate und Zugriffskosten"""
+        return {
+            "frozen_sessions": self.frozen_sessions,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "compression_ratio": round(self.raw_bytes / self.compressed_bytes, 2) if self.compressed_bytes else None,
+            "freezes": self.freezes,
+            "thaws": self.thaws,
+            "avg_freeze_ms": round(self.freeze_seconds / self.freezes * 1000, 3) if self.freezes else None,
+            "avg_thaw_ms": round(self.thaw_seconds / self.thaws * 1000, 3) if self.thaws else None
+        }
+
+    def _update_gauges(self) -> None:
+        self._frozen_gauge.set(self.frozen_sessions)
+        self._ratio_gauge.set(self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0.0)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, sessions: Callable[[], Mapping[str, ChatState]]) -> None:
+        """
+        Startet den periodischen Compaction Task
+
+        Args:
+            sessions: Liefert die aktuellen Sessions (session_id → ChatState)
+        """
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(sessions))
+        logger.info("History compactor started",
+                   idle_seconds=self.idle_seconds,
+                   interval_s=self.interval,
+                   block_size=self.block_size,
+                   hot_messages=self.hot_messages,
+                   codec=self.codec or "default")
+
+    async def stop(self) -> None:
+        """Stoppt den Compaction Task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, sessions: Callable[[], Mapping[str, ChatState]]) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._compact_incrementally(sessions)
+            except Exception as e:
+                logger.error("History compaction failed", error=str(e), exc_info=True)
+
+    async def _compact_incrementally(self, sessions: Callable[[], Mapping[str, ChatState]]) -> None:
+        """Wie compact(), gibt den Event Loop aber nach jeder eingefrorenen Session frei"""
+        now = datetime.utcnow()
+        frozen = 0
+        for session_id, state in list(sessions().items()):
+            # Session kann seit dem letzten Yield gelöscht oder ersetzt worden sein
+            if sessions().get(session_id) is not state:
+                continue
+            if self.idle_for(state, now) >= self.idle_seconds and self.freeze(state):
+                frozen += 1
+                await asyncio.sleep(0)
+        self._log_compaction(frozen)
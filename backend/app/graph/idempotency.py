@@ -0,0 +1,151 @@
+"""
+TextRPG Idempotency Keys
+Doppelte Turn-Submissions (Client-Retries) werden nicht erneut verarbeitet
+
+Pro (Session, Idempotency-Key) wird das Ergebnis eines Turns als Folge von
+Chunks gehalten. Ein Duplikat bekommt die gespeicherten Chunks erneut bzw.
+hängt sich an den noch laufenden Stream an - ohne neuen LLM Call und ohne
+doppelte User Message in der Historie. Einträge laufen nach einem Zeitfenster
+ab; die Anzahl ist begrenzt (älteste abgeschlossene zuerst).
+
+Submissions ohne Session ID (erster Turn einer neuen Session) bekommen eine aus
+dem Key abgeleitete Session ID - ein Retry landet so in derselben Session statt
+eine neue anzulegen, auch auf einem anderen Worker.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import structlog
+
+from ..services.metrics import get_metrics_registry
+
+logger = structlog.get_logger()
+
+# Metadata-Feld der User Message - Duplikate sind so auch nach einem Neustart
+# oder auf einem anderen Worker (Session Store) erkennbar
+IDEMPOTENCY_METADATA_KEY = "idempotency_key"
+
+_SESSION_NAMESPACE = uuid.UUID("5b0f3f2e-7c1a-4d8e-9a57-2f1c9e4b6d30")
+
+
+def session_id_for_key(idempotency_key: str) -> str:
+    """Deterministische Session ID für eine Submission ohne Session ID"""
+    return str(uuid.uuid5(_SESSION_NAMESPACE, idempotency_key))
+
+
+class IdempotentTurn:
+    """Ergebnis (bzw. laufender Stream) eines Turns zu einem Idempotency-Key"""
+
+    __slots__ = ("key", "message", "chunks", "done", "finished_at", "task", "_changed")
+
+    def __init__(self, key: str, message: str):
+        self.key = key
+        self.message = message
+        self.chunks: List[str] = []
+        self.done = False
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def append(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self) -> None:
+        self.done = True
+        self.finished_at = time.monotonic()
+        self._notify()
+
+    def _notify(self) -> None:
+        # Wartende Follower wecken, neue Wartende bekommen ein frisches Event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncIterator[str]:
+        """Alle Chunks von Anfang an, danach neue bis zum Ende des Turns"""
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+class IdempotencyCache:
+    """
+    Begrenztes Zeitfenster Key → Turn-Ergebnis pro Session
+    """
+
+    def __init__(self, ttl_seconds: float = 600.0, max_entries: int = 10000):
+        """
+        Args:
+            ttl_seconds: Wie lange ein abgeschlossenes Ergebnis wiederholt werden kann
+            max_entries: Maximale Anzahl gehaltener Ergebnisse
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], IdempotentTurn]" = OrderedDict()
+
+        registry = get_metrics_registry()
+        self._requests_counter = registry.counter(
+            "textrpg_idempotent_requests_total",
+            "Turn submissions with an Idempotency-Key by result (new/replay/attach/history/conflict)"
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def claim(self, session_id: str, key: str, message: str) -> Tuple[IdempotentTurn, bool]:
+        """
+        Holt den Eintrag zu einem Key oder legt ihn an
+
+        Returns:
+            (Eintrag, True wenn neu angelegt - der Aufrufer verarbeitet den Turn)
+        """
+        self._evict()
+        entry = self._entries.get((session_id, key))
+        if entry is not None:
+            return entry, False
+        entry = IdempotentTurn(key, message)
+        self._entries[(session_id, key)] = entry
+        return entry, True
+
+    def discard(self, session_id: str, key: str) -> None:
+        """Entfernt einen Eintrag (Turn nicht ausgeführt - Retry soll neu verarbeiten)"""
+        self._entries.pop((session_id, key), None)
+
+    def forget_session(self, session_id: str) -> None:
+        """Entfernt alle Einträge einer gelöschten Session"""
+        for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == session_id]:
+            del self._entries[entry_key]
+
+    def count(self, result: str) -> None:
+        """Zählt eine Submission nach Ergebnis"""
+        self._requests_counter.inc(labels={"result": result})
+
+    def _evict(self) -> None:
+        # Einträge liegen in Anlage-Reihenfolge - ab dem ersten gültigen abgeschlossenen
+        # Eintrag (und ohne Überlauf) ist nichts Älteres mehr abgelaufen
+        now = time.monotonic()
+        overflow = len(self._entries) - self.max_entries + 1
+        evicted = []
+        for entry_key, entry in self._entries.items():
+            if not entry.done:
+                continue
+            if overflow <= 0 and now - entry.finished_at <= self.ttl_seconds:
+                break
+            evicted.append(entry_key)
+            overflow -= 1
+        for entry_key in evicted:
+            del self._entries[entry_key]
+
+    def stats(self) -> Dict[str, int]:
+        """Gehaltene Einträge und davon laufende Turns"""
+        in_flight = sum(not entry.done for entry in self._entries.values())
+        return {"entries": len(self._entries), "in_flight": in_flight}
@@ -0,0 +1,116 @@
+"""
+TextRPG Message History
+Cursor-Pagination und Incremental Sync über die Message-Historie einer Session
+
+Messages werden nur angehängt, die Liste ist also nach Einfüge-Reihenfolge (und
+damit nach Timestamp) sortiert. Cursor sind Message IDs; `since` nutzt bisect
+über die Timestamps.
+"""
+
+import bisect
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from ..models import MessageRecord, message_id_key, timestamp_us
+
+
+class UnknownMessageCursor(ValueError):
+    """Cursor (before/after) verweist auf keine Message der Session"""
+
+
+def find_message_index(messages: Sequence[MessageRecord], message_id: str) -> int:
+    """
+    Position einer Message (Suche vom Ende - Cursor zeigen meist auf die jüngsten Messages)
+
+    Raises:
+        UnknownMessageCursor: Message ID nicht gefunden
+    """
+    key = message_id_key(message_id)
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].uid == key:
+            return index
+    raise UnknownMessageCursor(message_id)
+
+
+def paginate_messages(
+    messages: Sequence[MessageRecord],
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    since: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Seite der Message-Historie (immer chronologisch sortiert)
+
+    - after: bis zu `limit` Messages nach der Cursor-Message
+    - before: die `limit` Messages direkt vor der Cursor-Message
+    - since: bis zu `limit` Messages mit Timestamp > since
+    - ohne Cursor: die jüngsten `limit` Messages
+
+    Args:
+        messages: Message-Liste der Session
+        limit: Seitengröße
+        before: Message ID (exklusiv)
+        after: Message ID (exklusiv)
+        since: Zeitpunkt (exklusiv)
+
+    Returns:
+        Dict mit messages, has_more, before/after Cursor für die Nachbarseiten
+    """
+    if after is not None:
+        start = find_message_index(messages, after) + 1
+        end = min(start + limit, len(messages))
+        has_more = end < len(messages)
+    elif since is not None:
+        start = bisect.bisect_right(messages, timestamp_us(since), key=lambda message: message.ts_us)
+        end = min(start + limit, len(messages))
+        has_more = end < len(messages)
+    else:
+        end = find_message_index(messages, before) if before is not None else len(messages)
+        start = max(0, end - limit)
+        has_more = start > 0
+
+    page: List[MessageRecord] = list(messages[start:end])
+    return {
+        "messages": [message.to_dict() for message in page],
+        "has_more": has_more,
+        "before": page[0].id if page and start > 0 else None,
+        "after": page[-1].id if page else after
+    }
+
+
+def paginate_hot_tail(
+    messages: Sequence[MessageRecord],
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    since: Optional[datetime] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Seite aus dem heißen Tail einer eingefrorenen Historie (siehe ColdHistory)
+
+    Vor dem Tail liegen komprimierte Messages. Liegt die Seite vollständig im
+    Tail, wird sie ohne Entpacken geliefert - mit denselben Cursorn wie
+    paginate_messages über die vollständige Liste.
+
+    Returns:
+        Seite wie paginate_messages oder None, wenn die Seite ältere Messages braucht
+    """
+    if not messages:
+        return None
+    try:
+        if after is None and since is not None and messages[0].ts_us > timestamp_us(since):
+            return None
+        if after is None and since is None:
+            end = find_message_index(messages, before) if before is not None else len(messages)
+            if end < limit:
+                return None
+        page = paginate_messages(messages, limit, before=before, after=after, since=since)
+    except UnknownMessageCursor:
+        # Cursor liegt in den komprimierten Blöcken
+        return None
+
+    if after is None and since is None:
+        page["has_more"] = True
+    page["before"] = page["messages"][0]["id"] if page["messages"] else None
+    return page
@@ -3,15 +3,23 @@ Agent Node Functions für LangGraph Integration
 Vereinfachte Wrapper für Setup- und Gameplay-Agents
 """
 
-from typing import Dict, Any, Union, Literal
-from langchain_core.messages import HumanMessage, AIMessage
+from typing import Dict, Any, Optional, Tuple, Union, Literal
 from langgraph.types import Command
 from langchain_openai import ChatOpenAI
 import logging
+import time
 
 from ..agents.setup_agent import SetupAgent
 from ..agents.gameplay_agent import GameplayAgent
+from ..agents.llm_runner import get_model_name
+from ..agents.opener_pool import get_opener_pool
+from ..agents.response_cache import get_response_cache
+from ..agents.world_state import NEW_CHAPTER_MARKER, WORLD_STATE_TAG, apply_world_update
 from ..config import settings
+from ..models import MessageRecord
+from ..services.stream_pipeline import StreamContext
+from ..services.timing import get_turn_timer, record_stage
+from ..services.usage import UsageCapture, capture_usage, get_token_reservation, record_precomputed_usage
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +36,7 @@ async def get_setup_agent() -> SetupAgent:
         llm = ChatOpenAI(
             base_url=settings.openrouter_base_url,
             api_key=settings.openrouter_api_key,
+            stream_usage=True,  # Usage-Block auch beim Streaming (Cost Accounting)
             model=settings.llm_creator  # Setup nutzt Creator Model
         )
         _setup_agent = SetupAgent(llm)
@@ -41,6 +50,7 @@ async def get_gameplay_agent() -> GameplayAgent:
         llm = ChatOpenAI(
             base_url=settings.openrouter_base_url,
             api_key=settings.openrouter_api_key,
+            stream_usage=True,  # Usage-Block auch beim Streaming (Cost Accounting)
             model=settings.llm_gamemaster  # Gameplay nutzt Gamemaster Model
         )
         _gameplay_agent = GameplayAgent(llm)
@@ -59,19 +69,84 @@ def reset_agent_instances() -> None:
     logger.info("Agent instances reset - will use new configuration on next access")
 
 
+def _message_metadata(agent: Any, usage: UsageCapture, cache_result: Optional[str] = None) -> Dict[str, Any]:
+    """Metadata für AI Messages: Agent, Model, Token-Usage inkl. Kosten und ggf. Cache-Treffer"""
+    metadata: Dict[str, Any] = {
+        "agent": agent.name,
+        "model": get_model_name(agent.llm)
+    }
+    if usage.has_usage:
+        metadata["usage"] = dict(usage.totals)
+    if cache_result is not None:
+        metadata["response_cache"] = cache_result
+    return metadata
+
+
+async def _generate(
+    route: str,
+    agent: Any,
+    messages: list,
+    state: Dict[str, Any],
+    context: Optional[StreamContext] = None
+) -> Tuple[Any, Optional[str]]:
+    """
+    Agent-Antwort über den Response Cache (nur für freigeschaltete Routes)
+
+    Args:
+        context: Stream-Kontext für Marker/Blöcke der Generierung (nur Gameplay)
+
+    Returns:
+        (Command oder Antwort-String, Cache-Ergebnis "exact"/"similar" oder None)
+    """
+    cache = get_response_cache()
+    cached = cache.lookup(route, agent, messages)
+    if cached is not None:
+        logger.debug("%s served response from cache (%s)", agent.name, cached[1],
+                     extra={"session_id": state.get("session_id")})
+        return cached
+    if context is not None:
+        result = await agent.aprocess_message(messages, state, context)
+    else:
+        result = await agent.aprocess_message(messages, state)
+    # Commands (Phasen-Übergänge) hängen am State und werden nie gecacht, spekulative
+    # Turns (Token-Reservierung) ebenso wenig - die Option wird evtl. nie gewählt
+    if isinstance(result, str) and result.strip() and get_token_reservation() is None:
+        cache.store(route, agent, messages, result)
+    return result, None
+
+
+def _enter_node() -> float:
+    """Markiert den Node-Start im Turn-Timer (erste Node = Ende von graph_entry)"""
+    timer = get_turn_timer()
+    if timer is not None:
+        timer.mark_node_entry()
+    return time.perf_counter()
+
+
 async def setup_agent_node(state: Dict[str, Any]) -> Union[Command[Literal["gameplay_agent"]], Dict[str, Any]]:
     """
     Setup Agent Node für LangGraph
     Returns: Command object für Transition oder updated state dict
     """
+    node_start = _enter_node()
     try:
-        logger.info("Setup Agent Node started", extra={"session_id": state.get("session_id")})
+        logger.debug("Setup Agent Node started", extra={"session_id": state.get("session_id")})
         
         agent = await get_setup_agent()
         messages = state.get("messages", [])
         
-        # Agent process_message ruft auf - kann Command oder string zurückgeben
-        result = agent.process_message(messages, state)
+        # Agent aprocess_message ruft auf - kann Command oder string zurückgeben.
+        # Generische Eröffnungen neuer Sessions kommen aus dem Opener Pool, wiederkehrende
+        # Setup-Fragen ggf. aus dem Response Cache (jeweils kein LLM Call)
+        cache_result = None
+        with capture_usage() as usage:
+            opener = get_opener_pool().take(agent, messages)
+            if opener is not None:
+                record_precomputed_usage(opener.usage_by_model)
+                result = opener.content
+                logger.debug("Setup Agent served opener from pool", extra={"session_id": state.get("session_id")})
+            else:
+                result, cache_result = await _generate("setup_agent", agent, messages, state)
         
         if isinstance(result, Command):
             # LangGraph Command - return direkt für automatische Transition
@@ -79,16 +154,14 @@ async def setup_agent_node(state: Dict[str, Any]) -> Union[Command[Literal["game
                        extra={"session_id": state.get("session_id")})
             return result
         else:
-            # String response - erstelle AIMessage und update state
-            ai_message = AIMessage(content=result)
-            updated_messages = messages + [ai_message]
+            # String response - erstelle AI MessageRecord (inkl. Usage), nur das Delta zurückgeben
+            ai_message = MessageRecord.create("ai", result, _message_metadata(agent, usage, cache_result))
             
-            logger.info("Setup Agent returning updated state", 
+            logger.debug("Setup Agent returning updated state", 
                        extra={"session_id": state.get("session_id")})
             
             return {
-                **state,
-                "messages": updated_messages,
+                "messages": [ai_message],
                 "current_agent": "setup_agent"
             }
             
@@ -97,11 +170,11 @@ async def setup_agent_node(state: Dict[str, Any]) -> Union[Command[Literal["game
                     extra={"session_id": state.get("session_id"), "error": str(e)},
                     exc_info=True)
         
-        error_message = AIMessage(content=f"Ein Fehler ist aufgetreten: {str(e)}")
-        return {
-            **state,
-            "messages": state.get("messages", []) + [error_message]
-        }
+        error_message = MessageRecord.create("ai", f"Ein Fehler ist aufgetreten: {str(e)}", {"error": str(e)})
+        return {"messages": [error_message]}
+    
+    finally:
+        record_stage("node:setup_agent", time.perf_counter() - node_start)
 
 
 async def gameplay_agent_node(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -109,36 +182,44 @@ async def gameplay_agent_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Gameplay Agent Node für LangGraph
     Returns: Updated state dict
     """
+    node_start = _enter_node()
     try:
-        logger.info("Gameplay Agent Node started", extra={"session_id": state.get("session_id")})
+        logger.debug("Gameplay Agent Node started", extra={"session_id": state.get("session_id")})
         
         agent = await get_gameplay_agent()
         messages = state.get("messages", [])
         
-        # Agent process_message ruft auf - returned string
-        result = agent.process_message(messages, state)
+        # Agent aprocess_message ruft auf - returned string (Response Cache nur bei Opt-in der Route)
+        context = StreamContext(agent=agent.name)
+        with capture_usage() as usage:
+            result, cache_result = await _generate("gameplay_agent", agent, messages, state, context)
         
-        # String response - erstelle AIMessage und update state
-        ai_message = AIMessage(content=result)
-        updated_messages = messages + [ai_message]
+        # String response - erstelle AI MessageRecord (inkl. Usage), nur das Delta zurückgeben
+        ai_message = MessageRecord.create("ai", result, _message_metadata(agent, usage, cache_result))
         
-        logger.info("Gameplay Agent returning updated state", 
+        logger.debug("Gameplay Agent returning updated state", 
                    extra={"session_id": state.get("session_id")})
         
-        return {
-            **state,
-            "messages": updated_messages,
+        update = {
+            "messages": [ai_message],
             "current_agent": "gameplay_agent",
             "interaction_count": state.get("interaction_count", 0) + 1
         }
+        # Spielwelt-Zustand und Kapitel aus dem (vom Stream entfernten) Zustands-Block bzw. Marker
+        world_update = context.blocks.get(WORLD_STATE_TAG)
+        if world_update:
+            update["world_state"] = apply_world_update(state.get("world_state"), world_update)
+        if NEW_CHAPTER_MARKER in context.markers:
+            update["chapter_count"] = state.get("chapter_count", 0) + 1
+        return update
         
     except Exception as e:
         logger.error("Error in gameplay_agent_node", 
                     extra={"session_id": state.get("session_id"), "error": str(e)},
                     exc_info=True)
         
-        error_message = AIMessage(content=f"Ein Fehler ist aufgetreten: {str(e)}")
-        return {
-            **state,
-            "messages": state.get("messages", []) + [error_message]
-        } 
\ No newline at end of file
+        error_message = MessageRecord.create("ai", f"Ein Fehler ist aufgetreten: {str(e)}", {"error": str(e)})
+        return {"messages": [error_message]}
+    
+    finally:
+        record_stage("node:gameplay_agent", time.perf_counter() - node_start)
@@ -0,0 +1,173 @@
+"""
+TextRPG Session Index
+Inkrementell gepflegter Sekundär-Index über alle Sessions
+
+Der SessionManager aktualisiert den Index bei create/update/delete. Listing-
+Endpoints lesen nur noch aus dem Index: Seiten nach last_updated sortiert,
+Filter über vorberechnete ID-Sets, Aggregat-Counts ohne Scan.
+"""
+
+import bisect
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..models import ChatState
+from ..services.usage import empty_usage
+
+
+# Filterbare Felder des Index
+FILTER_FIELDS = ("story_phase", "current_agent", "active")
+
+SortKey = Tuple[datetime, str]
+
+
+def session_summary(state: ChatState) -> Dict[str, Any]:
+    """Kompakte Session-Übersicht (Basis für /sessions und get_session_info)"""
+    return {
+        "session_id": state.session_id,
+        "active": state.active,
+        "message_count": state.message_count,
+        "created_at": state.created_at.isoformat(),
+        "last_updated": state.last_updated.isoformat(),
+        "processing": state.processing,
+        "current_agent": state.current_agent,
+        "story_phase": state.story_phase,
+        "version": state.version,
+        "token_usage": state.token_usage or empty_usage()
+    }
+
+
+class SessionIndex:
+    """
+    Sekundär-Index: Summaries, Sortierung nach last_updated und Filter-Sets
+
+    Alle Operationen sind O(log n) bzw. O(Seitengröße) - bis auf das Verschieben
+    in der sortierten Liste (memmove, auch bei 50k Sessions im µs-Bereich).
+    """
+
+    def __init__(self):
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._sort_keys: Dict[str, SortKey] = {}
+        self._order: List[SortKey] = []
+        self._filters: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in FILTER_FIELDS}
+        self._counts: Dict[str, Counter] = {field: Counter() for field in FILTER_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._summaries
+
+    def upsert(self, state: ChatState) -> None:
+        """Fügt Session ein oder aktualisiert Summary, Sortierung und Filter-Sets"""
+        session_id = state.session_id
+        previous = self._summaries.get(session_id)
+        summary = session_summary(state)
+        self._summaries[session_id] = summary
+
+        sort_key = (state.last_updated, session_id)
+        old_key = self._sort_keys.get(session_id)
+        if old_key != sort_key:
+            if old_key is not None:
+                self._remove_sort_key(old_key)
+            bisect.insort(self._order, sort_key)
+            self._sort_keys[session_id] = sort_key
+
+        for field in FILTER_FIELDS:
+            value = summary[field]
+            if previous is not None:
+                old_value = previous[field]
+                if old_value == value:
+                    continue
+                self._filters[field][old_value].discard(session_id)
+                self._counts[field][old_value] -= 1
+            self._filters[field].setdefault(value, set()).add(session_id)
+            self._counts[field][value] += 1
+
+    def remove(self, session_id: str) -> bool:
+        """Entfernt Session aus dem Index"""
+        summary = self._summaries.pop(session_id, None)
+        if summary is None:
+            return False
+
+        self._remove_sort_key(self._sort_keys.pop(session_id))
+        for field in FILTER_FIELDS:
+            value = summary[field]
+            self._filters[field][value].discard(session_id)
+            self._counts[field][value] -= 1
+        return True
+
+    def _remove_sort_key(self, sort_key: SortKey) -> None:
+        index = bisect.bisect_left(self._order, sort_key)
+        if index < len(self._order) and self._order[index] == sort_key:
+            del self._order[index]
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._summaries.get(session_id)
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._summaries)
+
+    def counts(self) -> Dict[str, Any]:
+        """Aggregat-Counts (ohne Scan)"""
+        def _non_zero(counter: Counter) -> Dict[str, int]:
+            return {str(key): count for key, count in counter.items() if count > 0}
+
+        return {
+            "total": len(self._summaries),
+            "by_story_phase": _non_zero(self._counts["story_phase"]),
+            "by_current_agent": _non_zero(self._counts["current_agent"]),
+            "active": self._counts["active"][True],
+            "inactive": self._counts["active"][False]
+        }
+
+    def query(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        descending: bool = True,
+        **filters: Any
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Seite von Sessions nach last_updated sortiert
+
+        Args:
+            limit: Seitengröße
+            offset: Anzahl übersprungener Treffer
+            descending: Neueste zuerst
+            **filters: story_phase, current_agent, active (None = kein Filter)
+
+        Returns:
+            (Anzahl Treffer gesamt, Summaries der Seite)
+        """
+        active_filters = [
+            self._filters[field].get(value, set())
+            for field, value in filters.items()
+            if field in FILTER_FIELDS and value is not None
+        ]
+
+        order = reversed(self._order) if descending else iter(self._order)
+
+        if not active_filters:
+            total = len(self._order)
+            keys = [key for _, key in zip(range(offset + limit), order)][offset:]
+            return total, [self._summaries[session_id] for _, session_id in keys]
+
+        active_filters.sort(key=len)
+        matching = set.intersection(*active_filters) if len(active_filters) > 1 else active_filters[0]
+
+        page: List[Dict[str, Any]] = []
+        skipped = 0
+        if matching:
+            for _, session_id in order:
+                if session_id not in matching:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                page.append(self._summaries[session_id])
+                if len(page) >= limit:
+                    break
+
+        return len(matching), page
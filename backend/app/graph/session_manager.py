@@ -3,13 +3,28 @@ TextRPG Session Manager - Command Pattern Migration
 Verwaltet Chat Sessions für Command-basierte LangGraph Workflows
 """
 
-from typing import Dict, Optional, Any, AsyncGenerator
+from typing import Dict, List, Optional, Any, AsyncGenerator, AsyncIterator, Set
 import structlog
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager
 from datetime import datetime, timedelta
 import uuid
 import asyncio
+import time
+import heapq
 
-from ..models import ChatState, ChatMessage, create_human_message
+from ..config import settings
+from ..models import ChatState, MessageRecord, to_message_record
+from ..services.stream_pipeline import StreamContext, get_delivery_pipeline, text_source
+from ..services.timing import TurnTimer, record_stage, timed_stage, turn_timer
+from ..services.usage import UsageCapture, add_usage, capture_usage, empty_usage
+from ..services.tracing import session_tracing
+from .history_compactor import HistoryCompactor
+from .idempotency import IDEMPOTENCY_METADATA_KEY, IdempotencyCache, IdempotentTurn
+from .message_history import paginate_hot_tail, paginate_messages
+from .session_index import SessionIndex, session_summary
+from .speculation import Speculator
+from .session_store import SessionLockTimeout, SessionStore, create_session_store
+from .turn_journal import JournalTurn, TurnJournal, output_messages
 from .workflow import get_workflow
 
 logger = structlog.get_logger()
@@ -21,9 +36,39 @@ class SessionManager:
     Command Pattern Migration - Vereinfachtes Session Management
     """
     
-    def __init__(self):
-        """Initialisiert Session Manager"""
+    def __init__(self, store: Optional[SessionStore] = None, journal: Optional[TurnJournal] = None):
+        """
+        Initialisiert Session Manager
+        
+        Args:
+            store: Geteiltes Session-Backend für mehrere Worker (None = Sessions nur im Prozess)
+            journal: Write-ahead Turn Journal (None = Turns nicht journalisiert)
+        """
         self.active_sessions: Dict[str, ChatState] = {}
+        self.store = store
+        self.journal = journal
+        self.speculator: Optional[Speculator] = None
+        if settings.speculation_enabled:
+            self.speculator = Speculator(
+                top_k=settings.speculation_top_k,
+                max_concurrency=settings.speculation_max_concurrency,
+                session_token_budget=settings.speculation_session_token_budget,
+                fields=self.JOURNALED_FIELDS
+            )
+        self.idempotency = IdempotencyCache(
+            ttl_seconds=settings.idempotency_ttl_seconds,
+            max_entries=settings.idempotency_max_entries
+        )
+        self._stored_ids: Set[str] = set()
+        self._store_writes: Dict[str, asyncio.Task] = {}
+        self.index = SessionIndex()
+        self.compactor = HistoryCompactor(
+            idle_seconds=settings.cold_history_idle_seconds,
+            interval=settings.cold_history_interval_seconds,
+            block_size=settings.cold_history_block_messages,
+            codec=settings.cold_history_codec,
+            hot_messages=settings.cold_history_hot_messages
+        )
         self.workflow = None
     
     async def initialize(self) -> None:
@@ -58,16 +103,19 @@ class SessionManager:
         )
         
         self.active_sessions[session_id] = state
+        self.index.upsert(state)
+        self._schedule_store_write(session_id, self._store_save, state)
         
-        logger.info("New session created", session_id=session_id)
+        logger.info("New session created", session_id=session_id, event_type="session_lifecycle")
         return session_id
     
-    def get_session(self, session_id: str) -> Optional[ChatState]:
+    def get_session(self, session_id: str, full_history: bool = True) -> Optional[ChatState]:
         """
         Holt bestehende Session
         
         Args:
             session_id: Session ID
+            full_history: Eingefrorene Historie entpacken (False = nur heißer Tail in messages)
             
         Returns:
             ChatState oder None wenn nicht gefunden
@@ -75,9 +123,10 @@ class SessionManager:
         
         session = self.active_sessions.get(session_id)
         if session:
-            logger.debug("Session retrieved", session_id=session_id)
+            self.compactor.touch(session, thaw=full_history)
+            logger.debug("Session retrieved", session_id=session_id, event_type="session_lookup")
         else:
-            logger.warning("Session not found", session_id=session_id)
+            logger.warning("Session not found", session_id=session_id, event_type="session_lookup")
         
         return session
     
@@ -95,11 +144,13 @@ class SessionManager:
         
         if session_id in self.active_sessions:
             state.last_updated = datetime.utcnow()
+            state.version += 1
             self.active_sessions[session_id] = state
-            logger.debug("Session updated", session_id=session_id)
+            self.index.upsert(state)
+            logger.debug("Session updated", session_id=session_id, event_type="session_lookup")
             return True
         else:
-            logger.warning("Cannot update non-existent session", session_id=session_id)
+            logger.warning("Cannot update non-existent session", session_id=session_id, event_type="session_lookup")
             return False
     
     def delete_session(self, session_id: str) -> bool:
@@ -114,45 +165,212 @@ class SessionManager:
         """
         
         if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
-            logger.info("Session deleted", session_id=session_id)
+            self.compactor.forget(self.active_sessions.pop(session_id))
+            self.index.remove(session_id)
+            self._schedule_store_write(session_id, self._store_delete, session_id)
+            if self.journal is not None:
+                self.journal.forget(session_id)
+            self.idempotency.forget_session(session_id)
+            if self.speculator is not None:
+                self.speculator.forget(session_id)
+            self._end_session_trace(session_id)
+            logger.info("Session deleted", session_id=session_id, event_type="session_lifecycle")
             return True
         else:
             logger.warning("Cannot delete non-existent session", session_id=session_id)
             return False
     
+    def restore_session(self, state: ChatState) -> bool:
+        """
+        Übernimmt einen wiederhergestellten State (Snapshot Restore, Session-Migration)
+        
+        Eine bestehende Session mit derselben ID wird ersetzt, außer sie verarbeitet
+        gerade eine Message. Die Version bleibt monoton, damit ETags sich ändern.
+        
+        Args:
+            state: Dekodierter ChatState
+            
+        Returns:
+            True wenn übernommen, False wenn die bestehende Session gerade beschäftigt ist
+        """
+        
+        session_id = state.session_id
+        existing = self.active_sessions.get(session_id)
+        if existing is not None:
+            if existing.processing:
+                logger.warning("Cannot restore session while processing", session_id=session_id, event_type="session_lifecycle")
+                return False
+            state.version = max(state.version, existing.version)
+            self.compactor.forget(existing)
+        
+        state.processing = False
+        self.active_sessions[session_id] = state
+        self.update_session(session_id, state)
+        self._schedule_store_write(session_id, self._store_save, state)
+        
+        logger.info("Session restored",
+                   session_id=session_id,
+                   message_count=len(state.messages),
+                   replaced=existing is not None,
+                   event_type="session_lifecycle")
+        return True
+    
+    def _end_session_trace(self, session_id: str) -> None:
+        """Gibt den Tracing-Eintrag der Session frei (SessionTracker ist an den Session-Lifecycle gebunden)"""
+        if settings.langsmith_tracing:
+            from ..services import get_langchain_llm_service
+            get_langchain_llm_service().end_session(session_id)
+    
     async def stream_process_message(
         self,
         session_id: str,
-        user_message: str
+        user_message: str,
+        idempotency_key: Optional[str] = None
     ) -> AsyncGenerator[str, None]:
         """
         Verarbeitet eine User-Message und streamt die AI-Response.
         Nutzt LangGraph für Agent-Transitions via Commands.
         
+        Mit Session Store läuft der Turn unter dem verteilten Session-Lock auf dem
+        aktuellsten State aus dem Store und wird vor der Lock-Freigabe gespeichert.
+        
+        Mit Idempotency-Key läuft der Turn unabhängig vom Client im Hintergrund;
+        Duplikate (Retries) bekommen das gespeicherte Ergebnis bzw. hängen sich an
+        den laufenden Stream an, statt einen neuen Turn auszulösen.
+        
         Args:
             session_id: Session ID
             user_message: User input
+            idempotency_key: Optionaler Client-Key für Retries derselben Submission
             
         Yields:
             Streamed response chunks (optimized for performance)
         """
-        state = self.get_session(session_id)
+        if idempotency_key is None:
+            async with aclosing(self._run_turn(session_id, user_message)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+        
+        entry, created = self.idempotency.claim(session_id, idempotency_key, user_message)
+        if entry.message != user_message:
+            self.idempotency.count("conflict")
+            logger.warning("Idempotency key reused for a different message", session_id=session_id, event_type="message_flow")
+            yield "Dieser Idempotency-Key wurde bereits für eine andere Nachricht verwendet."
+            return
+        if created:
+            entry.task = asyncio.create_task(self._run_idempotent_turn(session_id, user_message, entry))
+        else:
+            self.idempotency.count("replay" if entry.done else "attach")
+            logger.info("Duplicate turn submission served from idempotency cache",
+                       session_id=session_id,
+                       in_flight=not entry.done,
+                       event_type="message_flow")
+        
+        async for chunk in entry.follow():
+            yield chunk
+    
+    async def _run_idempotent_turn(self, session_id: str, user_message: str, entry: IdempotentTurn) -> None:
+        """Turn im Hintergrund - Chunks gehen an den Cache-Eintrag, dem alle Requests folgen"""
+        try:
+            async with aclosing(self._run_turn(session_id, user_message, entry.key)) as chunks:
+                async for chunk in chunks:
+                    entry.append(chunk)
+        except Exception as e:
+            logger.error("Idempotent turn failed", session_id=session_id, error=str(e), exc_info=True)
+            entry.append(f"\n\nEin Fehler ist aufgetreten: {str(e)}")
+        finally:
+            entry.finish()
+            # Nicht ausgeführte (Lock-Timeout) oder zurückgerollte Turns darf ein Retry neu senden
+            state = self.active_sessions.get(session_id)
+            if state is None or self._find_keyed_turn(state, entry.key) is None:
+                self.idempotency.discard(session_id, entry.key)
+    
+    @staticmethod
+    def _find_keyed_turn(state: ChatState, key: str, window: int = 50) -> Optional[int]:
+        """Index der User Message mit diesem Idempotency-Key unter den letzten Messages"""
+        messages = state.messages
+        for index in range(len(messages) - 1, max(len(messages) - window, 0) - 1, -1):
+            message = messages[index]
+            if message.type == "human" and message.metadata.get(IDEMPOTENCY_METADATA_KEY) == key:
+                return index
+        return None
+    
+    async def _run_turn(
+        self,
+        session_id: str,
+        user_message: str,
+        idempotency_key: Optional[str] = None
+    ) -> AsyncGenerator[str, None]:
+        """Turn unter Session-Lock (siehe stream_process_message)"""
+        with turn_timer(session_id) as timer:
+            async with AsyncExitStack() as stack:
+                if self.store is not None:
+                    try:
+                        with timed_stage("session_lock"):
+                            await stack.enter_async_context(self.store.lock(session_id))
+                            await self._refresh_from_store(session_id)
+                    except SessionLockTimeout:
+                        logger.warning("Session lock timeout", session_id=session_id, event_type="session_lookup")
+                        timer.finish()
+                        yield "Die Session wird gerade an anderer Stelle verarbeitet. Bitte versuche es gleich noch einmal."
+                        return
+                
+                if idempotency_key is not None:
+                    # Duplikat eines bereits verarbeiteten Turns (Neustart, anderer Worker)
+                    state = self.get_session(session_id)
+                    index = self._find_keyed_turn(state, idempotency_key) if state else None
+                    if index is not None:
+                        self.idempotency.count("history")
+                        timer.finish()
+                        if state.messages[index].content != user_message:
+                            yield "Dieser Idempotency-Key wurde bereits für eine andere Nachricht verwendet."
+                            return
+                        for message in state.messages[index + 1:]:
+                            if message.type == "human":
+                                break
+                            yield message.content
+                        return
+                    self.idempotency.count("new")
+                
+                chunks = await stack.enter_async_context(
+                    aclosing(self._process_message(session_id, user_message, timer, idempotency_key))
+                )
+                async for chunk in chunks:
+                    yield chunk
+    
+    async def _process_message(
+        self,
+        session_id: str,
+        user_message: str,
+        timer: TurnTimer,
+        idempotency_key: Optional[str] = None
+    ) -> AsyncGenerator[str, None]:
+        """Turn-Verarbeitung (siehe stream_process_message)"""
+        with timed_stage("session_lookup"):
+            state = self.get_session(session_id)
         if not state:
             yield "Session nicht gefunden."
             return
         
+        turn: Optional[JournalTurn] = None
+        pre_turn_count = len(state.messages)
+        result_applied = False
         try:
+            # Füge User-Message hinzu (mit dem processing-Update, damit die Version sie abdeckt)
+            human_message = MessageRecord.create(
+                "human", user_message, {IDEMPOTENCY_METADATA_KEY: idempotency_key} if idempotency_key else None
+            )
+            state.messages.append(human_message)
             state.processing = True
             self.update_session(session_id, state)
+            if self.journal is not None:
+                turn = self.journal.begin(session_id, human_message, pre_turn_count)
             
             logger.info("Starting LangGraph workflow with Command support",
                        session_id=session_id,
-                       message_preview=user_message[:50])
-            
-            # Füge User-Message hinzu
-            user_msg = create_human_message(user_message)
-            state.messages.append(user_msg)
+                       message_length=len(user_message),
+                       event_type="message_flow")
             
             # Bereite State für LangGraph vor
             graph_state = {
@@ -163,6 +381,7 @@ class SessionManager:
                 "handoff_data": state.handoff_data,
                 "chapter_count": state.chapter_count,
                 "interaction_count": state.interaction_count,
+                "world_state": state.world_state,
                 "active": state.active,
                 "processing": state.processing,
                 "created_at": state.created_at,
@@ -170,90 +389,365 @@ class SessionManager:
                 "end_trigger": state.end_trigger
             }
             
-            # LangGraph Workflow ausführen
-            result = await self.workflow.ainvoke(graph_state)
+            # LangGraph Workflow ausführen - messages ist ein Append-only Channel, die
+            # Session-Liste wird nicht kopiert, Nodes hängen ihre Messages direkt an
+            base_count = len(state.messages)
+            timer.mark_graph_start()
+            speculative = None
+            if self.speculator is not None:
+                with timed_stage("speculation_wait"):
+                    speculative = await self.speculator.claim(state, user_message, pre_turn_count)
+            if speculative is not None:
+                # Vorab generierte Fortsetzung übernehmen - neue Records, damit IDs und
+                # Zeitstempel hinter der User Message liegen
+                state.messages.extend(
+                    MessageRecord.create(message.type, message.content, {**message.metadata, "speculative": True})
+                    for message in speculative.messages
+                )
+                result = {"messages": state.messages, **speculative.fields}
+                turn_usage = speculative.usage
+            else:
+                with capture_usage() as turn_usage, session_tracing(session_id, agent=state.current_agent):
+                    result = await self.workflow.ainvoke(graph_state)
+            self._add_turn_usage(state, turn_usage)
             
-            logger.info(f"LangGraph workflow completed. Final state keys: {list(result.keys())}")
+            logger.debug("LangGraph workflow completed", session_id=session_id, state_keys=list(result), event_type="stream_chunk")
             
-            # Extract und stream die Response
-            updated_messages = result.get("messages", [])
-            if updated_messages and len(updated_messages) > len(state.messages):
-                # Neue Messages wurden hinzugefügt
-                for new_message in updated_messages[len(state.messages):]:
-                    # Handle both ChatMessage and LangChain AIMessage objects
-                    if hasattr(new_message, 'type') and new_message.type == "ai":
-                        response_text = new_message.content
-                        logger.info(f"Using ChatMessage content: {response_text[:50]}...", session_id=session_id)
-                    elif hasattr(new_message, 'content'):
-                        # LangChain AIMessage object
-                        response_text = str(new_message.content)
-                        logger.info(f"Converting LangChain object to string: {type(new_message)}", session_id=session_id)
-                    else:
-                        response_text = str(new_message)
-                        logger.error(f"Unknown message format, converting to string: {type(new_message)}", session_id=session_id)
-                    
-                    # Ensure response_text is actually a string
-                    if not isinstance(response_text, str):
-                        response_text = str(response_text)
-                        logger.warning(f"Response was not a string, converted: {type(response_text)}", session_id=session_id)
-                    
-                    # OPTIMIZED STREAMING: Chunk text into word groups instead of single characters
-                    words = response_text.split(' ')
-                    current_chunk = ""
+            # Extract und stream die Response - neue Messages werden zu MessageRecords kanonisiert
+            updated_messages = result.get("messages", state.messages)
+            for index in range(base_count, len(updated_messages)):
+                updated_messages[index] = to_message_record(updated_messages[index])
+            new_messages = updated_messages[base_count:]
+            if turn is not None:
+                # Generierung durable machen, bevor der Client sie sieht
+                with timed_stage("journal_fsync"):
+                    await turn.record_output(
+                        new_messages,
+                        {key: result[key] for key in self.JOURNALED_FIELDS if key in result},
+                        {"totals": turn_usage.totals, "models": turn_usage.models} if turn_usage.has_usage else None
+                    )
+            
+            # Ergebnis sofort übernehmen: die Messages liegen über den Append-only Channel
+            # bereits in der Session - ein Abbruch während der Auslieferung darf die
+            # restlichen Felder (current_agent, story_phase, handoff_data) nicht verlieren
+            write_back_start = time.perf_counter()
+            state.messages = updated_messages
+            self._apply_turn_fields(state, result)
+            result_applied = True
+            record_stage("state_write_back", time.perf_counter() - write_back_start)
+            
+            if new_messages:
+                for new_message in new_messages:
+                    response_text = new_message.content
+                    logger.debug("Streaming AI message", session_id=session_id, length=len(response_text), event_type="stream_chunk")
                     
-                    for i, word in enumerate(words):
-                        current_chunk += word
-                        
-                        # Add space except for last word
-                        if i < len(words) - 1:
-                            current_chunk += " "
-                        
-                        # Send chunks of 3-5 words for natural reading flow
-                        if len(current_chunk.split()) >= 4 or i == len(words) - 1:
-                            if current_chunk.strip():  # Only yield non-empty chunks
-                                yield current_chunk
-                                await asyncio.sleep(0.05)  # Much faster: 20 chunks per second
-                                current_chunk = ""
+                    # Delivery-Pipeline: Frames an Absatz-, Zeilen- und Satzgrenzen (Markdown bleibt intakt)
+                    context = StreamContext(agent=new_message.metadata.get("agent"))
+                    async with aclosing(get_delivery_pipeline().run(text_source(response_text), context)) as frames:
+                        async for frame in frames:
+                            if not frame.strip():
+                                continue
+                            flush_start = time.perf_counter()
+                            yield frame
+                            record_stage("sse_flush", time.perf_counter() - flush_start)
             else:
                 response_text = "Keine Antwort erhalten."
                 yield response_text
             
-            # Update session state mit LangGraph Result
-            state.messages = updated_messages
-            
-            # Update andere State-Felder
-            if "handoff_data" in result:
-                state.handoff_data = result["handoff_data"]
-            if "chapter_count" in result:
-                state.chapter_count = result["chapter_count"]
-            if "interaction_count" in result:
-                state.interaction_count = result["interaction_count"]
-            if "current_agent" in result:
-                state.current_agent = result["current_agent"]
-            if "story_phase" in result:
-                state.story_phase = result["story_phase"]
-            
             state.processing = False
             self.update_session(session_id, state)
+            if turn is not None:
+                turn.commit()
+            
+            # Während der Spieler liest: Folge-Turns für die angebotenen Optionen vorab generieren
+            if self.speculator is not None:
+                self.speculator.schedule(state, self.workflow)
             
             logger.info("LangGraph workflow streaming completed", 
-                       session_id=session_id)
+                       session_id=session_id,
+                       event_type="message_flow")
 
         except Exception as e:
             logger.error("Error in LangGraph workflow processing", 
                          session_id=session_id,
                          error=str(e),
                          exc_info=True)
+            if turn is not None and turn.output is None:
+                self._rollback_turn(state, turn, pre_turn_count, str(e))
             yield f"\n\nEin Fehler ist aufgetreten: {str(e)}"
         
         finally:
+            if turn is not None and not turn.closed:
+                # Client-Disconnect oder Abbruch mitten im Turn
+                if turn.output is not None:
+                    # Messages und Felder liegen bereits in der Session (bzw. im Journal)
+                    if not result_applied:
+                        self._apply_turn_fields(state, turn.output["fields"])
+                    turn.commit("recovered")
+                    logger.info("Interrupted turn completed from journal", session_id=session_id, event_type="message_flow")
+                else:
+                    self._rollback_turn(state, turn, pre_turn_count, "interrupted")
+            elif turn is None and not result_applied and len(state.messages) > pre_turn_count + 1:
+                # Ohne Journal: Teil-Ausgabe eines abgebrochenen Graph-Laufs verwerfen,
+                # die User Message bleibt (wie vor dem Append-only Channel)
+                del state.messages[pre_turn_count + 1:]
+                logger.info("Partial turn output discarded", session_id=session_id, event_type="message_flow")
+            
             # Ensure session is not stuck in processing
             if state:
                 state.processing = False
                 self.update_session(session_id, state)
+                if self.store is not None:
+                    await self.save_session(session_id)
+            timer.finish()
+            
+            logger.debug("LangGraph workflow stream context finished.", 
+                       session_id=session_id,
+                       event_type="stream_chunk")
+    
+    # Vom Graph geänderte State-Felder, die mit dem Turn journalisiert werden
+    JOURNALED_FIELDS = ("handoff_data", "chapter_count", "interaction_count", "world_state", "current_agent", "story_phase")
+    
+    @classmethod
+    def _apply_turn_fields(cls, state: ChatState, fields: Dict[str, Any]) -> None:
+        """Übernimmt die vom Graph geänderten State-Felder"""
+        for key in cls.JOURNALED_FIELDS:
+            if key in fields:
+                setattr(state, key, fields[key])
+    
+    def _rollback_turn(self, state: ChatState, turn: JournalTurn, pre_turn_count: int, reason: str) -> None:
+        """Setzt die Session auf den Stand vor dem Turn zurück (keine Generierung vorhanden)"""
+        del state.messages[pre_turn_count:]
+        turn.abort(reason)
+        logger.info("Turn rolled back", session_id=state.session_id, reason=reason, event_type="message_flow")
+    
+    async def recover_turns(self) -> Dict[str, int]:
+        """
+        Schließt unvollständige Turns abgestürzter Prozesse aus dem Journal ab
+        
+        Turns mit journalisierter Generierung werden in die Session übernommen
+        (idempotent über Message IDs), Turns ohne Generierung zurückgerollt. Ohne
+        Session Store überleben Sessions den Neustart nicht - ihre Turns werden
+        als "orphaned" nur als Ergebnis für get_last_turn gemerkt.
+        
+        Returns:
+            Dict mit Anzahl recovered / rolled_back / orphaned Turns
+        """
+        
+        counts = {"recovered": 0, "rolled_back": 0, "orphaned": 0}
+        if self.journal is None:
+            return counts
+        
+        recovered = await asyncio.to_thread(self.journal.recover)
+        for turn in recovered:
+            session_id = turn["session_id"]
+            output = turn["output"]
+            turn["status"] = "rolled_back"
+            if output is not None:
+                try:
+                    async with self.session_lock(session_id):
+                        state = await self.load_session(session_id)
+                        if state is None:
+                            # Session existiert nicht mehr - Generierung bleibt nur über get_last_turn abrufbar
+                            turn["status"] = "orphaned"
+                        else:
+                            known = {message.uid for message in state.messages}
+                            for message in [turn["user_message"], *output_messages(output)]:
+                                if message.uid not in known:
+                                    state.messages.append(message)
+                            self._apply_turn_fields(state, output["fields"])
+                            if output["usage"]:
+                                turn_usage = UsageCapture()
+                                turn_usage.totals = output["usage"]["totals"]
+                                turn_usage.models = output["usage"]["models"]
+                                self._add_turn_usage(state, turn_usage)
+                            self.update_session(session_id, state)
+                            await self.save_session(session_id)
+                            turn["status"] = "recovered"
+                except SessionLockTimeout:
+                    logger.warning("Session locked during turn recovery", session_id=session_id, event_type="session_lifecycle")
+            counts[turn["status"]] += 1
+        
+        self.journal.finish_recovery(recovered)
+        if recovered:
+            logger.info("Turn journal recovered", **counts, event_type="session_lifecycle")
+        return counts
+    
+    def get_last_turn(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Ergebnis des letzten abgeschlossenen Turns einer Session
+        
+        Nach einem Disconnect kann der Client die bereits generierte Antwort
+        abholen, ohne einen neuen LLM Call auszulösen.
+        
+        Args:
+            session_id: Session ID
+            
+        Returns:
+            Dict mit turn_id, status und messages oder None
+        """
+        
+        if self.journal is None:
+            return None
+        return self.journal.last_turn(session_id)
+    
+    async def load_session(self, session_id: str, full_history: bool = True) -> Optional[ChatState]:
+        """
+        Holt eine Session und aktualisiert sie vorher aus dem Session Store
+        
+        Ohne Store identisch zu get_session. Mit Store wird nur geladen, wenn dort
+        eine neuere Version liegt als im Cache dieses Workers.
+        
+        Args:
+            session_id: Session ID
+            full_history: Eingefrorene Historie entpacken (siehe get_session)
+            
+        Returns:
+            ChatState oder None wenn nicht gefunden
+        """
+        
+        if self.store is not None:
+            with timed_stage("store_refresh"):
+                await self._refresh_from_store(session_id)
+        return self.get_session(session_id, full_history)
+    
+    async def save_session(self, session_id: str) -> None:
+        """
+        Schreibt eine Session in den Session Store (wartet auf vorherige Writes)
+        
+        Args:
+            session_id: Session ID
+        """
+        
+        state = self.active_sessions.get(session_id)
+        if self.store is None or state is None:
+            return
+        task = self._schedule_store_write(session_id, self._store_save, state)
+        if task is not None:
+            await task
+    
+    @asynccontextmanager
+    async def session_lock(self, session_id: str) -> AsyncIterator[None]:
+        """
+        Verteilter Lock einer Session (ohne Store: kein Lock)
+        
+        Raises:
+            SessionLockTimeout: Lock nicht innerhalb des Timeouts verfügbar
+        """
+        
+        if self.store is None:
+            yield
+            return
+        async with self.store.lock(session_id):
+            yield
+    
+    async def flush_store(self) -> None:
+        """Wartet auf alle ausstehenden Store-Writes"""
+        while self._store_writes:
+            await asyncio.gather(*list(self._store_writes.values()), return_exceptions=True)
+    
+    async def close(self) -> None:
+        """Ausstehende Writes abschließen und Session Store schließen"""
+        await self.stop_history_compaction()
+        if self.journal is not None:
+            await self.journal.close()
+        if self.store is not None:
+            await self.flush_store()
+            await self.store.close()
+    
+    async def _refresh_from_store(self, session_id: str) -> None:
+        """Ersetzt die gecachte Session, wenn der Store eine neuere Version hat"""
+        
+        # Eigene ausstehende Writes zuerst abschließen
+        pending = self._store_writes.get(session_id)
+        if pending is not None:
+            await asyncio.gather(pending, return_exceptions=True)
+        
+        local = self.active_sessions.get(session_id)
+        remote_version = await self.store.version(session_id)
+        if remote_version is None:
+            if local is not None and session_id in self._stored_ids:
+                # Von einem anderen Worker gelöscht
+                self.compactor.forget(self.active_sessions.pop(session_id))
+                self.index.remove(session_id)
+                self._stored_ids.discard(session_id)
+            return
+        if local is not None and local.version >= remote_version:
+            return
+        
+        state = await self.store.load(session_id)
+        if state is None:
+            return
+        if local is not None:
+            self.compactor.forget(local)
+        self.active_sessions[session_id] = state
+        self.index.upsert(state)
+        self._stored_ids.add(session_id)
+        logger.debug("Session refreshed from store",
+                    session_id=session_id,
+                    version=state.version,
+                    cached_version=local.version if local is not None else None,
+                    event_type="session_lookup")
+    
+    def _schedule_store_write(self, session_id: str, write, *args: Any) -> Optional[asyncio.Task]:
+        """
+        Store-Write im Hintergrund, pro Session in Aufruf-Reihenfolge
+        
+        Returns:
+            Task des Writes oder None (kein Store oder kein laufender Event Loop)
+        """
+        
+        if self.store is None:
+            return None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning("No event loop - session not written to store", session_id=session_id)
+            return None
+        
+        previous = self._store_writes.get(session_id)
+        
+        async def run_write() -> None:
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            try:
+                await write(*args)
+            except Exception as e:
+                logger.error("Session store write failed", session_id=session_id, error=str(e), exc_info=True)
+            finally:
+                if self._store_writes.get(session_id) is task:
+                    del self._store_writes[session_id]
+        
+        task = asyncio.create_task(run_write())
+        self._store_writes[session_id] = task
+        return task
+    
+    async def _store_save(self, state: ChatState) -> None:
+        # Eingefrorene Historie vor dem Encode entpacken
+        self.compactor.thaw(state)
+        await self.store.save(state)
+        self._stored_ids.add(state.session_id)
+    
+    async def _store_delete(self, session_id: str) -> None:
+        await self.store.delete(session_id)
+        self._stored_ids.discard(session_id)
+    
+    def get_speculation_stats(self, session_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Stats der spekulativen Vorab-Generierung
+        
+        Args:
+            session_id: Session ID (None = Aggregat über alle Sessions)
             
-            logger.info("LangGraph workflow stream context finished.", 
-                       session_id=session_id)
+        Returns:
+            Dict mit Hit Rate, verschwendeten Tokens und gesparter Latenz oder None (deaktiviert)
+        """
+        
+        if self.speculator is None:
+            return None
+        if session_id is None:
+            return self.speculator.stats()
+        return self.speculator.session_stats(session_id)
     
     def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -266,33 +760,191 @@ class SessionManager:
             Session info dict oder None
         """
         
-        state = self.get_session(session_id)
+        state = self.get_session(session_id, full_history=False)
         if state is None:
             return None
         
+        return session_summary(state)
+    
+    def get_message_history(
+        self,
+        session_id: str,
+        limit: int = 50,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        since: Optional[datetime] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Paginierte Message-Historie einer Session
+        
+        Args:
+            session_id: Session ID
+            limit: Seitengröße
+            before: Message ID - ältere Messages laden
+            after: Message ID - neuere Messages laden (Incremental Sync)
+            since: Zeitpunkt - Messages danach laden (Incremental Sync)
+            
+        Returns:
+            Dict mit version, message_count und Seite oder None wenn Session nicht existiert
+            
+        Raises:
+            UnknownMessageCursor: before/after verweist auf keine Message der Session
+        """
+        
+        state = self.get_session(session_id, full_history=False)
+        if state is None:
+            return None
+        
+        with timed_stage("history_page"):
+            page = None
+            if state.cold_history is not None and state.cold_history.frozen:
+                # Seiten im heißen Tail ohne Entpacken ausliefern
+                page = paginate_hot_tail(state.messages, limit, before=before, after=after, since=since)
+                if page is None:
+                    self.compactor.thaw(state)
+            if page is None:
+                page = paginate_messages(state.messages, limit, before=before, after=after, since=since)
+        
         return {
-            "session_id": session_id,
-            "active": state.active,
-            "message_count": len(state.messages),
-            "created_at": state.created_at.isoformat(),
-            "last_updated": state.last_updated.isoformat(),
-            "processing": state.processing,
-            "current_agent": state.current_agent
+            "version": state.version,
+            "message_count": state.message_count,
+            **page
         }
     
+    def _add_turn_usage(self, state: ChatState, turn_usage: UsageCapture) -> None:
+        """Addiert die Usage eines Turns auf die Session-Totals (gesamt und pro Model)"""
+        if not turn_usage.has_usage:
+            return
+        
+        if not state.token_usage:
+            state.token_usage = empty_usage()
+        add_usage(state.token_usage, turn_usage.totals)
+        for model, usage in turn_usage.models.items():
+            add_usage(state.token_usage_by_model.setdefault(model, empty_usage()), usage)
+        
+        logger.info("Turn token usage",
+                   session_id=state.session_id,
+                   prompt_tokens=turn_usage.totals["prompt_tokens"],
+                   completion_tokens=turn_usage.totals["completion_tokens"],
+                   cached_tokens=turn_usage.totals["cached_tokens"],
+                   cost_usd=turn_usage.totals["cost_usd"],
+                   session_cost_usd=state.token_usage["cost_usd"],
+                   event_type="message_flow")
+    
+    def get_top_sessions_by_cost(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Teuerste Sessions nach berechneten LLM-Kosten
+        
+        Args:
+            limit: Anzahl Sessions (Top-N)
+            
+        Returns:
+            Liste mit Session ID, Usage-Totals und Aufschlüsselung pro Model
+        """
+        top = heapq.nlargest(
+            limit,
+            self.active_sessions.values(),
+            key=lambda state: (state.token_usage.get("cost_usd", 0.0), state.token_usage.get("total_tokens", 0))
+        )
+        return [
+            {
+                "session_id": state.session_id,
+                "current_agent": state.current_agent,
+                "message_count": state.message_count,
+                "token_usage": state.token_usage or empty_usage(),
+                "token_usage_by_model": state.token_usage_by_model
+            }
+            for state in top
+        ]
+    
     def get_all_sessions(self) -> Dict[str, Dict[str, Any]]:
         """
-        Holt Übersicht aller Sessions
+        Holt Übersicht aller Sessions (aus dem Session-Index, ohne Einzel-Lookups)
         
         Returns:
             Dict mit Session IDs und deren Info
         """
         
+        return self.index.all()
+    
+    def list_sessions(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        order: str = "desc",
+        story_phase: Optional[str] = None,
+        current_agent: Optional[str] = None,
+        active: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Paginierte, gefilterte Session-Liste nach last_updated sortiert
+        
+        Args:
+            limit: Seitengröße
+            offset: Anzahl übersprungener Sessions
+            order: "desc" (neueste zuerst) oder "asc"
+            story_phase: Filter auf Story-Phase
+            current_agent: Filter auf aktuellen Agent
+            active: Filter auf Active-Flag
+            
+        Returns:
+            Dict mit total (Treffer), Pagination-Infos und Sessions der Seite
+        """
+        
+        total, sessions = self.index.query(
+            limit=limit,
+            offset=offset,
+            descending=order != "asc",
+            story_phase=story_phase,
+            current_agent=current_agent,
+            active=active
+        )
         return {
-            session_id: self.get_session_info(session_id)
-            for session_id in self.active_sessions.keys()
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "order": order,
+            "sessions": sessions
         }
     
+    def get_session_counts(self) -> Dict[str, Any]:
+        """
+        Aggregat-Counts über alle Sessions (gesamt, pro Story-Phase, Agent und Active-Flag)
+        
+        Returns:
+            Dict mit Counts
+        """
+        
+        return self.index.counts()
+    
+    def compact_idle_sessions(self) -> int:
+        """
+        Komprimiert die Historie aller idle Sessions (sonst periodisch im Background)
+        
+        Returns:
+            Anzahl neu eingefrorener Sessions
+        """
+        
+        return self.compactor.compact(self.active_sessions.values())
+    
+    def get_cold_history_stats(self) -> Dict[str, Any]:
+        """
+        Cold-History Stats: eingefrorene Sessions, Kompressionsrate, Zugriffskosten
+        
+        Returns:
+            Dict mit Stats
+        """
+        
+        return self.compactor.stats()
+    
+    async def start_history_compaction(self) -> None:
+        """Startet den periodischen History Compactor"""
+        await self.compactor.start(lambda: self.active_sessions)
+    
+    async def stop_history_compaction(self) -> None:
+        """Stoppt den periodischen History Compactor"""
+        await self.compactor.stop()
+    
     def cleanup_inactive_sessions(self, max_age_hours: int = 24) -> int:
         """
         Räumt alte/inactive Sessions auf
@@ -338,7 +990,20 @@ async def get_session_manager() -> SessionManager:
     global _session_manager
     
     if _session_manager is None:
-        _session_manager = SessionManager()
+        journal = None
+        if settings.turn_journal_enabled:
+            journal = TurnJournal(
+                settings.turn_journal_dir,
+                fsync_interval=settings.turn_journal_fsync_interval_ms / 1000,
+                segment_bytes=settings.turn_journal_segment_bytes
+            )
+        _session_manager = SessionManager(create_session_store(
+            settings.session_backend,
+            sqlite_path=settings.session_sqlite_path,
+            redis_url=settings.session_redis_url,
+            lock_timeout=settings.session_lock_timeout_seconds,
+            lock_ttl=settings.session_lock_ttl_seconds
+        ), journal)
         await _session_manager.initialize()
     
     return _session_manager 
\ No newline at end of file
@@ -0,0 +1,289 @@
+"""
+TextRPG Session Store
+Geteiltes Session-Backend für mehrere Worker-Prozesse (gunicorn -w N)
+
+Der SessionManager hält Sessions weiterhin als Cache im Prozess. Ist ein Store
+konfiguriert, wird eine Session vor jedem Turn unter einem verteilten Lock aus
+dem Store aktualisiert (nur wenn dort eine neuere Version liegt) und nach dem
+Turn zurückgeschrieben. States werden im Snapshot-Format gespeichert; Encode und
+Decode (O(Historie)) laufen in einem Thread, nicht auf dem Event Loop.
+
+Backends:
+    SQLiteSessionStore - lokale Datei, Locks als Lease-Zeilen (SQLite File-Lock)
+    RedisSessionStore - Redis-Protokoll (SET NX PX + Lua Compare-and-Delete),
+                        lokal mit testing.FakeRedis als Stand-in
+"""
+
+import abc
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional, Tuple
+
+import structlog
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - redis ist optional
+    redis_asyncio = None
+
+from ..models import ChatState, decode_snapshot, encode_snapshot
+
+logger = structlog.get_logger()
+
+
+class SessionLockTimeout(Exception):
+    """Session-Lock konnte nicht innerhalb des Timeouts erworben werden"""
+
+
+class SessionStore(abc.ABC):
+    """
+    Basis-Interface für geteilte Session-Backends
+
+    Implementierungen liefern version/load/save/delete und einen verteilten
+    Lock pro Session (Lease mit TTL, damit abgestürzte Worker ihn nicht ewig halten).
+    """
+
+    def __init__(self, lock_timeout: float = 30.0, lock_ttl: float = 300.0, poll_interval: float = 0.05):
+        """
+        Args:
+            lock_timeout: Maximale Wartezeit auf einen Session-Lock in Sekunden
+            lock_ttl: Lease-Dauer eines Locks in Sekunden
+            poll_interval: Start-Intervall beim Warten auf einen Lock (verdoppelt bis 0.5s)
+        """
+        self.lock_timeout = lock_timeout
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+
+    @abc.abstractmethod
+    async def version(self, session_id: str) -> Optional[int]:
+        """Gespeicherte Version einer Session oder None"""
+
+    @abc.abstractmethod
+    async def load(self, session_id: str) -> Optional[ChatState]:
+        """Gespeicherten State laden oder None"""
+
+    @abc.abstractmethod
+    async def save(self, state: ChatState) -> None:
+        """State speichern (ersetzt vorhandenen)"""
+
+    @abc.abstractmethod
+    async def delete(self, session_id: str) -> None:
+        """Session entfernen"""
+
+    @abc.abstractmethod
+    async def _try_acquire(self, session_id: str, token: str) -> bool:
+        """Lock-Lease setzen, falls frei oder abgelaufen"""
+
+    @abc.abstractmethod
+    async def _release(self, session_id: str, token: str) -> None:
+        """Lock-Lease entfernen, falls sie noch zum Token gehört"""
+
+    @staticmethod
+    async def _encode(state: ChatState) -> bytes:
+        # msgpack + Kompression der ganzen Historie: im Thread statt auf dem Event Loop
+        return await asyncio.to_thread(encode_snapshot, state)
+
+    @staticmethod
+    async def _decode(data: bytes) -> ChatState:
+        return await asyncio.to_thread(decode_snapshot, data)
+
+    @asynccontextmanager
+    async def lock(self, session_id: str, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Verteilter Lock für eine Session
+
+        Raises:
+            SessionLockTimeout: Lock nicht innerhalb des Timeouts verfügbar
+        """
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + (self.lock_timeout if timeout is None else timeout)
+        delay = self.poll_interval
+        while not await self._try_acquire(session_id, token):
+            if time.monotonic() >= deadline:
+                raise SessionLockTimeout(f"Session {session_id} is locked")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+        try:
+            yield
+        finally:
+            try:
+                await self._release(session_id, token)
+            except Exception as e:
+                logger.error("Session lock release failed", session_id=session_id, error=str(e))
+
+    async def close(self) -> None:
+        """Verbindungen schließen"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session Store in einer lokalen SQLite-Datei (mehrere Prozesse auf einem Host)
+
+    Queries laufen in einem Thread, damit der Event Loop nicht auf File-Locks wartet.
+    """
+
+    def __init__(self, path: str, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.path = path
+        self._db_lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10.0, check_same_thread=False, isolation_level=None)
+        with self._db_lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS session_locks ("
+                "session_id TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _execute(self, sql: str, params: Tuple = ()) -> Tuple[list, int]:
+        with self._db_lock:
+            cursor = self._connection.execute(sql, params)
+            return cursor.fetchall(), cursor.rowcount
+
+    async def _run(self, sql: str, params: Tuple = ()) -> Tuple[list, int]:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def version(self, session_id: str) -> Optional[int]:
+        rows, _ = await self._run("SELECT version FROM sessions WHERE session_id = ?", (session_id,))
+        return rows[0][0] if rows else None
+
+    async def load(self, session_id: str) -> Optional[ChatState]:
+        rows, _ = await self._run("SELECT data FROM sessions WHERE session_id = ?", (session_id,))
+        return await self._decode(rows[0][0]) if rows else None
+
+    async def save(self, state: ChatState) -> None:
+        # Version vor dem Encode lesen - der Snapshot ist mindestens so neu wie die Version
+        version = state.version
+        data = await self._encode(state)
+        await self._run(
+            "INSERT INTO sessions (session_id, version, data, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET version = excluded.version, data = excluded.data, "
+            "updated_at = excluded.updated_at",
+            (state.session_id, version, data, time.time())
+        )
+
+    async def delete(self, session_id: str) -> None:
+        await self._run("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    async def _try_acquire(self, session_id: str, token: str) -> bool:
+        now = time.time()
+        _, changed = await self._run(
+            "INSERT INTO session_locks (session_id, token, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at "
+            "WHERE session_locks.expires_at < ?",
+            (session_id, token, now + self.lock_ttl, now)
+        )
+        return changed == 1
+
+    async def _release(self, session_id: str, token: str) -> None:
+        await self._run("DELETE FROM session_locks WHERE session_id = ? AND token = ?", (session_id, token))
+
+    async def close(self) -> None:
+        with self._db_lock:
+            self._connection.close()
+
+
+# Lock nur freigeben, wenn er noch uns gehört (Lease kann abgelaufen und neu vergeben sein)
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session Store über das Redis-Protokoll
+
+    Keys: {prefix}session:{id} (Snapshot), {prefix}version:{id}, {prefix}lock:{id}
+    """
+
+    def __init__(self, client: Any, prefix: str = "textrpg:", **kwargs: Any):
+        """
+        Args:
+            client: redis.asyncio.Redis (oder kompatibler Client, z.B. testing.FakeRedis)
+            prefix: Key-Prefix
+        """
+        super().__init__(**kwargs)
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisSessionStore":
+        """Store für eine Redis URL (memory:// → In-Process Stand-in)"""
+        if url.startswith("memory://"):
+            from ..testing.fake_redis import FakeRedis
+
+            return cls(FakeRedis(), **kwargs)
+        if redis_asyncio is None:
+            raise RuntimeError("session_backend=redis requires the redis package")
+        return cls(redis_asyncio.from_url(url), **kwargs)
+
+    def _key(self, kind: str, session_id: str) -> str:
+        return f"{self.prefix}{kind}:{session_id}"
+
+    async def version(self, session_id: str) -> Optional[int]:
+        value = await self.client.get(self._key("version", session_id))
+        return int(value) if value is not None else None
+
+    async def load(self, session_id: str) -> Optional[ChatState]:
+        data = await self.client.get(self._key("session", session_id))
+        return await self._decode(data) if data is not None else None
+
+    async def save(self, state: ChatState) -> None:
+        version = state.version
+        data = await self._encode(state)
+        await self.client.mset({
+            self._key("session", state.session_id): data,
+            self._key("version", state.session_id): str(version)
+        })
+
+    async def delete(self, session_id: str) -> None:
+        await self.client.delete(self._key("session", session_id), self._key("version", session_id))
+
+    async def _try_acquire(self, session_id: str, token: str) -> bool:
+        return bool(await self.client.set(
+            self._key("lock", session_id), token, nx=True, px=int(self.lock_ttl * 1000)
+        ))
+
+    async def _release(self, session_id: str, token: str) -> None:
+        await self.client.eval(RELEASE_LOCK_SCRIPT, 1, self._key("lock", session_id), token)
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+
+def create_session_store(
+    backend: str,
+    sqlite_path: str = "sessions.db",
+    redis_url: str = "redis://localhost:6379/0",
+    **kwargs: Any
+) -> Optional[SessionStore]:
+    """
+    Session Store für das konfigurierte Backend
+
+    Args:
+        backend: memory | sqlite | redis
+        sqlite_path: Datei für das SQLite Backend
+        redis_url: URL für das Redis Backend (memory:// für den In-Process Stand-in)
+        **kwargs: lock_timeout, lock_ttl
+
+    Returns:
+        SessionStore oder None (memory: Sessions nur im Prozess)
+    """
+    if backend == "sqlite":
+        return SQLiteSessionStore(sqlite_path, **kwargs)
+    if backend == "redis":
+        return RedisSessionStore.from_url(redis_url, **kwargs)
+    return None
@@ -0,0 +1,380 @@
+"""
+TextRPG Speculative Turns
+Generiert den nächsten Turn für angebotene Spieler-Optionen vorab
+
+Der Gamemaster beendet Gameplay-Turns mit Optionen (A) ... / 1. ...). Während
+der Spieler liest, generiert der Speculator im Hintergrund den Folge-Turn für
+die ersten K Optionen - begrenzt durch ein globales Concurrency-Limit (ohne
+Warteschlange: ist kein Slot frei, wird nicht spekuliert) und ein Token-Budget
+pro Session. Das Budget wird beim Start reserviert (Anteil des Rests pro
+Option, als max_tokens an die LLM-Calls gebunden) und nach dem Ende mit der
+tatsächlichen Usage verrechnet. Wählt der Spieler eine Option wörtlich, übernimmt der
+SessionManager die fertige Fortsetzung statt eines neuen LLM Calls.
+
+Pro Session werden Hit Rate, verschwendete Tokens und gesparte Latenz geführt.
+"""
+
+import asyncio
+import contextvars
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import structlog
+
+from ..models import ChatState, MessageRecord, to_message_record
+from ..services.metrics import get_metrics_registry
+from ..services.usage import UsageCapture, capture_usage, reserve_tokens
+
+logger = structlog.get_logger()
+
+# Options-Zeile: "A) Text", "**B)** Text", "2. Text", "- C: Text"
+_OPTION_PATTERN = re.compile(r"^\s*(?:[-*]\s*)?(?:\*\*)?([A-Z]|[1-9])(?:\*\*)?\s*[).:](?:\*\*)?\s+(.+?)\s*$")
+_NORMALIZE_PATTERN = re.compile(r"[\s*_\"'„“”]+")
+# Kleinere Reservierungen ergeben keinen brauchbaren Turn - dann wird nicht spekuliert
+_MIN_RESERVATION_TOKENS = 64
+
+
+def parse_options(text: str) -> List[Tuple[str, str]]:
+    """
+    Liest die angebotenen Optionen aus einer Gamemaster-Antwort
+
+    Verwendet wird der letzte zusammenhängende Block von Options-Zeilen.
+
+    Returns:
+        Liste (Label, Options-Text), z.B. [("A", "Die Tür öffnen"), ...]
+    """
+    blocks: List[List[Tuple[str, str]]] = []
+    current: List[Tuple[str, str]] = []
+    for line in text.splitlines():
+        match = _OPTION_PATTERN.match(line)
+        if match:
+            current.append((match.group(1), match.group(2)))
+        elif line.strip() and current:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    for block in reversed(blocks):
+        if len(block) >= 2:
+            return block
+    return []
+
+
+def _normalize(text: str) -> str:
+    return _NORMALIZE_PATTERN.sub(" ", text).strip().rstrip(".!").casefold()
+
+
+def option_for_input(options: Sequence[Tuple[str, str]], user_message: str) -> Optional[int]:
+    """
+    Index der wörtlich gewählten Option
+
+    Akzeptiert das Label ("A", "A)"), den Options-Text oder die ganze Zeile ("A) Text").
+    """
+    normalized = _normalize(user_message)
+    for index, (label, option) in enumerate(options):
+        label_key = label.casefold()
+        if normalized in (label_key, f"{label_key})", f"{label_key}.", _normalize(option)):
+            return index
+        if normalized in (f"{label_key}) {_normalize(option)}", f"{label_key}. {_normalize(option)}"):
+            return index
+    return None
+
+
+class SpeculativeTurn:
+    """Vorab generierter Folge-Turn für eine Option"""
+
+    __slots__ = ("label", "option", "reserved", "task", "messages", "fields", "usage", "generation_seconds", "finished_at")
+
+    def __init__(self, label: str, option: str, reserved: int = 0):
+        self.label = label
+        self.option = option
+        self.reserved = reserved
+        self.task: Optional[asyncio.Task] = None
+        self.messages: List[MessageRecord] = []
+        self.fields: Dict[str, Any] = {}
+        self.usage = UsageCapture()
+        self.generation_seconds = 0.0
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None and bool(self.messages)
+
+
+class SessionSpeculation:
+    """Offene Spekulationen einer Session, gebunden an den Message-Stand beim Start"""
+
+    __slots__ = ("anchor_uid", "base_count", "options", "turns")
+
+    def __init__(self, anchor_uid: Any, base_count: int, options: List[Tuple[str, str]]):
+        self.anchor_uid = anchor_uid
+        self.base_count = base_count
+        self.options = options
+        self.turns: Dict[int, SpeculativeTurn] = {}
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {
+        "speculated": 0,
+        "hits": 0,
+        "misses": 0,
+        "skipped_budget": 0,
+        "skipped_concurrency": 0,
+        "spent_tokens": 0,
+        "reserved_tokens": 0,
+        "wasted_tokens": 0,
+        "wasted_cost_usd": 0.0,
+        "latency_saved_seconds": 0.0
+    }
+
+
+class Speculator:
+    """
+    Spekulative Vorab-Generierung unter Token- und Concurrency-Budget
+    """
+
+    def __init__(
+        self,
+        top_k: int = 2,
+        max_concurrency: int = 2,
+        session_token_budget: int = 20000,
+        fields: Sequence[str] = ()
+    ):
+        """
+        Args:
+            top_k: Anzahl Optionen, die pro Turn vorab generiert werden
+            max_concurrency: Maximale gleichzeitige Spekulationen (prozessweit)
+            session_token_budget: Maximale spekulative Tokens pro Session (inkl. Treffer, strikt per Reservierung)
+            fields: State-Felder, die ein Turn ändern kann (werden bei Treffer übernommen)
+        """
+        self.top_k = top_k
+        self.max_concurrency = max_concurrency
+        self.session_token_budget = session_token_budget
+        self.fields = tuple(fields)
+
+        self.in_flight = 0
+        self._sessions: Dict[str, SessionSpeculation] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+        registry = get_metrics_registry()
+        self._outcome_counter = registry.counter(
+            "textrpg_speculation_turns_total",
+            "Speculative turns by outcome (hit/miss)"
+        )
+        self._wasted_tokens_counter = registry.counter(
+            "textrpg_speculation_wasted_tokens_total",
+            "Tokens spent on speculative turns the player did not pick"
+        )
+        self._saved_histogram = registry.histogram(
+            "textrpg_speculation_latency_saved_seconds",
+            "Generation time saved per speculative hit"
+        )
+
+    def _session_stats(self, session_id: str) -> Dict[str, Any]:
+        return self._stats.setdefault(session_id, _empty_stats())
+
+    # Start
+
+    def schedule(self, state: ChatState, workflow: Any) -> int:
+        """
+        Startet Spekulationen für die Optionen der letzten AI-Antwort
+
+        Args:
+            state: Session nach einem abgeschlossenen Gameplay-Turn
+            workflow: Kompilierter LangGraph Workflow
+
+        Returns:
+            Anzahl gestarteter Spekulationen
+        """
+        session_id = state.session_id
+        self.discard(session_id)
+        messages = state.messages
+        if not messages or messages[-1].type != "ai" or state.current_agent != "gameplay_agent":
+            return 0
+        options = parse_options(messages[-1].content)
+        if not options:
+            return 0
+
+        stats = self._session_stats(session_id)
+        speculation = SessionSpeculation(messages[-1].uid, len(messages), options)
+        candidates = options[:self.top_k]
+        # Restbudget gleichmäßig auf die Kandidaten verteilen (laufende Reservierungen zählen mit)
+        available = self.session_token_budget - stats["spent_tokens"] - stats["reserved_tokens"]
+        share = available // len(candidates)
+        for index, (label, option) in enumerate(candidates):
+            if share < _MIN_RESERVATION_TOKENS:
+                stats["skipped_budget"] += 1
+                continue
+            if self.in_flight >= self.max_concurrency:
+                stats["skipped_concurrency"] += 1
+                continue
+            turn = SpeculativeTurn(label, option, reserved=share)
+            graph_state = self._graph_state(state, f"{label}) {option}")
+            # Eigener leerer Context: Stages/Usage landen nicht im Timer des abgeschlossenen Turns
+            turn.task = contextvars.Context().run(
+                asyncio.create_task, self._generate(session_id, turn, workflow, graph_state)
+            )
+            self.in_flight += 1
+            stats["reserved_tokens"] += share
+            # Done-Callback statt finally: läuft auch, wenn der Task vor dem Start abgebrochen wird
+            turn.task.add_done_callback(lambda _, turn=turn: self._task_done(session_id, turn))
+            speculation.turns[index] = turn
+            stats["speculated"] += 1
+
+        if speculation.turns:
+            self._sessions[session_id] = speculation
+            logger.debug("Speculative turns started",
+                        session_id=session_id,
+                        options=[turn.label for turn in speculation.turns.values()],
+                        event_type="message_flow")
+        return len(speculation.turns)
+
+    def _graph_state(self, state: ChatState, option_text: str) -> Dict[str, Any]:
+        # Eigene Message-Liste: der Workflow hängt seine Messages in-place an
+        return {
+            "session_id": state.session_id,
+            "messages": [*state.messages, MessageRecord.create("human", option_text)],
+            "story_phase": state.story_phase,
+            "current_agent": state.current_agent,
+            "handoff_data": state.handoff_data,
+            "chapter_count": state.chapter_count,
+            "interaction_count": state.interaction_count,
+            "world_state": state.world_state,
+            "active": state.active,
+            "processing": True,
+            "created_at": state.created_at,
+            "last_updated": state.last_updated,
+            "end_trigger": state.end_trigger
+        }
+
+    def _task_done(self, session_id: str, turn: SpeculativeTurn) -> None:
+        """Gibt Slot und Reservierung frei und verbucht die tatsächliche Usage"""
+        self.in_flight -= 1
+        stats = self._stats.get(session_id)
+        if stats is not None:
+            stats["reserved_tokens"] -= turn.reserved
+            stats["spent_tokens"] += turn.usage.totals["total_tokens"]
+
+    async def _generate(self, session_id: str, turn: SpeculativeTurn, workflow: Any, graph_state: Dict[str, Any]) -> None:
+        base_count = len(graph_state["messages"])
+        start = time.perf_counter()
+        try:
+            with capture_usage() as turn.usage, reserve_tokens(turn.reserved, turn.usage):
+                result = await workflow.ainvoke(graph_state)
+            new_messages = [to_message_record(message) for message in result.get("messages", [])[base_count:]]
+            # Fehler-Antworten der Nodes nicht als Fortsetzung anbieten
+            if not any(message.metadata.get("error") for message in new_messages):
+                turn.messages = new_messages
+                turn.fields = {key: result[key] for key in self.fields if key in result}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Speculative turn failed", session_id=session_id, error=str(e))
+        finally:
+            turn.generation_seconds = time.perf_counter() - start
+            turn.finished_at = time.monotonic()
+
+    # Übernahme
+
+    async def claim(self, state: ChatState, user_message: str, base_count: int) -> Optional[SpeculativeTurn]:
+        """
+        Liefert die fertige Fortsetzung, wenn der Spieler eine spekulierte Option gewählt hat
+
+        Läuft die passende Spekulation noch, wird auf sie gewartet (Rest-Latenz statt
+        voller Generierung). Alle anderen Spekulationen der Session werden verworfen.
+
+        Args:
+            state: Session (User Message bereits angehängt)
+            user_message: Eingabe des Spielers
+            base_count: Anzahl Messages vor der User Message
+
+        Returns:
+            SpeculativeTurn oder None (Miss)
+        """
+        session_id = state.session_id
+        speculation = self._sessions.pop(session_id, None)
+        if speculation is None:
+            return None
+
+        hit: Optional[SpeculativeTurn] = None
+        try:
+            anchored = base_count == speculation.base_count and state.messages[base_count - 1].uid == speculation.anchor_uid
+            index = option_for_input(speculation.options, user_message) if anchored else None
+            if index is not None and index in speculation.turns:
+                candidate = speculation.turns[index]
+                wait_start = time.perf_counter()
+                if not candidate.task.done():
+                    await asyncio.shield(candidate.task)
+                if candidate.ready:
+                    hit = speculation.turns.pop(index)
+                    saved = max(hit.generation_seconds - (time.perf_counter() - wait_start), 0.0)
+                    stats = self._session_stats(session_id)
+                    stats["hits"] += 1
+                    stats["latency_saved_seconds"] = round(stats["latency_saved_seconds"] + saved, 6)
+                    self._outcome_counter.inc(labels={"result": "hit"})
+                    self._saved_histogram.observe(saved)
+        finally:
+            # Auch bei Abbruch des Spieler-Turns (Disconnect während des Wartens) alle
+            # übrigen Spekulationen stoppen und als Miss bzw. Verschwendung verbuchen
+            if hit is None:
+                self._count_miss(session_id)
+            self._release(session_id, speculation.turns.values())
+        return hit
+
+    def discard(self, session_id: str) -> None:
+        """Verwirft alle offenen Spekulationen einer Session (als Miss)"""
+        speculation = self._sessions.pop(session_id, None)
+        if speculation is not None:
+            self._count_miss(session_id)
+            self._release(session_id, speculation.turns.values())
+
+    def forget(self, session_id: str) -> None:
+        """Gelöschte Session: Spekulationen abbrechen, Stats entfernen"""
+        self.discard(session_id)
+        self._stats.pop(session_id, None)
+
+    def _count_miss(self, session_id: str) -> None:
+        self._session_stats(session_id)["misses"] += 1
+        self._outcome_counter.inc(labels={"result": "miss"})
+
+    def _release(self, session_id: str, turns: Any) -> None:
+        for turn in list(turns):
+            if turn.task.done():
+                self._count_waste(session_id, turn.usage)
+            else:
+                # Laufende Generierung abbrechen, bereits verbrauchte Tokens beim Ende verbuchen
+                turn.task.add_done_callback(lambda _, turn=turn: self._count_waste(session_id, turn.usage))
+                turn.task.cancel()
+
+    def _count_waste(self, session_id: str, usage: UsageCapture) -> None:
+        self._wasted_tokens_counter.inc(usage.totals["total_tokens"])
+        # Session kann inzwischen gelöscht sein (forget) - Stats nicht neu anlegen
+        stats = self._stats.get(session_id)
+        if stats is not None:
+            stats["wasted_tokens"] += usage.totals["total_tokens"]
+            stats["wasted_cost_usd"] = round(stats["wasted_cost_usd"] + usage.totals["cost_usd"], 8)
+
+    # Stats
+
+    def session_stats(self, session_id: str) -> Dict[str, Any]:
+        """Hit Rate, verschwendete Tokens und gesparte Latenz einer Session"""
+        stats = dict(self._stats.get(session_id) or _empty_stats())
+        decided = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / decided, 4) if decided else None
+        stats["pending"] = len(self._sessions[session_id].turns) if session_id in self._sessions else 0
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregat über alle Sessions"""
+        totals = _empty_stats()
+        for stats in self._stats.values():
+            for key in totals:
+                totals[key] += stats[key]
+        decided = totals["hits"] + totals["misses"]
+        totals["hit_rate"] = round(totals["hits"] / decided, 4) if decided else None
+        totals["latency_saved_seconds"] = round(totals["latency_saved_seconds"], 6)
+        totals["wasted_cost_usd"] = round(totals["wasted_cost_usd"], 8)
+        totals["in_flight"] = self.in_flight
+        totals["sessions"] = len(self._stats)
+        return totals
@@ -0,0 +1,427 @@
+"""
+TextRPG Turn Journal
+Write-ahead Journal pro Turn: bezahlte Generierungen überleben Crashes und Disconnects
+
+Pro Turn werden angehängt:
+    begin   - User Message (als Record), Message-Stand vor dem Turn
+    output  - generierte Messages + geänderte State-Felder + Token Usage (durable,
+              bevor das Streaming an den Client beginnt)
+    commit  - Turn vollständig in die Session übernommen (oder abort bei Rollback)
+
+Records sind CRC-geschützte msgpack-Frames in Segment-Dateien pro Journal-Instanz. Ein
+Background Task schreibt gepufferte Records gebündelt und fsynct einmal pro
+Batch (Group Commit) - viele gleichzeitige Turns teilen sich einen fsync.
+Jeder Prozess hält einen flock auf seinen Segmenten; beim Start werden nur
+Segmente toter Prozesse wiederhergestellt. Segmente, die keinen offenen Turn
+mehr enthalten können, werden gelöscht.
+"""
+
+import asyncio
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+import ormsgpack
+import structlog
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: keine Segment-Locks
+    fcntl = None
+
+from ..models import MessageRecord
+from ..models.packing import decode_record, encode_record
+
+logger = structlog.get_logger()
+
+# Frame: [u32 Länge][u32 CRC32][msgpack]
+_FRAME_HEADER = struct.Struct(">II")
+SEGMENT_SUFFIX = ".journal"
+
+
+def _frame(record: Dict[str, Any]) -> bytes:
+    payload = ormsgpack.packb(record)
+    return _FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_segment(path: Path) -> List[Dict[str, Any]]:
+    """
+    Liest alle vollständigen Records eines Segments
+
+    Ein abgeschnittener oder beschädigter Frame am Ende (Crash während des
+    Schreibens) beendet das Lesen - alles davor ist gültig.
+    """
+    data = path.read_bytes()
+    records = []
+    offset = 0
+    while offset + _FRAME_HEADER.size <= len(data):
+        length, crc = _FRAME_HEADER.unpack_from(data, offset)
+        start = offset + _FRAME_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            logger.warning("Turn journal segment has a torn tail", segment=path.name, offset=offset)
+            break
+        records.append(ormsgpack.unpackb(payload))
+        offset = start + length
+    return records
+
+
+def output_messages(output: Dict[str, Any]) -> List[MessageRecord]:
+    """Generierte Messages eines output-Records"""
+    return [decode_record(values) for values in output["messages"]]
+
+
+def turn_summary(turn_id: str, status: str, output: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """API-Darstellung eines abgeschlossenen Turns"""
+    return {
+        "turn_id": turn_id,
+        "status": status,
+        "messages": [record.to_dict() for record in output_messages(output)] if output else []
+    }
+
+
+class JournalTurn:
+    """Handle eines laufenden Turns im Journal"""
+
+    __slots__ = ("journal", "turn_id", "session_id", "segment_seq", "output", "status")
+
+    def __init__(self, journal: "TurnJournal", turn_id: str, session_id: str, segment_seq: int):
+        self.journal = journal
+        self.turn_id = turn_id
+        self.session_id = session_id
+        self.segment_seq = segment_seq
+        self.output: Optional[Dict[str, Any]] = None
+        self.status = "open"
+
+    @property
+    def closed(self) -> bool:
+        return self.status != "open"
+
+    async def record_output(
+        self,
+        messages: Sequence[MessageRecord],
+        fields: Dict[str, Any],
+        usage: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Journalisiert die generierten Messages (wartet auf fsync)
+
+        Args:
+            messages: Neue Messages des Turns (AI-Antworten)
+            fields: Geänderte State-Felder (current_agent, story_phase, ...)
+            usage: Token Usage des Turns ({"totals": ..., "models": ...})
+        """
+        self.output = {
+            "messages": [encode_record(message) for message in messages],
+            "fields": fields,
+            "usage": usage
+        }
+        await self.journal._append({"type": "output", "turn": self.turn_id, **self.output}, durable=True)
+
+    def commit(self, status: str = "committed") -> None:
+        """Turn abgeschlossen (committed | recovered)"""
+        self._close(status, {"type": "commit", "turn": self.turn_id, "status": status})
+
+    def abort(self, reason: str) -> None:
+        """Turn zurückgerollt - keine Generierung vorhanden"""
+        self._close("rolled_back", {"type": "abort", "turn": self.turn_id, "reason": reason})
+
+    def _close(self, status: str, record: Dict[str, Any]) -> None:
+        if self.closed:
+            return
+        self.status = status
+        self.journal._append_nowait(record)
+        self.journal._turn_closed(self)
+
+
+class TurnJournal:
+    """
+    Append-only Turn Journal mit gebündeltem fsync
+    """
+
+    def __init__(self, directory: str, fsync_interval: float = 0.05, segment_bytes: int = 16 * 1024 * 1024):
+        """
+        Args:
+            directory: Verzeichnis für Segment-Dateien
+            fsync_interval: Maximale Wartezeit bis zum nächsten Batch-fsync in Sekunden
+            segment_bytes: Segment-Größe, ab der rotiert wird
+        """
+        self.directory = Path(directory)
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+
+        # Segmente dieses Prozesses: seq → (Pfad, Handle mit flock); nur der Writer-Thread
+        # rotiert und löscht - Loop-Code nimmt _segment_lock nie (fsync hält ihn)
+        self._segments: Dict[int, Tuple[Path, BinaryIO]] = {}
+        self._segment_seq = 0
+        self._segment_size = 0
+        self._segment_lock = threading.Lock()
+        self._instance = uuid.uuid4().hex[:8]
+
+        self._open_turns: Dict[str, int] = {}
+        self._last_turns: Dict[str, Dict[str, Any]] = {}
+        self._recovered_segments: List[Path] = []
+
+        self._buffer: List[bytes] = []
+        self._waiters: List[asyncio.Future] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.records = 0
+        self.fsyncs = 0
+        self.fsync_seconds = 0.0
+
+    # Schreiben
+
+    def begin(self, session_id: str, user_message: MessageRecord, base_count: int) -> JournalTurn:
+        """
+        Beginnt einen Turn (gepuffert, fsync mit dem nächsten Batch)
+
+        Args:
+            session_id: Session ID
+            user_message: User Message des Turns
+            base_count: Anzahl Messages der Session vor dem Turn
+        """
+        turn = JournalTurn(self, uuid.uuid4().hex, session_id, max(self._segment_seq, 1))
+        self._open_turns[turn.turn_id] = turn.segment_seq
+        self._append_nowait({
+            "type": "begin",
+            "turn": turn.turn_id,
+            "session_id": session_id,
+            "user_message": encode_record(user_message),
+            "base_count": base_count,
+            "ts": time.time()
+        })
+        return turn
+
+    def _turn_closed(self, turn: JournalTurn) -> None:
+        self._open_turns.pop(turn.turn_id, None)
+        self._last_turns[turn.session_id] = turn_summary(turn.turn_id, turn.status, turn.output)
+
+    def _append_nowait(self, record: Dict[str, Any]) -> None:
+        self._buffer.append(_frame(record))
+        self.records += 1
+        self._ensure_flusher()
+
+    async def _append(self, record: Dict[str, Any], durable: bool = False) -> None:
+        self._append_nowait(record)
+        if durable:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            if self._wakeup is not None:
+                self._wakeup.set()
+            await waiter
+
+    def _ensure_flusher(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Kein Event Loop (Skripte, Shutdown): synchron schreiben
+            self._write_batch(self._take_batch(), self._keep_from())
+            return
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    def _take_batch(self) -> bytes:
+        batch = b"".join(self._buffer)
+        self._buffer.clear()
+        return batch
+
+    def _keep_from(self) -> Optional[int]:
+        """Kleinstes Start-Segment aller offenen Turns (Snapshot auf dem Loop)"""
+        return min(self._open_turns.values(), default=None)
+
+    def _open_segment(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segment_seq += 1
+        path = self.directory / f"{os.getpid()}-{self._instance}-{self._segment_seq}{SEGMENT_SUFFIX}"
+        handle = open(path, "ab")
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._segments[self._segment_seq] = (path, handle)
+        self._segment_size = 0
+
+    def _write_batch(self, batch: bytes, keep_from: Optional[int] = None) -> None:
+        """
+        Schreibt einen Batch ins aktuelle Segment, fsynct und löscht alte Segmente (Writer-Thread)
+
+        Args:
+            batch: Gebündelte Frames
+            keep_from: Kleinstes Start-Segment offener Turns beim Entnehmen des Batches
+        """
+        if not batch:
+            return
+        with self._segment_lock:
+            if self._segment_seq not in self._segments:
+                self._open_segment()
+            start = time.perf_counter()
+            handle = self._segments[self._segment_seq][1]
+            handle.write(batch)
+            handle.flush()
+            os.fsync(handle.fileno())
+            self.fsyncs += 1
+            self.fsync_seconds += time.perf_counter() - start
+            self._segment_size += len(batch)
+            if self._segment_size >= self.segment_bytes:
+                self._open_segment()
+            self._drop_finished_segments(keep_from)
+
+    def _drop_finished_segments(self, keep_from: Optional[int]) -> None:
+        """
+        Löscht alte Segmente ohne möglichen offenen Turn (Writer-Thread, unter _segment_lock)
+
+        Ein Turn, der bei Segment k begonnen hat, kann (gepuffert über eine Rotation)
+        in jedem Segment >= k liegen - gelöscht wird daher nur unterhalb des
+        kleinsten Start-Segments aller offenen Turns. Turns, die nach dem Snapshot
+        begonnen haben, stehen frühestens im nächsten Batch, also im aktuellen Segment.
+        """
+        limit = self._segment_seq if keep_from is None else min(keep_from, self._segment_seq)
+        for seq in [seq for seq in self._segments if seq < limit]:
+            path, handle = self._segments.pop(seq)
+            handle.close()
+            path.unlink(missing_ok=True)
+
+    async def _flush_loop(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.fsync_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Einen Loop-Durchlauf sammeln, damit gleichzeitige Turns denselben fsync nutzen
+            await asyncio.sleep(0)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Schreibt und fsynct alle gepufferten Records, weckt wartende Writer"""
+        waiters, self._waiters = self._waiters, []
+        batch = self._take_batch()
+        try:
+            if batch:
+                await asyncio.to_thread(self._write_batch, batch, self._keep_from())
+        except Exception as e:
+            logger.error("Turn journal write failed", error=str(e), exc_info=True)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def close(self) -> None:
+        """Restliche Records schreiben, Flusher beenden, Segmente ohne offene Turns löschen"""
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        await asyncio.to_thread(self._close_segments, not self._open_turns)
+
+    def _close_segments(self, unlink: bool) -> None:
+        """Schließt alle Segmente, löscht sie ohne offene Turns (Writer-Thread)"""
+        with self._segment_lock:
+            for path, handle in self._segments.values():
+                handle.close()
+                if unlink:
+                    path.unlink(missing_ok=True)
+            self._segments.clear()
+
+    # Recovery
+
+    def recover(self) -> List[Dict[str, Any]]:
+        """
+        Liest Segmente toter Prozesse und liefert unvollständige Turns
+
+        Segmente, die ein laufender Prozess per flock hält, werden übersprungen.
+
+        Returns:
+            Liste offener Turns: session_id, turn_id, user_message (MessageRecord),
+            base_count und output (oder None)
+        """
+        if not self.directory.exists():
+            return []
+
+        own = {path for path, _ in self._segments.values()}
+        turns: Dict[str, Dict[str, Any]] = {}
+        self._recovered_segments = []
+        for segment in sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"), key=lambda path: path.stat().st_mtime):
+            if segment in own or not self._claim(segment):
+                continue
+            self._recovered_segments.append(segment)
+            for record in read_segment(segment):
+                record_type = record.get("type")
+                turn = turns.get(record.get("turn"))
+                if record_type == "begin":
+                    turns[record["turn"]] = {
+                        "turn_id": record["turn"],
+                        "session_id": record["session_id"],
+                        "user_message": decode_record(record["user_message"]),
+                        "base_count": record["base_count"],
+                        "output": None,
+                        "closed": False
+                    }
+                elif turn is not None and record_type == "output":
+                    turn["output"] = {key: record[key] for key in ("messages", "fields", "usage")}
+                elif turn is not None and record_type in ("commit", "abort"):
+                    turn["closed"] = True
+
+        return [turn for turn in turns.values() if not turn["closed"]]
+
+    @staticmethod
+    def _claim(segment: Path) -> bool:
+        if fcntl is None:
+            return True
+        with open(segment, "rb") as handle:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        return True
+
+    def finish_recovery(self, recovered: List[Dict[str, Any]]) -> None:
+        """
+        Schließt die Recovery ab: Ergebnisse pro Session merken, Segmente löschen
+
+        Args:
+            recovered: Turns aus recover() mit gesetztem "status" (recovered | rolled_back | orphaned)
+        """
+        for turn in recovered:
+            self._last_turns[turn["session_id"]] = turn_summary(
+                turn["turn_id"], turn.get("status", "rolled_back"), turn["output"]
+            )
+        for segment in self._recovered_segments:
+            segment.unlink(missing_ok=True)
+        self._recovered_segments = []
+
+    # Abfragen
+
+    def last_turn(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Ergebnis des letzten abgeschlossenen Turns einer Session (seit Prozessstart)"""
+        return self._last_turns.get(session_id)
+
+    def forget(self, session_id: str) -> None:
+        """Vergisst das Turn-Ergebnis einer gelöschten Session"""
+        self._last_turns.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Records, fsyncs (Batch-Größe) und offene Turns"""
+        return {
+            "records": self.records,
+            "fsyncs": self.fsyncs,
+            "records_per_fsync": round(self.records / self.fsyncs, 2) if self.fsyncs else None,
+            "avg_fsync_ms": round(self.fsync_seconds / self.fsyncs * 1000, 3) if self.fsyncs else None,
+            "open_turns": len(self._open_turns),
+            "segments": len(self._segments)
+        }
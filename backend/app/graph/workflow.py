@@ -9,10 +9,20 @@ from langgraph.types import Command
 import logging
 
 from .nodes_agents import setup_agent_node, gameplay_agent_node
+from ..models.state import ChatStateDict
 
 logger = logging.getLogger(__name__)
 
 
+def route_entry_agent(state: Dict[str, Any]) -> Literal["setup_agent", "gameplay_agent"]:
+    """
+    Entry Router: Nach dem Silent Handoff gehen alle weiteren Turns direkt zum Gameplay Agent
+    """
+    if state.get("current_agent") == "gameplay_agent" or state.get("story_phase") == "gameplay":
+        return "gameplay_agent"
+    return "setup_agent"
+
+
 def should_continue_to_gameplay(state: Dict[str, Any]) -> Literal["gameplay_agent", END]:
     """
     Router function für Setup Agent Output
@@ -28,20 +38,28 @@ def create_text_rpg_workflow() -> StateGraph:
     Erstellt vereinfachten Workflow für TextRPG mit Command-Unterstützung
     
     Flow: Start → Setup Agent → (Command) → Gameplay Agent → End
+          Start → Gameplay Agent → End (nach dem Handoff)
     
     Returns:
         StateGraph mit command-based routing
     """
     
-    # Create StateGraph (wird dict-based state nutzen)
-    workflow = StateGraph(Dict[str, Any])
+    # Create StateGraph mit getypten Channels - Command-Updates (handoff_data etc.) bleiben erhalten
+    workflow = StateGraph(ChatStateDict)
     
     # Add Nodes mit korrekten Namen
     workflow.add_node("setup_agent", setup_agent_node)
     workflow.add_node("gameplay_agent", gameplay_agent_node)
     
-    # Entry point: Immer Setup Agent
-    workflow.add_edge(START, "setup_agent")
+    # Entry point: Setup Agent bis zum Handoff, danach Gameplay Agent
+    workflow.add_conditional_edges(
+        START,
+        route_entry_agent,
+        {
+            "setup_agent": "setup_agent",
+            "gameplay_agent": "gameplay_agent"
+        }
+    )
     
     # Conditional edges für Setup Agent
     # LangGraph behandelt Command-Returns automatisch!
@@ -72,6 +90,9 @@ def compile_workflow() -> StateGraph:
     
     try:
         workflow = create_text_rpg_workflow()
+        # Kein Checkpointer: append_messages hängt in-place an die Session-Liste an
+        # und erkennt doppelt angewendete Writes per Objekt-Identität. Ein Checkpointer
+        # (Kopie/Serialisierung des Channels) bricht beides und verdoppelt die Historie.
         compiled = workflow.compile()
         logger.info("TextRPG workflow compiled successfully")
         return compiled
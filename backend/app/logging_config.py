@@ -0,0 +1,511 @@
+"""
+TextRPG Logging Configuration
+Einheitliches strukturiertes Logging für structlog und stdlib logging
+
+Development: farbiger ConsoleRenderer, synchron auf stdout.
+Production:  JSON Rendering, Zeilen gehen über eine Queue an einen
+Background-Writer-Thread - der Event Loop wartet nie auf stdout.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, TextIO
+
+import structlog
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ist optional
+    orjson = None
+
+
+def _json_dumps(obj: Any, default=None) -> str:
+    """Schneller JSON Serializer (orjson wenn verfügbar)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default or str).decode("utf-8")
+    return json.dumps(obj, default=default or str, ensure_ascii=False)
+
+
+class AsyncLogWriter:
+    """
+    Background-Writer: nimmt fertig gerenderte Zeilen über eine bounded Queue an
+    und schreibt sie gebündelt aus einem Daemon-Thread.
+
+    Ist die Queue voll, wird die Zeile verworfen und gezählt statt den
+    aufrufenden Thread (Event Loop) zu blockieren.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, max_queue_size: int = 10000, batch_size: int = 256):
+        """
+        Args:
+            stream: Ziel-Stream (default: sys.stdout)
+            max_queue_size: Maximale Anzahl wartender Zeilen
+            batch_size: Maximale Zeilen pro write()
+        """
+        self.stream = stream or sys.stdout
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            line = self._queue.get()
+            if line is None:
+                return
+            batch: List[str] = [line]
+            while len(batch) < self.batch_size:
+                try:
+                    line = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if line is None:
+                    self._flush(batch)
+                    return
+                batch.append(line)
+            self._flush(batch)
+
+    def _flush(self, batch: List[str]) -> None:
+        try:
+            self.stream.write("\n".join(batch) + "\n")
+            self.stream.flush()
+        except Exception:
+            pass
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Schreibt ausstehende Zeilen und beendet den Thread"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+
+
+class QueueLogger:
+    """structlog Logger, der gerenderte Events an den AsyncLogWriter übergibt"""
+
+    def __init__(self, writer: AsyncLogWriter):
+        self._write = writer.write
+
+    def msg(self, message: str) -> None:
+        self._write(message)
+
+    log = debug = info = warn = warning = error = critical = exception = fatal = msg
+
+
+class QueueLoggerFactory:
+    def __init__(self, writer: AsyncLogWriter):
+        self._logger = QueueLogger(writer)
+
+    def __call__(self, *args: Any) -> QueueLogger:
+        return self._logger
+
+
+class _WriterHandler(logging.Handler):
+    """stdlib Handler: formatiert via ProcessorFormatter und schreibt über den Writer"""
+
+    def __init__(self, writer: AsyncLogWriter):
+        super().__init__()
+        self._writer = writer
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._writer.write(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+class _TokenBucket:
+    """Token Bucket: per_second Tokens/s, maximal burst Tokens"""
+
+    def __init__(self, per_second: float, burst: float):
+        self.rate = per_second
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def allow(self, now: float) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+# Log-Methoden, die der Sampler immer durchlässt (WARNING und höher)
+_UNSAMPLED_METHODS = frozenset({"warn", "warning", "error", "critical", "fatal", "exception"})
+
+
+class LogSampler:
+    """
+    structlog Processor: Sampling und Rate Limiting pro event_type
+    
+    Policies kommen aus PHASE2_EVENT_TYPES (sample_rate, rate_limit) und können
+    per overrides ersetzt werden. WARNING und höher werden nie unterdrückt.
+    Unterdrückte Events werden gezählt und von einem Timer-Thread (start) alle
+    summary_interval Sekunden als "log_suppression" Summary geloggt - auch wenn
+    danach keine weiteren Events mehr kommen.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, Dict[str, Any]]] = None,
+        summary_interval: float = 60.0,
+        rng: Optional[random.Random] = None
+    ):
+        """
+        Args:
+            policies: event_type -> {"sample_rate": float, "rate_limit": {"per_second", "burst"}}
+            summary_interval: Sekunden zwischen zwei Summaries
+            rng: Random-Instanz (deterministisch in Tests)
+        """
+        self.policies = policies if policies is not None else PHASE2_EVENT_TYPES
+        self.summary_interval = summary_interval
+        self._rng = rng or random.Random()
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._suppressed: Dict[str, Dict[str, int]] = {}
+        self._last_summary = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Startet den Timer-Thread für die periodische Summary"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-sampler-summary", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.summary_interval):
+            try:
+                self.emit_summary()
+            except Exception:
+                pass
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Stoppt den Timer-Thread und loggt die letzte Summary"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.emit_summary()
+
+    def __call__(self, logger, method_name, event_dict):
+        event_type = event_dict.get("event_type")
+        policy = self.policies.get(event_type) if event_type else None
+        if not policy or method_name in _UNSAMPLED_METHODS:
+            return event_dict
+
+        sample_rate = policy.get("sample_rate", 1.0)
+        if sample_rate < 1.0:
+            if self._rng.random() >= sample_rate:
+                self._count(event_type, "sampled_out")
+                raise structlog.DropEvent
+            event_dict["sample_rate"] = sample_rate
+
+        rate_limit = policy.get("rate_limit")
+        if rate_limit:
+            with self._lock:
+                bucket = self._buckets.get(event_type)
+                if bucket is None:
+                    bucket = _TokenBucket(rate_limit["per_second"], rate_limit.get("burst", rate_limit["per_second"]))
+                    self._buckets[event_type] = bucket
+                allowed = bucket.allow(time.monotonic())
+            if not allowed:
+                self._count(event_type, "rate_limited")
+                raise structlog.DropEvent
+
+        return event_dict
+
+    def _count(self, event_type: str, reason: str) -> None:
+        with self._lock:
+            counts = self._suppressed.setdefault(event_type, {"sampled_out": 0, "rate_limited": 0})
+            counts[reason] += 1
+
+    def emit_summary(self, now: Optional[float] = None) -> Optional[Dict[str, Dict[str, int]]]:
+        """Loggt und resettet die Suppressed-Counts (None wenn nichts unterdrückt wurde)"""
+        now = now or time.monotonic()
+        with self._lock:
+            suppressed, self._suppressed = self._suppressed, {}
+            interval = now - self._last_summary
+            self._last_summary = now
+        if not suppressed:
+            return None
+
+        structlog.get_logger("textrpg.logging").info(
+            "Log events suppressed",
+            suppressed=suppressed,
+            suppressed_total=sum(sum(counts.values()) for counts in suppressed.values()),
+            interval_s=round(interval, 3),
+            event_type="log_suppression"
+        )
+        return suppressed
+
+
+_writer: Optional[AsyncLogWriter] = None
+_sampler: Optional[LogSampler] = None
+
+
+def _resolve_level(log_level: str) -> int:
+    level = logging.getLevelName(log_level.upper())
+    return level if isinstance(level, int) else logging.INFO
+
+
+def configure_logging(
+    log_level: str = "INFO",
+    enable_debug: bool = False,
+    log_format: str = "console",
+    async_writer: bool = False,
+    stream: Optional[TextIO] = None,
+    max_queue_size: int = 10000,
+    sampling: bool = False,
+    summary_interval: float = 60.0,
+    sampling_overrides: Optional[Dict[str, Dict[str, Any]]] = None
+) -> None:
+    """
+    Configure structured logging for TextRPG (structlog + stdlib).
+    
+    Args:
+        log_level: Logging level (DEBUG, INFO, WARNING, ERROR)
+        enable_debug: Enable debug logging for Phase 2 completion events
+        log_format: "console" (Development) oder "json" (Production)
+        async_writer: Zeilen über Queue + Background-Thread schreiben
+        stream: Ziel-Stream (default: sys.stdout)
+        max_queue_size: Queue-Größe des Background-Writers
+        sampling: Sampling/Rate Limiting pro event_type (PHASE2_EVENT_TYPES)
+        summary_interval: Sekunden zwischen Suppressed-Summaries
+        sampling_overrides: Policies pro event_type, ersetzen die Defaults
+    """
+    global _writer, _sampler
+    
+    shutdown_logging()
+    
+    level = _resolve_level(log_level)
+    stream = stream or sys.stdout
+    json_output = log_format == "json"
+    
+    shared_processors: List[Any] = [
+        structlog.contextvars.merge_contextvars,
+        structlog.processors.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso", utc=True),
+    ]
+    
+    # Sampling vor Timestamp/Rendering - verworfene Events kosten fast nichts
+    sampler_processors: List[Any] = []
+    if sampling:
+        policies = {**PHASE2_EVENT_TYPES, **(sampling_overrides or {})}
+        _sampler = LogSampler(policies, summary_interval=summary_interval)
+        _sampler.start()
+        sampler_processors.append(_sampler)
+    
+    if enable_debug:
+        shared_processors.append(add_phase2_context)
+    
+    if json_output:
+        shared_processors.extend([
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+        ])
+        renderer = structlog.processors.JSONRenderer(serializer=_json_dumps)
+    else:
+        renderer = structlog.dev.ConsoleRenderer()
+    
+    if async_writer:
+        _writer = AsyncLogWriter(stream, max_queue_size=max_queue_size)
+        logger_factory = QueueLoggerFactory(_writer)
+        handler: logging.Handler = _WriterHandler(_writer)
+    else:
+        logger_factory = structlog.PrintLoggerFactory(file=stream)
+        handler = logging.StreamHandler(stream)
+    
+    # structlog: Level-Filter im Bound Logger - deaktivierte Levels kosten nur einen Methodenaufruf
+    structlog.configure(
+        processors=shared_processors[:2] + sampler_processors + shared_processors[2:] + [renderer],
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        logger_factory=logger_factory,
+        cache_logger_on_first_use=True,
+    )
+    
+    # stdlib logging (Agents, Nodes, Libraries) über dieselbe Pipeline rendern
+    handler.setFormatter(structlog.stdlib.ProcessorFormatter(
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            renderer,
+        ],
+        foreign_pre_chain=[
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.ExtraAdder(),
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            *shared_processors,
+        ],
+    ))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+    
+    # HTTP-Client Logs (eine Zeile pro LLM-Request) nur ab WARNING
+    for noisy in ("httpx", "httpcore", "openai"):
+        logging.getLogger(noisy).setLevel(max(level, logging.WARNING))
+
+
+def shutdown_logging() -> None:
+    """Loggt die letzte Suppressed-Summary, flusht und stoppt den Background-Writer (App-Shutdown)"""
+    global _writer, _sampler
+    
+    if _sampler is not None:
+        _sampler.close()
+        _sampler = None
+    
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+
+
+def get_log_writer() -> Optional[AsyncLogWriter]:
+    """Aktiver Background-Writer (None im synchronen Modus)"""
+    return _writer
+
+
+def get_log_sampler() -> Optional[LogSampler]:
+    """Aktiver Log Sampler (None wenn Sampling deaktiviert ist)"""
+    return _sampler
+
+
+atexit.register(shutdown_logging)
+
+def add_phase2_context(logger, method_name, event_dict):
+    """Add Phase 2 specific context to debug logs."""
+    
+    # Mark Phase 2 events
+    if "event_type" in event_dict:
+        event_dict["phase2_event"] = True
+    
+    # Add session context if available
+    if "session_id" in event_dict:
+        event_dict["session_short"] = event_dict["session_id"][-8:]
+    
+    return event_dict
+
+# Event Type Classifications for filtering
+PHASE2_EVENT_TYPES = {
+    "phase_transition": {
+        "level": "INFO",
+        "description": "Game phase changes (setup → story → gameplay)"
+    },
+    "agent_switch": {
+        "level": "INFO", 
+        "description": "Agent transitions (story_creator ↔ gamemaster)"
+    },
+    "setup_completion": {
+        "level": "INFO",
+        "description": "Character setup completion detection"
+    },
+    "message_blocked": {
+        "level": "WARNING",
+        "description": "Duplicate or invalid messages blocked"
+    },
+    "action_count": {
+        "level": "DEBUG",
+        "description": "Action counting events in gameplay phase"
+    },
+    "transition_trigger": {
+        "level": "DEBUG",
+        "description": "Transition trigger pattern detection"
+    },
+    "character_extraction": {
+        "level": "DEBUG",
+        "description": "Character information extraction from chat"
+    },
+    "debug_state": {
+        "level": "DEBUG", 
+        "description": "State snapshots at workflow checkpoints"
+    },
+    "workflow_error": {
+        "level": "ERROR",
+        "description": "Errors in workflow execution with recovery info"
+    },
+    "session_lifecycle": {
+        "level": "INFO",
+        "description": "Session creation, restoration, cleanup events",
+        "rate_limit": {"per_second": 50, "burst": 200}
+    },
+    "loop_blocked": {
+        "level": "WARNING",
+        "description": "Event loop stalls with blocking stack and session context"
+    },
+    "session_lookup": {
+        "level": "DEBUG",
+        "description": "Session retrieval, updates and misses (every request)",
+        "sample_rate": 0.01,
+        "rate_limit": {"per_second": 20, "burst": 50}
+    },
+    "message_flow": {
+        "level": "INFO",
+        "description": "Per-turn workflow start/completion and SSE stream lifecycle",
+        "rate_limit": {"per_second": 50, "burst": 200}
+    },
+    "stream_chunk": {
+        "level": "DEBUG",
+        "description": "Per-message and per-chunk streaming details",
+        "sample_rate": 0.01,
+        "rate_limit": {"per_second": 10, "burst": 20}
+    },
+    "log_suppression": {
+        "level": "INFO",
+        "description": "Periodic summary of sampled-out and rate-limited log events"
+    }
+}
+
+def get_log_filter_for_event_types(event_types: list) -> Dict[str, Any]:
+    """
+    Generate log filter configuration for specific event types.
+    
+    Args:
+        event_types: List of event types to include
+        
+    Returns:
+        Filter configuration dict
+    """
+    
+    return {
+        "include_events": event_types,
+        "event_metadata": {
+            event_type: PHASE2_EVENT_TYPES.get(event_type, {})
+            for event_type in event_types
+        }
+    }
+
+# Predefined filter sets
+PRODUCTION_EVENTS = [
+    "phase_transition", "agent_switch", "setup_completion",
+    "message_blocked", "workflow_error", "session_lifecycle", "loop_blocked",
+    "message_flow", "log_suppression"
+]
+
+DEBUG_EVENTS = [
+    "action_count", "transition_trigger", "character_extraction", 
+    "debug_state", "session_lookup", "stream_chunk"
+]
+
+ALL_PHASE2_EVENTS = PRODUCTION_EVENTS + DEBUG_EVENTS
+
+def configure_for_development():
+    """Configure logging for development with all Phase 2 events."""
+    configure_logging("DEBUG", enable_debug=True, log_format="console")
+
+def configure_for_production():
+    """Configure logging for production: JSON, async writer, essential events only."""
+    configure_logging("INFO", enable_debug=False, log_format="json", async_writer=True, sampling=True) 
\ No newline at end of file
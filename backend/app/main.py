@@ -6,16 +6,27 @@ FastAPI Server mit SSE Streaming Support
 import os
 import asyncio
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
 import structlog
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from .config import settings
+from .logging_config import configure_logging
 from .utils import get_startup_info
-from .services import close_llm_service
+from .services import (
+    close_llm_service,
+    get_event_loop_monitor,
+    close_event_loop_monitor,
+    get_metrics_registry,
+    ServerTimingMiddleware,
+    timed_stage,
+    close_tracing
+)
+from .agents.opener_pool import get_opener_pool
+from .agents.response_cache import get_response_cache
 
 # Explizit Environment Variables für LangSmith setzen BEVOR LangChain importiert wird
 if settings.langsmith_tracing:
@@ -27,17 +38,15 @@ if settings.langsmith_api_key:
 os.environ["LANGSMITH_ENDPOINT"] = settings.langsmith_endpoint  
 os.environ["LANGSMITH_PROJECT"] = settings.langsmith_project
 
-# Configure structured logging
-structlog.configure(
-    processors=[
-        structlog.contextvars.merge_contextvars,
-        structlog.processors.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.dev.ConsoleRenderer()
-    ],
-    wrapper_class=structlog.make_filtering_bound_logger(20),  # INFO level
-    logger_factory=structlog.PrintLoggerFactory(),
-    cache_logger_on_first_use=True,
+# Configure structured logging (structlog + stdlib, ein Setup für die ganze App)
+configure_logging(
+    settings.log_level,
+    log_format="json" if settings.log_mode == "production" else "console",
+    async_writer=settings.log_mode == "production",
+    max_queue_size=settings.log_queue_size,
+    sampling=settings.log_sampling,
+    summary_interval=settings.log_summary_interval_seconds,
+    sampling_overrides=settings.log_sampling_overrides
 )
 
 logger = structlog.get_logger()
@@ -45,6 +54,7 @@ logger = structlog.get_logger()
 # Log LangSmith Konfiguration
 logger.info("LangSmith configuration loaded",
            tracing_enabled=settings.langsmith_tracing,
+           sample_rate=settings.langsmith_sample_rate,
            project=settings.langsmith_project,
            endpoint=settings.langsmith_endpoint)
 
@@ -66,6 +76,23 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error("Startup validation failed", error=str(e))
     
+    # Event Loop Watchdog
+    if settings.event_loop_monitor_enabled:
+        await get_event_loop_monitor().start()
+    
+    # Turn Journal: unvollständige Turns abgestürzter Worker abschließen oder zurückrollen
+    if settings.turn_journal_enabled:
+        await (await get_session_manager()).recover_turns()
+    
+    # Opener Pool: Setup-Eröffnungen für neue Sessions im Hintergrund vorab generieren
+    if settings.opener_pool_enabled:
+        from .graph.nodes_agents import get_setup_agent
+        await get_opener_pool().start(await get_setup_agent())
+    
+    # Cold History: Historie idle Sessions komprimieren
+    if settings.cold_history_enabled:
+        await (await get_session_manager()).start_history_compaction()
+    
     yield
     
     # Cleanup
@@ -74,6 +101,12 @@ async def lifespan(app: FastAPI):
         await close_llm_service()
         logger.info("LLM Service closed")
         
+        await close_event_loop_monitor()
+        await get_opener_pool().stop()
+        close_tracing()
+        # Cold History stoppen, Turn Journal und ausstehende Session-Store Writes abschließen
+        await (await get_session_manager()).close()
+        
         # Reset Agent instances
         from .graph import reset_agent_instances
         reset_agent_instances()
@@ -86,7 +119,8 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title="TextRPG Backend",
     description="Generatives TextRPG mit AI-Agenten - Phase 1 Foundation",
-    version="1.0.0-phase1"
+    version="1.0.0-phase1",
+    lifespan=lifespan
 )
 
 # CORS Configuration für Development
@@ -96,8 +130,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag", "X-Session-Affinity"],
 )
 
+# Server-Timing Header mit Stage-Dauern für normale (nicht-SSE) Responses
+app.add_middleware(ServerTimingMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -202,17 +240,110 @@ async def test_workflow():
     }
 
 
+@app.get("/debug/event-loop")
+async def event_loop_status():
+    """Event Loop Watchdog: Lag-Statistik und letzte Blockaden mit Stack"""
+    if not settings.event_loop_monitor_enabled:
+        return {"status": "disabled"}
+    
+    return {
+        "status": "success",
+        **get_event_loop_monitor().get_stats()
+    }
+
+
+@app.get("/debug/cold-history")
+async def cold_history_status():
+    """Cold History: eingefrorene Sessions, Kompressionsrate und Kosten beim Entpacken"""
+    session_manager = await get_session_manager()
+    return {
+        "status": "success" if settings.cold_history_enabled else "disabled",
+        **session_manager.get_cold_history_stats()
+    }
+
+
+@app.get("/debug/turn-journal")
+async def turn_journal_status():
+    """Turn Journal: Records, gebündelte fsyncs und offene Turns"""
+    session_manager = await get_session_manager()
+    if session_manager.journal is None:
+        return {"status": "disabled"}
+    
+    return {
+        "status": "success",
+        **session_manager.journal.stats()
+    }
+
+
+@app.get("/debug/speculation")
+async def speculation_status(session_id: Optional[str] = Query(None, description="Stats for a single session")):
+    """Spekulative Vorab-Generierung: Hit Rate, verschwendete Tokens und gesparte Latenz (gesamt oder pro Session)"""
+    session_manager = await get_session_manager()
+    stats = session_manager.get_speculation_stats(session_id)
+    if stats is None:
+        return {"status": "disabled"}
+    
+    return {
+        "status": "success",
+        **({"session_id": session_id} if session_id else {}),
+        **stats
+    }
+
+
+@app.get("/debug/opener-pool")
+async def opener_pool_status():
+    """Opener Pool: vorgehaltene Setup-Eröffnungen, Prompt-Version und Invalidierungen"""
+    return {
+        "status": "success" if settings.opener_pool_enabled else "disabled",
+        **get_opener_pool().stats()
+    }
+
+
+@app.get("/debug/response-cache")
+async def response_cache_status():
+    """Response Cache: freigeschaltete Routes, Einträge und Hit Rate pro Route"""
+    cache = get_response_cache()
+    return {
+        "status": "success" if cache.routes else "disabled",
+        **cache.stats()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus Text-Export aller In-Process Metriken (Turn-Stages, Event Loop, LLM)"""
+    with timed_stage("metrics_render"):
+        body = get_metrics_registry().render_prometheus()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
 @app.get("/sessions")
-async def get_all_sessions():
-    """Get overview of all active sessions"""
+async def get_all_sessions(
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    offset: int = Query(0, ge=0, description="Number of sessions to skip"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Sort order by last_updated"),
+    story_phase: Optional[str] = Query(None, description="Filter by story phase"),
+    current_agent: Optional[str] = Query(None, description="Filter by current agent"),
+    active: Optional[bool] = Query(None, description="Filter by active flag")
+):
+    """Get overview of active sessions (paginated, served from the session index)"""
     try:
         session_manager = await get_session_manager()
-        sessions = session_manager.get_all_sessions()
+        page = session_manager.list_sessions(
+            limit=limit,
+            offset=offset,
+            order=order,
+            story_phase=story_phase,
+            current_agent=current_agent,
+            active=active
+        )
+        counts = session_manager.get_session_counts()
         
         return {
             "status": "success",
-            "total_sessions": len(sessions),
-            "sessions": sessions
+            "total_sessions": counts["total"],
+            "counts": counts,
+            **page
         }
         
     except Exception as e:
@@ -222,6 +353,27 @@ async def get_all_sessions():
             "error_message": str(e)
         }
 
+
+@app.get("/sessions/top-cost")
+async def get_top_cost_sessions(limit: int = 10):
+    """Top-N Sessions nach berechneten LLM-Kosten (Token Usage pro Session und Model)"""
+    try:
+        session_manager = await get_session_manager()
+        sessions = session_manager.get_top_sessions_by_cost(max(1, min(limit, 100)))
+        
+        return {
+            "status": "success",
+            "limit": limit,
+            "sessions": sessions
+        }
+        
+    except Exception as e:
+        logger.error("Failed to get top cost sessions", error=str(e))
+        return {
+            "status": "error",
+            "error_message": str(e)
+        }
+
 # Route imports will be added in subsequent tasks
 # from app.routes import chat
 
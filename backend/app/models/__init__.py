@@ -11,11 +11,41 @@ from .messages import (
     StreamingResponse
 )
 
+from .records import (
+    MessageRecord,
+    message_id_key,
+    timestamp_us,
+    to_message_record
+)
+
+from .provider_format import (
+    ROLE_BY_TYPE,
+    ProviderMessageCache,
+    get_provider_message_cache,
+    provider_role,
+    provider_to_langchain,
+    to_provider_messages,
+    to_provider_messages_json
+)
+
+from .cold_history import ColdHistory, ColdHistoryBlock
+from .snapshot import (
+    SNAPSHOT_MEDIA_TYPE,
+    SNAPSHOT_VERSION,
+    SnapshotDecoder,
+    SnapshotError,
+    decode_snapshot,
+    encode_snapshot,
+    iter_snapshot,
+    resolve_codec
+)
+
 from .state import (
     ChatSession,
     ChatState,
     ChatStateDict,
     SessionInfo,
+    append_messages,
     AgentType,
     StoryPhase,
     EndTrigger
@@ -35,7 +65,8 @@ from .converters import (
     messages_from_langchain,
     create_system_message,
     create_ai_message,
-    create_human_message
+    create_human_message,
+    message_to_dict
 )
 
 __all__ = [
@@ -46,11 +77,41 @@ __all__ = [
     "ChatResponse",
     "StreamingResponse",
     
+    # Compact Message Records (State-intern)
+    "MessageRecord",
+    "message_id_key",
+    "timestamp_us",
+    "to_message_record",
+    
+    # Provider Format (gecachte LLM-Konvertierung)
+    "ROLE_BY_TYPE",
+    "ProviderMessageCache",
+    "get_provider_message_cache",
+    "provider_role",
+    "provider_to_langchain",
+    "to_provider_messages",
+    "to_provider_messages_json",
+    
+    # Cold History (komprimierte Historie idle Sessions)
+    "ColdHistory",
+    "ColdHistoryBlock",
+    
+    # Session Snapshots
+    "SNAPSHOT_MEDIA_TYPE",
+    "SNAPSHOT_VERSION",
+    "SnapshotDecoder",
+    "SnapshotError",
+    "decode_snapshot",
+    "encode_snapshot",
+    "iter_snapshot",
+    "resolve_codec",
+    
     # State Models - PRD Extended
     "ChatSession",
     "ChatState", 
     "ChatStateDict",
     "SessionInfo",
+    "append_messages",
     "AgentType",
     "StoryPhase",
     "EndTrigger",
@@ -68,5 +129,6 @@ __all__ = [
     "messages_from_langchain",
     "create_system_message",
     "create_ai_message",
-    "create_human_message"
+    "create_human_message",
+    "message_to_dict"
 ] 
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+TextRPG Cold History
+Komprimierte Message-Blöcke für idle Sessions
+
+Alte Narrative wird nur noch von der History-API oder einer Zusammenfassung
+gelesen. Für idle Sessions werden die Messages daher bis auf einen heißen Tail
+(die jüngsten Messages, die Agents und die erste History-Seite lesen) in
+komprimierte Blöcke gepackt (msgpack-Records wie im Snapshot-Format, zstd oder
+zlib) und erst entpackt, wenn ältere Messages gebraucht werden.
+
+Beim Entpacken werden die Blöcke verworfen - die Session hält danach nur noch
+die unkomprimierte Liste, ein erneutes Einfrieren packt neu.
+"""
+
+import zlib
+from typing import List, Optional
+
+import ormsgpack
+
+from .packing import decode_record, default_codec, encode_record, zstandard
+from .records import MessageRecord
+
+
+class ColdHistoryBlock:
+    """Komprimierter Block aufeinanderfolgender Messages"""
+
+    __slots__ = ("codec", "data", "count", "raw_bytes")
+
+    def __init__(self, codec: str, data: bytes, count: int, raw_bytes: int):
+        self.codec = codec
+        self.data = data
+        self.count = count
+        self.raw_bytes = raw_bytes
+
+    @classmethod
+    def pack(cls, messages: List[MessageRecord], codec: str, level: int = 3) -> "ColdHistoryBlock":
+        raw = ormsgpack.packb([encode_record(message) for message in messages])
+        if codec == "zstd":
+            # compress() liefert einen auf compressBound allokierten Buffer - exakte Kopie behalten
+            data = bytes(memoryview(zstandard.ZstdCompressor(level=level).compress(raw)))
+        elif codec == "zlib":
+            data = zlib.compress(raw, level)
+        else:
+            data = raw
+        return cls(codec, data, len(messages), len(raw))
+
+    def unpack(self) -> List[MessageRecord]:
+        if self.codec == "zstd":
+            raw = zstandard.ZstdDecompressor().decompress(self.data, max_output_size=self.raw_bytes)
+        elif self.codec == "zlib":
+            raw = zlib.decompress(self.data)
+        else:
+            raw = self.data
+        return [decode_record(values) for values in ormsgpack.unpackb(raw)]
+
+
+class ColdHistory:
+    """
+    Kalte Historie einer Session
+
+    Die ersten packed_count Messages der Session liegen in blocks. Ist die Session
+    eingefroren (frozen), hält ChatState.messages nur die Messages danach.
+    """
+
+    __slots__ = ("blocks", "packed_count", "frozen", "last_access")
+
+    def __init__(self):
+        self.blocks: List[ColdHistoryBlock] = []
+        self.packed_count = 0
+        self.frozen = False
+        self.last_access = 0.0
+
+    @property
+    def compressed_bytes(self) -> int:
+        return sum(len(block.data) for block in self.blocks)
+
+    @property
+    def raw_bytes(self) -> int:
+        return sum(block.raw_bytes for block in self.blocks)
+
+    def reset(self) -> None:
+        """Verwirft alle Blöcke"""
+        self.blocks = []
+        self.packed_count = 0
+        self.frozen = False
+
+    def freeze(
+        self,
+        messages: List[MessageRecord],
+        block_size: int = 64,
+        codec: Optional[str] = None,
+        level: int = 3,
+        hot_messages: int = 0
+    ) -> List[MessageRecord]:
+        """
+        Packt alle Messages bis auf die jüngsten hot_messages in Blöcke
+
+        Args:
+            messages: Vollständige Message-Liste der Session (nicht eingefroren)
+            block_size: Maximale Messages pro Block
+            codec: none | zstd | zlib (default: zstd wenn installiert, sonst zlib)
+            level: Kompressionslevel
+            hot_messages: Anzahl jüngster Messages, die unkomprimiert bleiben
+
+        Returns:
+            Verbleibender heißer Tail
+        """
+        codec = codec or default_codec()
+        split = max(len(messages) - hot_messages, 0)
+        for start in range(0, split, block_size):
+            chunk = messages[start:min(start + block_size, split)]
+            self.blocks.append(ColdHistoryBlock.pack(chunk, codec, level))
+            self.packed_count += len(chunk)
+        self.frozen = True
+        return messages[split:]
+
+    def thaw(self, hot_messages: List[MessageRecord]) -> List[MessageRecord]:
+        """
+        Entpackt alle Blöcke und verwirft sie
+
+        Args:
+            hot_messages: Heißer Tail der eingefrorenen Session
+
+        Returns:
+            Vollständige Message-Liste
+        """
+        messages: List[MessageRecord] = []
+        for block in self.blocks:
+            messages.extend(block.unpack())
+        messages.extend(hot_messages)
+        self.reset()
+        return messages
@@ -3,14 +3,15 @@ TextRPG Model Converters
 Utility-Funktionen für Konvertierung zwischen Pydantic und LangChain Models
 """
 
-from typing import List, Union
+from typing import Any, Dict, List, Union
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain_core.messages.base import BaseMessage as LangChainBaseMessage
 
 from .messages import ChatMessage
+from .records import MessageRecord
 
 
-def pydantic_to_langchain(message: ChatMessage) -> BaseMessage:
+def pydantic_to_langchain(message: Union[ChatMessage, MessageRecord]) -> BaseMessage:
     """
     Konvertiert ChatMessage (Pydantic) zu LangChain BaseMessage
     
@@ -24,17 +25,17 @@ def pydantic_to_langchain(message: ChatMessage) -> BaseMessage:
     if message.type == "human":
         return HumanMessage(
             content=message.content,
-            additional_kwargs=message.metadata
+            additional_kwargs=dict(message.metadata)
         )
     elif message.type == "ai":
         return AIMessage(
             content=message.content,
-            additional_kwargs=message.metadata
+            additional_kwargs=dict(message.metadata)
         )
     elif message.type == "system":
         return SystemMessage(
             content=message.content,
-            additional_kwargs=message.metadata
+            additional_kwargs=dict(message.metadata)
         )
     else:
         raise ValueError(f"Unknown message type: {message.type}")
@@ -146,4 +147,24 @@ def create_human_message(content: str, metadata: dict = None) -> ChatMessage:
         type="human",
         content=content, 
         metadata=metadata or {}
-    ) 
\ No newline at end of file
+    ) 
+
+def message_to_dict(message: Union[ChatMessage, MessageRecord]) -> Dict[str, Any]:
+    """
+    JSON-fähige Darstellung einer Message (API Responses, NDJSON Export)
+    
+    Args:
+        message: ChatMessage oder MessageRecord
+        
+    Returns:
+        Dict mit id, type, content, timestamp (ISO) und metadata
+    """
+    if isinstance(message, MessageRecord):
+        return message.to_dict()
+    return {
+        "id": message.id,
+        "type": message.type,
+        "content": message.content,
+        "timestamp": message.timestamp.isoformat(),
+        "metadata": message.metadata
+    }
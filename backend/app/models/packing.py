@@ -0,0 +1,48 @@
+"""
+TextRPG Message Packing
+Gemeinsame Binär-Darstellung von MessageRecords (Snapshots, Cold History)
+
+Ein Record wird als msgpack-Array [uid, type, content, ts_us, metadata] gepackt:
+UUID-Ints als 16 Bytes, bekannte Message Types als kleine Integer-Codes.
+"""
+
+from typing import Any, List
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard ist optional, Fallback zlib
+    zstandard = None
+
+from .records import MessageRecord, MESSAGE_TYPES
+
+
+_TYPE_CODES = {message_type: code for code, message_type in enumerate(MESSAGE_TYPES)}
+
+
+def default_codec() -> str:
+    """Bevorzugter Kompressions-Codec: zstd wenn installiert, sonst zlib"""
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def encode_record(record: MessageRecord) -> List[Any]:
+    """MessageRecord → msgpack-fähiges Array"""
+    uid = record.uid
+    return [
+        uid.to_bytes(16, "big") if isinstance(uid, int) else uid,
+        _TYPE_CODES.get(record.type, record.type),
+        record.content,
+        record.ts_us,
+        record._metadata
+    ]
+
+
+def decode_record(values: List[Any]) -> MessageRecord:
+    """msgpack-Array → MessageRecord"""
+    uid, message_type, content, ts_us, metadata = values
+    return MessageRecord(
+        int.from_bytes(uid, "big") if isinstance(uid, bytes) else uid,
+        MESSAGE_TYPES[message_type] if isinstance(message_type, int) else message_type,
+        content,
+        ts_us,
+        metadata
+    )
@@ -0,0 +1,144 @@
+"""
+TextRPG Provider Message Format
+Einheitliche, gecachte Konvertierung von Messages ins Provider-Format (OpenAI Chat)
+
+Eine Message ändert sich nach dem Anlegen nicht mehr - die Provider-Darstellung
+({"role", "content"} und die JSON-Bytes davon) wird daher pro Message ID einmal
+gebaut und in einem begrenzten LRU-Cache gehalten. Ein Request kostet damit
+O(neue Messages) statt O(Fenster) Konvertierungen pro Turn.
+"""
+
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+
+from .records import MessageRecord
+
+
+# Message Type → Provider Rolle (einzige Stelle für dieses Mapping)
+ROLE_BY_TYPE: Dict[str, str] = {
+    "human": "user",
+    "ai": "assistant",
+    "system": "system"
+}
+
+_LANGCHAIN_BY_ROLE = {
+    "user": HumanMessage,
+    "assistant": AIMessage,
+    "system": SystemMessage
+}
+
+
+def provider_role(message_type: str) -> str:
+    """Provider-Rolle eines Message Types (unbekannte Types → user)"""
+    return ROLE_BY_TYPE.get(message_type, "user")
+
+
+def encode_json(value: Any) -> bytes:
+    """JSON-Encoding für Request Bodies (kompakt, UTF-8)"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class ProviderMessageCache:
+    """
+    LRU-Cache: Message ID → Provider-Dict (+ JSON-Bytes, lazy)
+
+    Gecachte Dicts werden geteilt und dürfen nicht verändert werden.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, List[Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, message: Any) -> List[Any]:
+        key = message.uid if isinstance(message, MessageRecord) else message.id
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        entry = [{"role": provider_role(message.type), "content": message.content}, None]
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def message(self, message: Any) -> Dict[str, str]:
+        """Provider-Dict einer Message (gecacht)"""
+        return self._entry(message)[0]
+
+    def message_json(self, message: Any) -> bytes:
+        """JSON-Bytes des Provider-Dicts (gecacht)"""
+        entry = self._entry(message)
+        if entry[1] is None:
+            entry[1] = encode_json(entry[0])
+        return entry[1]
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+
+_provider_message_cache: Optional[ProviderMessageCache] = None
+
+
+def get_provider_message_cache() -> ProviderMessageCache:
+    """
+    Singleton Getter für den Provider Message Cache (Größe über Settings)
+
+    Returns:
+        ProviderMessageCache instance
+    """
+    global _provider_message_cache
+
+    if _provider_message_cache is None:
+        from ..config import settings
+
+        _provider_message_cache = ProviderMessageCache(settings.llm_message_cache_size)
+
+    return _provider_message_cache
+
+
+def to_provider_messages(messages: Sequence[Any]) -> List[Dict[str, str]]:
+    """
+    Provider-Dicts für eine Message-Liste (gecacht pro Message ID)
+
+    Args:
+        messages: MessageRecords oder ChatMessages
+
+    Returns:
+        Liste von {"role", "content"} Dicts (read-only)
+    """
+    cache = get_provider_message_cache()
+    return [cache.message(message) for message in messages]
+
+
+def to_provider_messages_json(messages: Sequence[Any], prefix: Sequence[Dict[str, str]] = ()) -> bytes:
+    """
+    JSON-Array der Provider-Messages aus gecachten Bytes
+
+    Args:
+        messages: MessageRecords oder ChatMessages
+        prefix: Zusätzliche (ungecachte) Provider-Dicts vor der Historie, z.B. System-Prompts
+
+    Returns:
+        JSON-Bytes eines Arrays, direkt in einen Request Body einsetzbar
+    """
+    cache = get_provider_message_cache()
+    parts = [encode_json(message) for message in prefix]
+    parts.extend(cache.message_json(message) for message in messages)
+    return b"[" + b",".join(parts) + b"]"
+
+
+def provider_to_langchain(provider_message: Dict[str, str]) -> BaseMessage:
+    """Provider-Dict → LangChain Message"""
+    return _LANGCHAIN_BY_ROLE[provider_message["role"]](content=provider_message["content"])
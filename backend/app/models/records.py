@@ -0,0 +1,176 @@
+"""
+TextRPG Message Records
+Kompakte In-Memory Darstellung der Message-Historie im ChatState
+
+ChatMessage (Pydantic) bleibt das API-Model, LangChain Messages das LLM-Format -
+im State liegt nur noch MessageRecord: __slots__, UUID als int, Timestamp als
+int Mikrosekunden, interned type und Metadata erst bei Bedarf. Konvertiert wird
+an den Grenzen (API Responses, LLM Requests).
+"""
+
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Union
+
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+
+from .messages import ChatMessage
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_EMPTY_METADATA: Mapping[str, Any] = MappingProxyType({})
+
+# Message Types - interned, damit alle Records dieselben String-Objekte teilen
+MESSAGE_TYPES = tuple(sys.intern(message_type) for message_type in ("human", "ai", "system"))
+_INTERNED_TYPES = {message_type: message_type for message_type in MESSAGE_TYPES}
+
+MessageId = Union[int, str]
+
+
+def message_id_key(message_id: str) -> MessageId:
+    """Interner Schlüssel einer Message ID (int für UUIDs, sonst der String selbst)"""
+    try:
+        return uuid.UUID(message_id).int
+    except (ValueError, AttributeError, TypeError):
+        return message_id
+
+
+def timestamp_us(timestamp: datetime) -> int:
+    """datetime (naive = UTC) → Mikrosekunden seit Epoch"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+
+def datetime_from_us(value: int) -> datetime:
+    """Mikrosekunden seit Epoch → naive UTC datetime"""
+    return _EPOCH + timedelta(microseconds=value)
+
+
+class MessageRecord:
+    """
+    Kompakter Message-Record für ChatState.messages
+
+    Attribute-kompatibel mit ChatMessage (id, type, content, timestamp, metadata),
+    Agents und API-Serialisierung funktionieren also unverändert.
+    """
+
+    __slots__ = ("uid", "type", "content", "ts_us", "_metadata")
+
+    def __init__(
+        self,
+        uid: MessageId,
+        type: str,
+        content: str,
+        ts_us: int,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.uid = uid
+        self.type = _INTERNED_TYPES.get(type) or sys.intern(type)
+        self.content = content
+        self.ts_us = ts_us
+        self._metadata = metadata or None
+
+    @classmethod
+    def create(cls, type: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> "MessageRecord":
+        """
+        Neuer Record mit frischer UUID und aktuellem Timestamp
+
+        Args:
+            type: human | ai | system
+            content: Message Content
+            metadata: Optional metadata (agent, model, usage, ...)
+        """
+        return cls(uuid.uuid4().int, type, content, time.time_ns() // 1000, metadata)
+
+    @classmethod
+    def from_chat_message(cls, message: ChatMessage) -> "MessageRecord":
+        return cls(
+            message_id_key(message.id),
+            message.type,
+            message.content,
+            timestamp_us(message.timestamp),
+            dict(message.metadata) if message.metadata else None
+        )
+
+    @classmethod
+    def from_langchain(cls, message: BaseMessage) -> "MessageRecord":
+        if isinstance(message, HumanMessage):
+            message_type = "human"
+        elif isinstance(message, AIMessage):
+            message_type = "ai"
+        else:
+            message_type = "system"
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        return cls.create(message_type, content, dict(message.additional_kwargs) or None)
+
+    @property
+    def id(self) -> str:
+        uid = self.uid
+        return str(uuid.UUID(int=uid)) if isinstance(uid, int) else uid
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime_from_us(self.ts_us)
+
+    @property
+    def metadata(self) -> Mapping[str, Any]:
+        """Metadata (read-only leer, wenn keine gesetzt - ändern über set_metadata)"""
+        return self._metadata if self._metadata is not None else _EMPTY_METADATA
+
+    def set_metadata(self, **values: Any) -> None:
+        if self._metadata is None:
+            self._metadata = {}
+        self._metadata.update(values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-fähige API-Darstellung (gleiches Format wie message_to_dict für ChatMessage)"""
+        return {
+            "id": self.id,
+            "type": self.type,
+            "content": self.content,
+            "timestamp": self.timestamp.isoformat(),
+            "metadata": dict(self.metadata)
+        }
+
+    def to_chat_message(self) -> ChatMessage:
+        return ChatMessage(
+            id=self.id,
+            type=self.type,
+            content=self.content,
+            timestamp=self.timestamp,
+            metadata=dict(self.metadata)
+        )
+
+    def to_langchain(self) -> BaseMessage:
+        if self.type == "human":
+            return HumanMessage(content=self.content)
+        if self.type == "ai":
+            return AIMessage(content=self.content)
+        return SystemMessage(content=self.content)
+
+    def __repr__(self) -> str:
+        return f"MessageRecord(id={self.id!r}, type={self.type!r}, content={self.content[:40]!r})"
+
+
+def to_message_record(message: Any) -> MessageRecord:
+    """
+    Kanonisiert eine Message für den State (MessageRecord, ChatMessage, LangChain Message oder Text)
+
+    Args:
+        message: Beliebige Message-Darstellung
+
+    Returns:
+        MessageRecord (bestehende Records werden unverändert zurückgegeben)
+    """
+    if isinstance(message, MessageRecord):
+        return message
+    if isinstance(message, ChatMessage):
+        return MessageRecord.from_chat_message(message)
+    if isinstance(message, BaseMessage):
+        return MessageRecord.from_langchain(message)
+    return MessageRecord.create("ai", str(message))
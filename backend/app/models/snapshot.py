@@ -0,0 +1,256 @@
+"""
+TextRPG Session Snapshots
+Versioniertes, kompaktes Binärformat für ChatState (Save Slots, Export, Restore)
+
+Aufbau:
+    Header (6 Bytes): b"TRPG" + Format-Version + Codec (0 = none, 1 = zstd, 2 = zlib)
+    Body (ggf. komprimiert): Folge von Frames [u32 Länge][msgpack]
+        1. Frame: State-Felder (Counters, handoff_data, Usage, Timestamps)
+        n Frames: Message-Batches [[uid, type, content, ts_us, metadata], ...]
+        letzter Frame: {"end": message_count}
+
+Encode und Decode arbeiten inkrementell (Generator bzw. SnapshotDecoder.feed),
+große Sessions müssen also weder komplett im Speicher serialisiert noch als
+Ganzes empfangen werden.
+"""
+
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+import ormsgpack
+
+from .packing import decode_record, default_codec, encode_record, zstandard
+from .records import MessageRecord, datetime_from_us, timestamp_us
+from .state import ChatState
+
+
+SNAPSHOT_MAGIC = b"TRPG"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MEDIA_TYPE = "application/vnd.textrpg.snapshot"
+
+CODEC_NONE = 0
+CODEC_ZSTD = 1
+CODEC_ZLIB = 2
+CODECS = {"none": CODEC_NONE, "zstd": CODEC_ZSTD, "zlib": CODEC_ZLIB}
+
+_HEADER = struct.Struct(">4sBB")
+_FRAME_LENGTH = struct.Struct(">I")
+
+# Decompression in kleinen Schritten, damit das Größenlimit vor großen Allokationen greift
+_DECOMPRESS_SLICE = 1024
+
+
+class SnapshotError(ValueError):
+    """Snapshot ist ungültig, unvollständig, zu groß oder hat eine unbekannte Version"""
+
+
+def resolve_codec(codec: Optional[str] = None) -> str:
+    """
+    Prüft den Codec (default: zstd wenn installiert, sonst zlib)
+
+    Raises:
+        SnapshotError: Unbekannter oder nicht verfügbarer Codec
+    """
+    codec = codec or default_codec()
+    if codec not in CODECS:
+        raise SnapshotError(f"Unknown snapshot codec: {codec}")
+    if codec == "zstd" and zstandard is None:
+        raise SnapshotError("zstd codec requires the zstandard package")
+    return codec
+
+
+def _frame(value: Any) -> bytes:
+    payload = ormsgpack.packb(value)
+    return _FRAME_LENGTH.pack(len(payload)) + payload
+
+
+def _state_fields(state: ChatState) -> Dict[str, Any]:
+    return {
+        "session_id": state.session_id,
+        "story_phase": state.story_phase,
+        "current_agent": state.current_agent,
+        "handoff_data": state.handoff_data,
+        "chapter_count": state.chapter_count,
+        "interaction_count": state.interaction_count,
+        "world_state": state.world_state,
+        "token_usage": state.token_usage,
+        "token_usage_by_model": state.token_usage_by_model,
+        "active": state.active,
+        "created_at": timestamp_us(state.created_at),
+        "last_updated": timestamp_us(state.last_updated),
+        "end_trigger": state.end_trigger,
+        "version": state.version,
+        "message_count": len(state.messages)
+    }
+
+
+def _raw_frames(state: ChatState, batch_size: int) -> Iterator[bytes]:
+    messages = list(state.messages)
+    yield _frame(_state_fields(state))
+    for start in range(0, len(messages), batch_size):
+        yield _frame([encode_record(record) for record in messages[start:start + batch_size]])
+    yield _frame({"end": len(messages)})
+
+
+def iter_snapshot(state: ChatState, codec: Optional[str] = None, batch_size: int = 256, level: int = 3) -> Iterator[bytes]:
+    """
+    Streaming Encode eines ChatState
+
+    Args:
+        state: Session State
+        codec: none | zstd | zlib (default: zstd wenn installiert)
+        batch_size: Messages pro Frame
+        level: Kompressionslevel
+
+    Yields:
+        Snapshot-Bytes in Chunks (Header zuerst)
+    """
+    codec = resolve_codec(codec)
+    yield _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, CODECS[codec])
+
+    if codec == "none":
+        yield from _raw_frames(state, batch_size)
+        return
+
+    compressor = zstandard.ZstdCompressor(level=level).compressobj() if codec == "zstd" else zlib.compressobj(level)
+    for frame in _raw_frames(state, batch_size):
+        chunk = compressor.compress(frame)
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def encode_snapshot(state: ChatState, codec: Optional[str] = None, level: int = 3) -> bytes:
+    """Snapshot eines ChatState als bytes (siehe iter_snapshot)"""
+    return b"".join(iter_snapshot(state, codec, level=level))
+
+
+class SnapshotDecoder:
+    """
+    Inkrementeller Snapshot-Decoder
+
+    Bytes per feed() in beliebigen Chunks einspeisen, finish() liefert den ChatState.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: Limit für den dekomprimierten Body (Schutz vor Decompression Bombs)
+        """
+        self.max_bytes = max_bytes
+        self._header = b""
+        self._codec: Optional[int] = None
+        self._decompressor = None
+        self._buffer = bytearray()
+        self._decoded_bytes = 0
+        self._fields: Optional[Dict[str, Any]] = None
+        self._messages: List[MessageRecord] = []
+        self._end: Optional[int] = None
+
+    def feed(self, data: bytes) -> None:
+        """
+        Nächsten Chunk einspeisen
+
+        Raises:
+            SnapshotError: Ungültiges Format, Version, Codec oder Größenlimit
+        """
+        try:
+            self._feed(data)
+        except SnapshotError:
+            raise
+        except Exception as e:
+            raise SnapshotError(f"Corrupt snapshot: {e}") from e
+
+    def _feed(self, data: bytes) -> None:
+        if self._codec is None:
+            self._header += data
+            if len(self._header) < _HEADER.size:
+                return
+            magic, version, codec = _HEADER.unpack_from(self._header)
+            if magic != SNAPSHOT_MAGIC:
+                raise SnapshotError("Not a TextRPG snapshot")
+            if version != SNAPSHOT_VERSION:
+                raise SnapshotError(f"Unsupported snapshot version: {version}")
+            if codec == CODEC_ZSTD:
+                if zstandard is None:
+                    raise SnapshotError("zstd snapshot requires the zstandard package")
+                self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+            elif codec == CODEC_ZLIB:
+                self._decompressor = zlib.decompressobj()
+            elif codec != CODEC_NONE:
+                raise SnapshotError(f"Unknown snapshot codec: {codec}")
+            self._codec = codec
+            data, self._header = self._header[_HEADER.size:], b""
+
+        if self._decompressor is None:
+            self._append(data)
+            return
+
+        for start in range(0, len(data), _DECOMPRESS_SLICE):
+            self._append(self._decompressor.decompress(data[start:start + _DECOMPRESS_SLICE]))
+
+    def _append(self, data: bytes) -> None:
+        self._decoded_bytes += len(data)
+        if self._decoded_bytes > self.max_bytes:
+            raise SnapshotError(f"Snapshot exceeds {self.max_bytes} bytes")
+        self._buffer += data
+        self._read_frames()
+
+    def _read_frames(self) -> None:
+        offset = 0
+        buffer = self._buffer
+        while len(buffer) - offset >= _FRAME_LENGTH.size:
+            (length,) = _FRAME_LENGTH.unpack_from(buffer, offset)
+            end = offset + _FRAME_LENGTH.size + length
+            if len(buffer) < end:
+                break
+            self._handle_frame(ormsgpack.unpackb(bytes(buffer[offset + _FRAME_LENGTH.size:end])))
+            offset = end
+        if offset:
+            del buffer[:offset]
+
+    def _handle_frame(self, value: Any) -> None:
+        if self._end is not None:
+            raise SnapshotError("Data after end of snapshot")
+        if self._fields is None:
+            if not isinstance(value, dict) or "session_id" not in value:
+                raise SnapshotError("Snapshot header frame missing")
+            self._fields = value
+        elif isinstance(value, list):
+            self._messages.extend(decode_record(values) for values in value)
+        elif isinstance(value, dict) and "end" in value:
+            self._end = value["end"]
+        else:
+            raise SnapshotError("Unexpected snapshot frame")
+
+    def finish(self) -> ChatState:
+        """
+        Schließt den Decode ab
+
+        Returns:
+            ChatState mit MessageRecords
+
+        Raises:
+            SnapshotError: Snapshot unvollständig oder inkonsistent
+        """
+        if self._end is None or self._buffer:
+            raise SnapshotError("Snapshot is truncated")
+        if self._end != len(self._messages):
+            raise SnapshotError("Snapshot message count mismatch")
+
+        fields = dict(self._fields)
+        fields.pop("message_count", None)
+        try:
+            fields["created_at"] = datetime_from_us(fields["created_at"])
+            fields["last_updated"] = datetime_from_us(fields["last_updated"])
+            return ChatState(messages=self._messages, processing=False, **fields)
+        except Exception as e:
+            raise SnapshotError(f"Invalid snapshot state: {e}") from e
+
+
+def decode_snapshot(data: bytes, max_bytes: int = 256 * 1024 * 1024) -> ChatState:
+    """ChatState aus Snapshot-Bytes (siehe SnapshotDecoder)"""
+    decoder = SnapshotDecoder(max_bytes)
+    decoder.feed(data)
+    return decoder.finish()
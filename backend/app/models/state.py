@@ -3,12 +3,13 @@ TextRPG State Models - VEREINFACHTE VERSION
 Minimales State Management - LLM verwaltet den narrativen Kontext
 """
 
-from typing import List, Optional, Dict, Any, Literal, TypedDict
+from typing import Annotated, List, Optional, Dict, Any, Literal, TypedDict
 from pydantic import BaseModel, Field
 from datetime import datetime
 import uuid
 
-from .messages import ChatMessage
+from .cold_history import ColdHistory
+from .records import MessageRecord
 
 
 # Agent Types
@@ -46,9 +47,9 @@ class ChatState(BaseModel):
     
     # Core Session Data
     session_id: str = Field(description="Unique Session Identifier")
-    messages: List[ChatMessage] = Field(
+    messages: List[MessageRecord] = Field(
         default_factory=list,
-        description="Conversation history"
+        description="Conversation history (compact records, converted at API/LLM boundaries)"
     )
     
     # Flow Control
@@ -80,11 +81,31 @@ class ChatState(BaseModel):
         description="Total interactions in session"
     )
     
+    # Strukturierter Spielwelt-Zustand (Ort, Inventar, Gefährten, Quests) für den Gameplay Prompt
+    world_state: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Compact game state parsed from gameplay responses"
+    )
+    
+    # Token Usage & Kosten (aggregiert über alle LLM-Calls der Session)
+    token_usage: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Session totals: prompt/completion/cached/total tokens, cost_usd, calls"
+    )
+    token_usage_by_model: Dict[str, Dict[str, Any]] = Field(
+        default_factory=dict,
+        description="Session totals per model"
+    )
+    
     # Session Management
     active: bool = Field(default=True, description="Whether session is active")
     processing: bool = Field(default=False, description="Processing state")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     last_updated: datetime = Field(default_factory=datetime.utcnow)
+    version: int = Field(
+        default=0,
+        description="Monotonic change counter (ETag, incremental sync)"
+    )
     
     # End Trigger
     end_trigger: Optional[EndTrigger] = Field(
@@ -92,12 +113,29 @@ class ChatState(BaseModel):
         description="Reason for session end"
     )
     
+    # Komprimierte Historie (nur im Speicher, SessionManager friert idle Sessions ein)
+    cold_history: Optional[ColdHistory] = Field(
+        default=None,
+        exclude=True,
+        repr=False,
+        description="Compressed message blocks of an idle session"
+    )
+    
     class Config:
+        arbitrary_types_allowed = True
         json_encoders = {
             datetime: lambda v: v.isoformat()
         }
     
-    def add_message(self, message: ChatMessage) -> None:
+    @property
+    def message_count(self) -> int:
+        """Anzahl Messages inkl. eingefrorener Historie"""
+        cold = self.cold_history
+        if cold is not None and cold.frozen:
+            return cold.packed_count + len(self.messages)
+        return len(self.messages)
+    
+    def add_message(self, message: MessageRecord) -> None:
         """Fügt Message hinzu und aktualisiert Timestamps"""
         self.messages.append(message)
         self.last_updated = datetime.utcnow()
@@ -106,23 +144,54 @@ class ChatState(BaseModel):
         if message.type == "human":
             self.interaction_count += 1
     
-    def get_recent_messages(self, limit: int = 10) -> List[ChatMessage]:
+    def get_recent_messages(self, limit: int = 10) -> List[MessageRecord]:
         """Gibt die letzten N Messages zurück"""
         return self.messages[-limit:] if len(self.messages) > limit else self.messages
 
 
+def append_messages(existing: List[MessageRecord], new: List[MessageRecord]) -> List[MessageRecord]:
+    """
+    Append-only Reducer für den messages Channel
+    
+    Die erste Update (Graph-Input) übernimmt die Session-Liste ohne Kopie, Nodes
+    liefern danach nur Deltas, die in-place angehängt werden. Idempotent pro Delta:
+    LangGraph wendet Writes für Router-Reads vorab auf eine Channel-Kopie an, die
+    dieselbe Liste teilt - ein bereits angehängtes Delta (identische Objekte) wird
+    nicht erneut angehängt.
+    
+    Args:
+        existing: Bisheriger Channel-Wert
+        new: Neue Messages (Delta)
+        
+    Returns:
+        Dieselbe Liste, erweitert um die neuen Messages
+    """
+    if not existing:
+        return new if new is not None else existing
+    if not new:
+        return existing
+    
+    count = len(new)
+    if count <= len(existing) and all(old is added for old, added in zip(existing[-count:], new)):
+        return existing
+    existing.extend(new)
+    return existing
+
+
 # TypedDict für LangGraph Compatibility
 class ChatStateDict(TypedDict, total=False):
     """
     Vereinfachte TypedDict Version für LangGraph
+    Nodes geben nur geänderte Keys zurück, messages nur als Delta (append_messages)
     """
     session_id: str
-    messages: List[ChatMessage]
+    messages: Annotated[List[MessageRecord], append_messages]
     story_phase: StoryPhase
     current_agent: Optional[AgentType]
     handoff_data: Optional[Dict[str, Any]]
     chapter_count: int
     interaction_count: int
+    world_state: Dict[str, Any]
     active: bool
     processing: bool
     created_at: datetime
@@ -145,6 +214,7 @@ class SessionInfo(BaseModel):
     chapter_count: int = Field(default=0)
     interaction_count: int = Field(default=0)
     end_trigger: Optional[EndTrigger] = Field(default=None)
+    token_usage: Dict[str, Any] = Field(default_factory=dict)
     
     class Config:
         json_encoders = {
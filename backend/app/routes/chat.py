@@ -5,14 +5,17 @@ FastAPI Endpoints für Chat Communication mit SSE Streaming
 
 import json
 import asyncio
+from datetime import datetime
 from typing import Optional, AsyncGenerator
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse
 import structlog
 
-from ..models import ChatRequest, ChatResponse, ChatMessage, StreamingResponse as StreamingResponseModel
-from ..graph import get_session_manager
-from ..services import LLMServiceException
+from ..config import settings
+from ..models import ChatRequest, ChatResponse, ChatMessage, StreamingResponse as StreamingResponseModel, message_to_dict
+from ..models import SNAPSHOT_MEDIA_TYPE, SNAPSHOT_VERSION, SnapshotDecoder, SnapshotError, iter_snapshot, resolve_codec
+from ..graph import get_session_manager, session_id_for_key, SessionLockTimeout, UnknownMessageCursor
+from ..services import LLMServiceException, get_session_affinity, timed_stage
 
 logger = structlog.get_logger()
 
@@ -22,40 +25,53 @@ router = APIRouter(prefix="/chat", tags=["chat"])
 @router.get("/stream")
 async def stream_chat(
     message: str = Query(..., description="User message to process"),
-    session_id: Optional[str] = Query(None, description="Session ID (auto-generated if not provided)")
+    session_id: Optional[str] = Query(None, description="Session ID (auto-generated if not provided)"),
+    idempotency_key: Optional[str] = Query(None, max_length=255, description="Retry key (EventSource cannot set headers)"),
+    idempotency_key_header: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
     """
     Server-Sent Events Streaming Chat Endpoint
     Streams AI response in real-time chunks
+    
+    Retries with the same Idempotency-Key (header or query parameter) and session
+    replay the stored response or attach to the running stream - no new turn.
+    Without session_id the key determines the new session's ID, so retries of a
+    first turn land in the same session.
     """
     
-    logger.info("🚀 SSE Endpoint called", 
-               message_preview=message[:50] + "..." if len(message) > 50 else message,
-               session_id=session_id)
+    idempotency_key = idempotency_key_header or idempotency_key
+    if not session_id and idempotency_key:
+        session_id = session_id_for_key(idempotency_key)
+    
+    logger.info("SSE Endpoint called", 
+               message_length=len(message),
+               session_id=session_id,
+               event_type="message_flow")
     
     async def generate_sse_stream() -> AsyncGenerator[str, None]:
         """Generate SSE formatted stream"""
         
         try:
-            logger.info("🔧 Starting SSE stream generation")
+            logger.debug("Starting SSE stream generation", event_type="stream_chunk")
             session_manager = await get_session_manager()
             
             # Get or create session
             if not session_id:
                 new_session_id = session_manager.create_session()
-                logger.info("📝 Created new session", session_id=new_session_id)
+                logger.info("Created new session", session_id=new_session_id, event_type="session_lifecycle")
             else:
                 new_session_id = session_id
-                # Ensure session exists
-                if not session_manager.get_session(new_session_id):
+                # Ensure session exists (ggf. aus dem Session Store eines anderen Workers)
+                if not await session_manager.load_session(new_session_id, full_history=False):
                     session_manager.create_session(new_session_id)
-                    logger.info("🔄 Recreated missing session", session_id=new_session_id)
+                    logger.info("Recreated missing session", session_id=new_session_id, event_type="session_lifecycle")
                 else:
-                    logger.info("✅ Using existing session", session_id=new_session_id)
+                    logger.debug("Using existing session", session_id=new_session_id, event_type="session_lookup")
             
-            logger.info("🎯 Processing message", 
+            logger.debug("Processing message", 
                        session_id=new_session_id,
-                       message_length=len(message))
+                       message_length=len(message),
+                       event_type="stream_chunk")
             
             # Send session info first
             session_info = {
@@ -65,11 +81,11 @@ async def stream_chat(
             }
             
             session_info_data = f"data: {json.dumps(session_info)}\n\n"
-            logger.debug("📤 Sending session info", data_length=len(session_info_data))
+            logger.debug("Sending session info", data_length=len(session_info_data), event_type="stream_chunk")
             yield session_info_data
             
             # Get current state
-            state = session_manager.get_session(new_session_id)
+            state = session_manager.get_session(new_session_id, full_history=False)
             if not state:
                 raise ValueError("Session not found")
             
@@ -86,7 +102,7 @@ async def stream_chat(
             chunk_count = 0
             
             # Use SessionManager's stream_process_message 
-            async for chunk in session_manager.stream_process_message(new_session_id, message):
+            async for chunk in session_manager.stream_process_message(new_session_id, message, idempotency_key):
                 complete_response += chunk
                 chunk_count += 1
                 
@@ -100,19 +116,16 @@ async def stream_chat(
                 }
                 
                 yield f"data: {json.dumps(chunk_data)}\n\n"
-                
-                # Reduced delay for faster streaming (was 0.01)
-                await asyncio.sleep(0.001)
             
             # Get updated session state for metadata
-            updated_state = session_manager.get_session(new_session_id)
+            updated_state = session_manager.get_session(new_session_id, full_history=False)
             
             # Send completion signal with agent metadata
             completion_data = {
                 "type": "completion",
                 "session_id": new_session_id,
                 "total_chunks": chunk_count,
-                "message_count": len(updated_state.messages) if updated_state else 0,
+                "message_count": updated_state.message_count if updated_state else 0,
                 "complete_response": complete_response,
                 "agent": updated_state.current_agent if updated_state else None
             }
@@ -125,7 +138,8 @@ async def stream_chat(
             logger.info("SSE stream completed", 
                        session_id=new_session_id,
                        chunk_count=chunk_count,
-                       response_length=len(complete_response))
+                       response_length=len(complete_response),
+                       event_type="message_flow")
             
         except LLMServiceException as e:
             logger.error("LLM service error in SSE stream", error=e.to_dict())
@@ -162,46 +176,217 @@ async def stream_chat(
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no",  # Disable nginx buffering
-            "Access-Control-Allow-Origin": "*"  # Allow CORS for SSE
+            "Access-Control-Allow-Origin": "*",  # Allow CORS for SSE
+            **(get_session_affinity().headers(session_id) if session_id else {})
         }
     )
 
 
+def _apply_affinity(response: Response, session_id: str) -> None:
+    """Setzt den Affinity-Hinweis (Header + Cookie) für die Session, falls konfiguriert"""
+    for name, value in get_session_affinity().headers(session_id).items():
+        response.headers[name] = value
+
+
+def _session_etag(version: int) -> str:
+    """ETag einer Session-Representation (ändert sich mit jedem Session-Update)"""
+    return f'"v{version}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Prüft If-None-Match gegen den aktuellen ETag (inkl. Weak-ETags und *)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
 @router.get("/session/{session_id}")
-async def get_session(session_id: str):
+async def get_session(
+    session_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500, description="Max messages per page"),
+    before: Optional[str] = Query(None, description="Message ID - return older messages"),
+    after: Optional[str] = Query(None, description="Message ID - return newer messages"),
+    since: Optional[datetime] = Query(None, description="Return messages newer than this timestamp"),
+    if_none_match: Optional[str] = Header(None)
+):
     """
-    Get session information and message history
+    Get session information and a page of the message history
+    
+    Without cursor the latest `limit` messages are returned. Responses carry an ETag
+    keyed on the session version; a matching If-None-Match yields 304.
     """
     
+    if sum(cursor is not None for cursor in (before, after, since)) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of before, after, since")
+    
     try:
         session_manager = await get_session_manager()
         
-        state = session_manager.get_session(session_id)
+        state = await session_manager.load_session(session_id, full_history=False)
         if not state:
             raise HTTPException(status_code=404, detail="Session not found")
+        _apply_affinity(response, session_id)
+        
+        etag = _session_etag(state.version)
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        history = session_manager.get_message_history(
+            session_id, limit=limit, before=before, after=after, since=since
+        )
+        response.headers["ETag"] = etag
         
         return {
             "session_id": session_id,
             "session_info": session_manager.get_session_info(session_id),
-            "messages": [
-                {
-                    "id": msg.id,
-                    "type": msg.type,
-                    "content": msg.content,
-                    "timestamp": msg.timestamp.isoformat(),
-                    "metadata": msg.metadata
-                }
-                for msg in state.messages
-            ]
+            "world_state": state.world_state,
+            **history
         }
         
+    except UnknownMessageCursor as e:
+        raise HTTPException(status_code=400, detail=f"Unknown message cursor: {e}")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Error getting session", session_id=session_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/session/{session_id}/export")
+async def export_session(session_id: str):
+    """
+    Full session export as NDJSON stream
+    
+    First line: session info, then one message per line (chronological).
+    """
+    
+    session_manager = await get_session_manager()
+    state = await session_manager.load_session(session_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    session_info = session_manager.get_session_info(session_id)
+    messages = list(state.messages)
+    
+    async def generate_ndjson() -> AsyncGenerator[str, None]:
+        yield json.dumps({"session_info": session_info}, ensure_ascii=False) + "\n"
+        for index in range(0, len(messages), 100):
+            batch = messages[index:index + 100]
+            yield "".join(json.dumps(message_to_dict(message), ensure_ascii=False) + "\n" for message in batch)
+            # Event Loop zwischen Batches freigeben
+            await asyncio.sleep(0)
+    
+    return StreamingResponse(
+        generate_ndjson(),
+        media_type="application/x-ndjson",
+        headers={
+            "ETag": _session_etag(session_info["version"]),
+            "Content-Disposition": f'attachment; filename="session-{session_id}.ndjson"'
+        }
+    )
+
+
+@router.get("/session/{session_id}/turns/last")
+async def get_last_turn(session_id: str):
+    """
+    Result of the session's last finished turn (from the turn journal)
+    
+    After a disconnect the client fetches the already generated answer here
+    instead of resending the message (no new LLM call). Status is committed,
+    recovered (completed from the journal) or rolled_back (no output, resend).
+    """
+    
+    session_manager = await get_session_manager()
+    if await session_manager.load_session(session_id, full_history=False) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    turn = session_manager.get_last_turn(session_id)
+    if turn is None:
+        raise HTTPException(status_code=404, detail="No journaled turn for this session")
+    
+    return {"session_id": session_id, **turn}
+
+
+@router.post("/session/{session_id}/snapshot")
+async def snapshot_session(
+    session_id: str,
+    codec: Optional[str] = Query(None, pattern="^(none|zstd|zlib)$", description="Compression codec (default: zstd if available)")
+):
+    """
+    Binary session snapshot (save slot / export), streamed
+    
+    Versioned msgpack frames incl. messages, handoff_data and counters; restore via
+    POST /chat/session/{session_id}/restore.
+    """
+    
+    session_manager = await get_session_manager()
+    state = await session_manager.load_session(session_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    try:
+        codec = resolve_codec(codec)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def generate_snapshot() -> AsyncGenerator[bytes, None]:
+        for chunk in iter_snapshot(state, codec):
+            yield chunk
+            # Event Loop zwischen Frames freigeben
+            await asyncio.sleep(0)
+    
+    return StreamingResponse(
+        generate_snapshot(),
+        media_type=SNAPSHOT_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f'attachment; filename="session-{session_id}.trpg"',
+            "X-Snapshot-Version": str(SNAPSHOT_VERSION),
+            "X-Snapshot-Codec": codec
+        }
+    )
+
+
+@router.post("/session/{session_id}/restore")
+async def restore_session(session_id: str, request: Request):
+    """
+    Restore a session from a binary snapshot (request body, streamed)
+    
+    Creates the session or replaces an existing one with the same ID.
+    """
+    
+    decoder = SnapshotDecoder(settings.snapshot_max_bytes)
+    try:
+        with timed_stage("snapshot_decode"):
+            async for chunk in request.stream():
+                decoder.feed(chunk)
+            state = decoder.finish()
+    except SnapshotError as e:
+        logger.warning("Invalid snapshot", session_id=session_id, error=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    state.session_id = session_id
+    session_manager = await get_session_manager()
+    try:
+        # Unter dem Session-Lock, damit die Version über allen Workern monoton bleibt
+        async with session_manager.session_lock(session_id):
+            await session_manager.load_session(session_id, full_history=False)
+            if not session_manager.restore_session(state):
+                raise HTTPException(status_code=409, detail="Session is processing a message")
+            await session_manager.save_session(session_id)
+    except SessionLockTimeout:
+        raise HTTPException(status_code=409, detail="Session is processing a message")
+    
+    return {
+        "status": "restored",
+        "session_id": session_id,
+        "session_info": session_manager.get_session_info(session_id)
+    }
+
+
 @router.post("/session")
-async def create_session():
+async def create_session(response: Response):
     """
     Create new chat session
     """
@@ -210,6 +395,7 @@ async def create_session():
         session_manager = await get_session_manager()
         
         session_id = session_manager.create_session()
+        _apply_affinity(response, session_id)
         
         return {
             "session_id": session_id,
@@ -244,18 +430,34 @@ async def delete_session(session_id: str):
 
 
 @router.get("/sessions")
-async def list_sessions():
+async def list_sessions(
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    offset: int = Query(0, ge=0, description="Number of sessions to skip"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Sort order by last_updated"),
+    story_phase: Optional[str] = Query(None, description="Filter by story phase"),
+    current_agent: Optional[str] = Query(None, description="Filter by current agent"),
+    active: Optional[bool] = Query(None, description="Filter by active flag")
+):
     """
-    List all active sessions
+    List active sessions (paginated, sorted by last_updated, served from the session index)
     """
     
     try:
         session_manager = await get_session_manager()
-        sessions = session_manager.get_all_sessions()
+        page = session_manager.list_sessions(
+            limit=limit,
+            offset=offset,
+            order=order,
+            story_phase=story_phase,
+            current_agent=current_agent,
+            active=active
+        )
+        counts = session_manager.get_session_counts()
         
         return {
-            "total_sessions": len(sessions),
-            "sessions": sessions
+            "total_sessions": counts["total"],
+            "counts": counts,
+            **page
         }
         
     except Exception as e:
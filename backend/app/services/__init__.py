@@ -15,6 +15,84 @@ from .langchain_llm_service import (
     close_langchain_llm_service
 )
 
+from .metrics import (
+    MetricsRegistry,
+    get_metrics_registry
+)
+
+from .timing import (
+    TurnTimer,
+    ServerTimingMiddleware,
+    turn_timer,
+    get_turn_timer,
+    record_stage,
+    timed_stage
+)
+
+from .usage import (
+    UsageCapture,
+    capture_usage,
+    extract_usage,
+    compute_cost,
+    record_llm_usage,
+    record_precomputed_usage,
+    TokenReservation,
+    reserve_tokens,
+    get_token_reservation
+)
+
+from .tracing import (
+    TraceSampler,
+    SessionTracker,
+    session_tracing,
+    get_trace_sampler,
+    close_tracing
+)
+
+from .llm_limiter import (
+    LLMConcurrencyLimiter,
+    get_llm_limiter
+)
+
+from .affinity import (
+    ConsistentHashRing,
+    SessionAffinity,
+    get_session_affinity
+)
+
+from .loop_monitor import (
+    EventLoopMonitor,
+    get_event_loop_monitor,
+    close_event_loop_monitor
+)
+
+from .repetition import (
+    RepetitionDetector,
+    ShingleHasher,
+    shingle_hashes
+)
+
+from .segmenter import (
+    StreamSegmenter,
+    segment_text,
+    segment_stream
+)
+
+from .stream_pipeline import (
+    StreamPipeline,
+    StreamContext,
+    DegenerateOutput,
+    repetition_guard,
+    strip_markers,
+    capture_block,
+    cleanup,
+    segmentation,
+    metrics_tap,
+    text_source,
+    get_generation_pipeline,
+    get_delivery_pipeline
+)
+
 from .exceptions import (
     LLMServiceException,
     LLMErrorType,
@@ -40,6 +118,60 @@ __all__ = [
     "get_langchain_llm_service",
     "close_langchain_llm_service",
     
+    # Observability
+    "MetricsRegistry",
+    "get_metrics_registry",
+    "TurnTimer",
+    "ServerTimingMiddleware",
+    "turn_timer",
+    "get_turn_timer",
+    "record_stage",
+    "timed_stage",
+    "UsageCapture",
+    "capture_usage",
+    "extract_usage",
+    "compute_cost",
+    "record_llm_usage",
+    "record_precomputed_usage",
+    "TokenReservation",
+    "reserve_tokens",
+    "get_token_reservation",
+    "TraceSampler",
+    "SessionTracker",
+    "session_tracing",
+    "get_trace_sampler",
+    "close_tracing",
+    "LLMConcurrencyLimiter",
+    "get_llm_limiter",
+    "ConsistentHashRing",
+    "SessionAffinity",
+    "get_session_affinity",
+    "EventLoopMonitor",
+    "get_event_loop_monitor",
+    "close_event_loop_monitor",
+    
+    # Output Guards
+    "RepetitionDetector",
+    "ShingleHasher",
+    "shingle_hashes",
+    
+    # Streaming
+    "StreamSegmenter",
+    "segment_text",
+    "segment_stream",
+    "StreamPipeline",
+    "StreamContext",
+    "DegenerateOutput",
+    "repetition_guard",
+    "strip_markers",
+    "capture_block",
+    "cleanup",
+    "segmentation",
+    "metrics_tap",
+    "text_source",
+    "get_generation_pipeline",
+    "get_delivery_pipeline",
+    
     # Exceptions
     "LLMServiceException",
     "LLMErrorType",
@@ -0,0 +1,119 @@
+"""
+TextRPG Session Affinity
+Consistent-Hash Hinweis, welcher Worker eine Session bedienen sollte
+
+Mit geteiltem Session Store kann jeder Worker jede Session bedienen - der
+Cache im Prozess trifft aber nur, wenn dieselbe Session immer beim selben
+Worker landet. Der Hash-Ring bildet Session IDs stabil auf Worker-Namen ab
+(beim Hinzufügen/Entfernen eines Workers wandert nur ~1/N der Sessions). Die
+Antworten tragen den Namen als Header und Cookie, ein Load Balancer kann
+darauf routen (z.B. nginx `hash $cookie_textrpg_affinity`).
+"""
+
+import bisect
+import hashlib
+from typing import Dict, Optional, Sequence
+
+from .metrics import get_metrics_registry
+
+
+AFFINITY_HEADER = "X-Session-Affinity"
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    """Hash-Ring mit virtuellen Knoten pro Worker"""
+
+    def __init__(self, nodes: Sequence[str], replicas: int = 100):
+        """
+        Args:
+            nodes: Worker-Namen
+            replicas: Virtuelle Knoten pro Worker (glättet die Verteilung)
+        """
+        self.nodes = list(nodes)
+        self.replicas = replicas
+        ring = sorted((_hash(f"{node}#{index}"), node) for node in self.nodes for index in range(replicas))
+        self._keys = [key for key, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def node_for(self, key: str) -> Optional[str]:
+        """Worker für einen Key (None bei leerem Ring)"""
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[index]
+
+
+class SessionAffinity:
+    """
+    Affinity-Hinweise für Responses und Trefferzählung für diesen Worker
+    """
+
+    def __init__(self, nodes: Sequence[str], local_node: Optional[str] = None, cookie_name: str = "textrpg_affinity"):
+        """
+        Args:
+            nodes: Alle Worker-Namen (leer = Affinity deaktiviert)
+            local_node: Name dieses Workers (für Hit/Miss-Metriken)
+            cookie_name: Cookie für den Hinweis
+        """
+        self.ring = ConsistentHashRing(nodes)
+        self.local_node = local_node
+        self.cookie_name = cookie_name
+
+        registry = get_metrics_registry()
+        self._requests_counter = registry.counter(
+            "textrpg_session_affinity_requests_total",
+            "Session requests by affinity result on this worker (hit/miss)"
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.ring.nodes)
+
+    def node_for(self, session_id: str) -> Optional[str]:
+        """Zuständiger Worker einer Session"""
+        return self.ring.node_for(session_id)
+
+    def headers(self, session_id: str) -> Dict[str, str]:
+        """
+        Response-Header mit Affinity-Hinweis (Header + Cookie) für eine Session
+
+        Zählt zusätzlich, ob die Session beim zuständigen Worker gelandet ist.
+        """
+        node = self.node_for(session_id)
+        if node is None:
+            return {}
+        if self.local_node:
+            result = "hit" if node == self.local_node else "miss"
+            self._requests_counter.inc(labels={"result": result})
+        return {
+            AFFINITY_HEADER: node,
+            "Set-Cookie": f"{self.cookie_name}={node}; Path=/; SameSite=Lax"
+        }
+
+
+_session_affinity: Optional[SessionAffinity] = None
+
+
+def get_session_affinity() -> SessionAffinity:
+    """
+    Singleton Getter für Session Affinity (Worker-Liste aus den Settings)
+
+    Returns:
+        SessionAffinity instance
+    """
+    global _session_affinity
+
+    if _session_affinity is None:
+        from ..config import settings
+
+        _session_affinity = SessionAffinity(
+            settings.session_affinity_nodes,
+            local_node=settings.session_affinity_node,
+            cookie_name=settings.session_affinity_cookie
+        )
+
+    return _session_affinity
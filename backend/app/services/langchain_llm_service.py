@@ -16,7 +16,9 @@ from langchain_core.outputs import LLMResult
 from langchain_core.tracers import LangChainTracer
 
 from ..config import Settings, settings
-from ..models import ChatMessage, create_ai_message, messages_to_langchain, pydantic_to_langchain
+from ..models import ChatMessage, create_ai_message, messages_to_langchain, pydantic_to_langchain, provider_to_langchain, to_provider_messages
+from .usage import record_llm_usage
+from .tracing import SessionTracker, get_trace_sampler, session_tracing
 from .exceptions import (
     LLMServiceException,
     APIKeyInvalidException,
@@ -27,29 +29,6 @@ from .exceptions import (
 logger = structlog.get_logger()
 
 
-class SessionTracker:
-    """Manages session-level tracing for LangSmith"""
-    
-    def __init__(self):
-        self.session_runs: Dict[str, str] = {}  # session_id -> parent_run_id
-    
-    def get_or_create_session_run(self, session_id: str) -> str:
-        """Get or create a parent run ID for the session"""
-        if session_id not in self.session_runs:
-            # Create a new parent run ID for this session
-            parent_run_id = str(uuid.uuid4())
-            self.session_runs[session_id] = parent_run_id
-            logger.info("Created session run", session_id=session_id, parent_run_id=parent_run_id)
-        return self.session_runs[session_id]
-    
-    def end_session_run(self, session_id: str):
-        """Remove session run when session ends"""
-        if session_id in self.session_runs:
-            logger.info("Ended session run", session_id=session_id, 
-                       parent_run_id=self.session_runs[session_id])
-            del self.session_runs[session_id]
-
-
 class LangChainLLMService:
     """
     LangChain-basierter LLM Service mit vollständigem LangSmith Tracing
@@ -65,11 +44,11 @@ class LangChainLLMService:
         """
         self.config = config
         self._initialized = False
-        self.session_tracker = SessionTracker()
+        self.session_tracker = SessionTracker(config.langsmith_max_tracked_sessions)
         
         # Base configuration für alle LLM instances
         self.base_config = {
-            "base_url": "https://openrouter.ai/api/v1",
+            "base_url": self.config.openrouter_base_url,
             "api_key": self.config.openrouter_api_key,
             "temperature": 0.7,
             "max_tokens": 2000,
@@ -78,6 +57,7 @@ class LangChainLLMService:
             "presence_penalty": 0.0,
             "timeout": 30.0,
             "max_retries": 2,
+            "stream_usage": True,  # Usage-Block auch beim Streaming (Cost Accounting)
             # LangSmith tracing wird automatisch aktiviert über env vars
         }
         
@@ -162,6 +142,10 @@ class LangChainLLMService:
             # Create custom LLM for specific model
             return ChatOpenAI(model=model_name, **self.base_config)
     
+    def _is_traced(self, session_id: str) -> bool:
+        """Session wird getraced (Tracing aktiv und Session im Sample)"""
+        return self.config.langsmith_tracing and get_trace_sampler().is_sampled(session_id)
+    
     def _convert_messages_to_langchain(self, messages: List[ChatMessage]) -> List[BaseMessage]:
         """
         Konvertiert ChatMessage Liste zu LangChain BaseMessage Liste
@@ -172,21 +156,8 @@ class LangChainLLMService:
         Returns:
             List of LangChain BaseMessage objects
         """
-        langchain_messages = []
-        
-        for msg in messages:
-            if msg.type == "human":
-                langchain_messages.append(HumanMessage(content=msg.content))
-            elif msg.type == "ai":
-                langchain_messages.append(AIMessage(content=msg.content))
-            elif msg.type == "system":
-                langchain_messages.append(SystemMessage(content=msg.content))
-            else:
-                logger.warning("Unknown message type", msg_type=msg.type)
-                # Fallback to HumanMessage
-                langchain_messages.append(HumanMessage(content=msg.content))
-        
-        return langchain_messages
+        # Rollen-Mapping über das gecachte Provider-Format (unbekannte Types → user)
+        return [provider_to_langchain(message) for message in to_provider_messages(messages)]
     
     def _convert_response_to_chatmessage(
         self, 
@@ -212,6 +183,11 @@ class LangChainLLMService:
             **(response_metadata or {})
         }
         
+        # Provider-Usage (Tokens + berechnete Kosten) übernehmen
+        usage = record_llm_usage(model_name, response, metadata.get("session_id"))
+        if usage:
+            metadata["usage"] = usage
+        
         return create_ai_message(response.content, metadata)
     
     async def chat_completion(
@@ -252,7 +228,7 @@ class LangChainLLMService:
             
             # Setup session tracing if session_id provided
             config = {}
-            if session_id and self.config.langsmith_tracing:
+            if session_id and self._is_traced(session_id):
                 parent_run_id = self.session_tracker.get_or_create_session_run(session_id)
                 config = {
                     "tags": [f"session:{session_id}", "chat_completion"],
@@ -267,7 +243,7 @@ class LangChainLLMService:
                        model=model_name,
                        message_count=len(messages),
                        session_id=session_id,
-                       langsmith_tracing=bool(session_id and self.config.langsmith_tracing))
+                       langsmith_tracing=bool(config))
             
             # Apply additional parameters
             if kwargs:
@@ -276,10 +252,11 @@ class LangChainLLMService:
                 llm = ChatOpenAI(model=model_name, **updated_config)
             
             # Invoke LLM with session tracing (this will be traced by LangSmith)
-            if config:
-                response = await llm.ainvoke(langchain_messages, config=config)
-            else:
-                response = await llm.ainvoke(langchain_messages)
+            with session_tracing(session_id):
+                if config:
+                    response = await llm.ainvoke(langchain_messages, config=config)
+                else:
+                    response = await llm.ainvoke(langchain_messages)
             
             # Convert response
             result = self._convert_response_to_chatmessage(
@@ -350,7 +327,7 @@ class LangChainLLMService:
             
             # Setup session tracing if session_id provided
             config = {}
-            if session_id and self.config.langsmith_tracing:
+            if session_id and self._is_traced(session_id):
                 parent_run_id = self.session_tracker.get_or_create_session_run(session_id)
                 config = {
                     "tags": [f"session:{session_id}", "streaming_completion"],
@@ -375,17 +352,30 @@ class LangChainLLMService:
             
             # Stream response with session tracing
             chunk_count = 0
-            async for chunk in llm.astream(langchain_messages, config=config if config else None):
+            usage_chunk = None
+            stream = llm.astream(langchain_messages, config=config if config else None)
+            
+            # Der Tracer wird beim Start des Streams gewählt - Sampling-Context nur darum halten
+            with session_tracing(session_id):
+                chunk = await anext(stream, None)
+            
+            while chunk is not None:
+                if chunk.usage_metadata:
+                    usage_chunk = chunk
                 if chunk.content:
                     chunk_count += 1
                     yield chunk.content
+                chunk = await anext(stream, None)
+            
+            usage = record_llm_usage(model_name, usage_chunk, session_id) if usage_chunk else None
             
             duration = time.time() - start_time
             logger.info("LangChain streaming completion successful", 
                        duration=duration,
                        model=model_name,
                        chunk_count=chunk_count,
-                       session_id=session_id)
+                       session_id=session_id,
+                       usage=usage)
             
         except Exception as e:
             context = {
@@ -437,7 +427,7 @@ def close_langchain_llm_service() -> None:
     global _langchain_llm_service
     
     if _langchain_llm_service is not None:
-        _langchain_llm_service.session_tracker = SessionTracker()  # Reset session tracker
+        _langchain_llm_service.session_tracker = SessionTracker(settings.langsmith_max_tracked_sessions)  # Reset session tracker
         _langchain_llm_service._default_llm = None  # Reset cached LLM instances
         _langchain_llm_service._creator_llm = None
         _langchain_llm_service._gamemaster_llm = None
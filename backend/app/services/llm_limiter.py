@@ -0,0 +1,75 @@
+"""
+TextRPG LLM Concurrency Limiter
+Begrenzt parallele LLM-Calls und misst die Wartezeit in der Queue
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from .metrics import get_metrics_registry
+from .timing import record_stage
+
+
+class LLMConcurrencyLimiter:
+    """
+    Semaphore-basierter Limiter für LLM-Calls
+    max_concurrency <= 0 deaktiviert die Begrenzung (Wartezeit bleibt ~0)
+    """
+
+    def __init__(self, max_concurrency: int = 0):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.in_flight = 0
+
+        registry = get_metrics_registry()
+        self._in_flight_gauge = registry.gauge(
+            "textrpg_llm_in_flight",
+            "LLM calls currently in flight"
+        )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """
+        Reserviert einen LLM-Slot
+
+        Yields:
+            Wartezeit in Sekunden (auch als Stage llm_queue_wait verbucht)
+        """
+        start = time.perf_counter()
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        waited = time.perf_counter() - start
+        record_stage("llm_queue_wait", waited)
+
+        self.in_flight += 1
+        self._in_flight_gauge.set(self.in_flight)
+        try:
+            yield waited
+        finally:
+            self.in_flight -= 1
+            self._in_flight_gauge.set(self.in_flight)
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+
+# Global Limiter Instance
+_llm_limiter: Optional[LLMConcurrencyLimiter] = None
+
+
+def get_llm_limiter() -> LLMConcurrencyLimiter:
+    """
+    Singleton Getter für LLM Concurrency Limiter (konfiguriert über Settings)
+
+    Returns:
+        LLMConcurrencyLimiter instance
+    """
+    global _llm_limiter
+
+    if _llm_limiter is None:
+        from ..config import settings
+
+        _llm_limiter = LLMConcurrencyLimiter(settings.llm_max_concurrency)
+
+    return _llm_limiter
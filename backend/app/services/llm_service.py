@@ -11,7 +11,7 @@ import structlog
 from datetime import datetime
 
 from ..config import Settings, settings
-from ..models import ChatMessage, create_ai_message, messages_to_langchain
+from ..models import ChatMessage, create_ai_message, messages_to_langchain, to_provider_messages, to_provider_messages_json
 from .exceptions import (
     LLMServiceException,
     APIKeyInvalidException,
@@ -36,7 +36,7 @@ class LLMService:
             config: Settings instance (default: global settings)
         """
         self.config = config or settings
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = self.config.openrouter_base_url
         self.client: Optional[httpx.AsyncClient] = None
         self._initialized = False
         
@@ -166,13 +166,8 @@ class LLMService:
             API request dictionary
         """
         
-        # Convert to OpenAI format
-        api_messages = []
-        for msg in messages:
-            api_messages.append({
-                "role": "user" if msg.type == "human" else "assistant" if msg.type == "ai" else "system",
-                "content": msg.content
-            })
+        # Convert to OpenAI format (Provider-Dicts sind pro Message ID gecacht)
+        api_messages = to_provider_messages(messages)
         
         # Build request
         request_data = {
@@ -185,6 +180,22 @@ class LLMService:
         
         return request_data
     
+    def _encode_request(self, request_data: Dict[str, Any], messages: List[ChatMessage]) -> bytes:
+        """
+        Serialisiert den Request Body - die Messages kommen als vorab serialisierte JSON-Bytes aus dem Cache
+        
+        Args:
+            request_data: Request aus _build_request
+            messages: Dieselben Messages wie in _build_request
+            
+        Returns:
+            JSON Request Body
+        """
+        
+        params = {key: value for key, value in request_data.items() if key != "messages"}
+        body = json.dumps(params, ensure_ascii=False, separators=(",", ":")).encode()
+        return body[:-1] + b',"messages":' + to_provider_messages_json(messages) + b"}"
+    
     def _handle_response(self, response_data: Dict[str, Any]) -> ChatMessage:
         """
         Konvertiert OpenRouter Response zu ChatMessage
@@ -260,7 +271,7 @@ class LLMService:
                        message_count=len(messages))
             
             # Make API call
-            response = await self.client.post("/chat/completions", json=request_data)
+            response = await self.client.post("/chat/completions", content=self._encode_request(request_data, messages))
             response.raise_for_status()
             
             # Handle response
@@ -330,7 +341,7 @@ class LLMService:
                        message_count=len(messages))
             
             # Make streaming API call
-            async with self.client.stream("POST", "/chat/completions", json=request_data) as response:
+            async with self.client.stream("POST", "/chat/completions", content=self._encode_request(request_data, messages)) as response:
                 response.raise_for_status()
                 
                 async for line in response.aiter_lines():
@@ -0,0 +1,248 @@
+"""
+TextRPG Event Loop Monitor
+Watchdog für Event-Loop-Lag mit Stack-Capture des blockierenden Frames
+
+Ein asyncio Task misst die Scheduling-Verzögerung periodischer Sleeps. Ein
+Sampling-Thread beobachtet den Heartbeat des Tasks und sichert bei einem Stall
+den Stack des Loop-Threads - also genau den Code, der den Loop blockiert.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional
+
+import structlog
+
+from .metrics import get_metrics_registry
+
+logger = structlog.get_logger()
+
+APP_DIR = str(Path(__file__).parent.parent)
+
+
+def _find_session_id(frame) -> Optional[str]:
+    """Sucht eine session_id in den Locals des Frames und seiner Aufrufer"""
+    while frame is not None:
+        local_vars = frame.f_locals
+        session_id = local_vars.get("session_id")
+        if isinstance(session_id, str):
+            return session_id
+
+        state = local_vars.get("state")
+        if isinstance(state, dict) and isinstance(state.get("session_id"), str):
+            return state["session_id"]
+        if isinstance(getattr(state, "session_id", None), str):
+            return state.session_id
+
+        frame = frame.f_back
+    return None
+
+
+class EventLoopMonitor:
+    """
+    Misst Event-Loop-Lag und protokolliert Blockaden mit Stack und Session-Kontext
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.25,
+        capture_stacks: bool = True,
+        stack_depth: int = 25,
+        max_incidents: int = 50
+    ):
+        """
+        Args:
+            interval: Mess-Intervall in Sekunden
+            threshold: Lag ab dem ein Incident gemeldet wird (Sekunden)
+            capture_stacks: Sampling-Thread für Stack-Capture aktivieren
+            stack_depth: Maximale Anzahl Frames pro Stack
+            max_incidents: Anzahl gespeicherter Incidents für /debug/event-loop
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.capture_stacks = capture_stacks
+        self.stack_depth = stack_depth
+        self.incidents: Deque[Dict[str, Any]] = deque(maxlen=max_incidents)
+
+        self._task: Optional[asyncio.Task] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._pending_capture: Optional[Dict[str, Any]] = None
+
+        registry = get_metrics_registry()
+        self._blocked_counter = registry.counter(
+            "textrpg_event_loop_blocked_total",
+            "Event loop stalls above the lag threshold"
+        )
+        self._lag_max_gauge = registry.gauge(
+            "textrpg_event_loop_lag_max_ms",
+            "Maximum observed event loop lag in milliseconds"
+        )
+        self._lag_last_gauge = registry.gauge(
+            "textrpg_event_loop_lag_last_ms",
+            "Most recent event loop lag sample in milliseconds"
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Startet Watchdog Task (und Sampling-Thread) im laufenden Event Loop"""
+        if self.running:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._watch())
+
+        if self.capture_stacks:
+            self._sampler = threading.Thread(
+                target=self._sample, name="event-loop-sampler", daemon=True
+            )
+            self._sampler.start()
+
+        logger.info("Event loop monitor started",
+                   interval_ms=self.interval * 1000,
+                   threshold_ms=self.threshold * 1000,
+                   capture_stacks=self.capture_stacks)
+
+    async def stop(self) -> None:
+        """Stoppt Watchdog und Sampling-Thread"""
+        self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._sampler:
+            self._sampler.join(timeout=1.0)
+            self._sampler = None
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self._last_beat = time.monotonic()
+
+            lag_ms = lag * 1000
+            self._lag_last_gauge.set(lag_ms)
+            self._lag_max_gauge.set_max(lag_ms)
+
+            if lag >= self.threshold:
+                self._record_incident(lag_ms)
+            else:
+                self._pending_capture = None
+
+    def _sample(self) -> None:
+        """Sampling-Thread: sichert den Stack des Loop-Threads während eines Stalls"""
+        stall_limit = self.interval + self.threshold
+        while not self._stop_event.wait(self.interval / 2):
+            if self._pending_capture is not None:
+                continue
+            if time.monotonic() - self._last_beat < stall_limit:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._pending_capture = self._capture(frame)
+
+    def _capture(self, frame) -> Dict[str, Any]:
+        """Extrahiert Stack, blockierenden App-Frame und session_id"""
+        stack = traceback.extract_stack(frame, limit=self.stack_depth)
+        formatted = [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in stack]
+
+        blocking = next(
+            (entry for entry in reversed(stack) if entry.filename.startswith(APP_DIR)),
+            stack[-1] if stack else None
+        )
+
+        return {
+            "stack": formatted,
+            "blocking_frame": (
+                f"{blocking.filename}:{blocking.lineno} in {blocking.name}" if blocking else None
+            ),
+            "session_id": _find_session_id(frame),
+            "captured_at": time.time()
+        }
+
+    def _record_incident(self, lag_ms: float) -> None:
+        capture = self._pending_capture or {}
+        self._pending_capture = None
+
+        incident = {
+            "lag_ms": round(lag_ms, 3),
+            "timestamp": time.time(),
+            "session_id": capture.get("session_id"),
+            "blocking_frame": capture.get("blocking_frame"),
+            "stack": capture.get("stack", [])
+        }
+        self.incidents.append(incident)
+        self._blocked_counter.inc()
+
+        logger.warning("Event loop blocked",
+                      lag_ms=incident["lag_ms"],
+                      session_id=incident["session_id"],
+                      blocking_frame=incident["blocking_frame"],
+                      blocking_stack=incident["stack"][-8:],
+                      event_type="loop_blocked")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Status, Counter und letzte Incidents"""
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "blocked_total": self._blocked_counter.get(),
+            "lag_max_ms": self._lag_max_gauge.get(),
+            "lag_last_ms": self._lag_last_gauge.get(),
+            "recent_incidents": list(self.incidents)
+        }
+
+
+# Global Monitor Instance
+_event_loop_monitor: Optional[EventLoopMonitor] = None
+
+
+def get_event_loop_monitor() -> EventLoopMonitor:
+    """
+    Singleton Getter für Event Loop Monitor (konfiguriert über Settings)
+
+    Returns:
+        EventLoopMonitor instance
+    """
+    global _event_loop_monitor
+
+    if _event_loop_monitor is None:
+        from ..config import settings
+
+        _event_loop_monitor = EventLoopMonitor(
+            interval=settings.event_loop_monitor_interval_ms / 1000,
+            threshold=settings.event_loop_lag_threshold_ms / 1000,
+            capture_stacks=settings.event_loop_capture_stacks
+        )
+
+    return _event_loop_monitor
+
+
+async def close_event_loop_monitor() -> None:
+    """Stoppt und resettet den Event Loop Monitor"""
+    global _event_loop_monitor
+
+    if _event_loop_monitor is not None:
+        await _event_loop_monitor.stop()
+        _event_loop_monitor = None
@@ -4,6 +4,7 @@ Phase 2 Completion - Message Deduplication & Processing
 """
 
 import hashlib
+import re
 import structlog
 from typing import Optional
 
@@ -11,6 +12,10 @@ from ..models import ChatState
 
 logger = structlog.get_logger()
 
+# Einmal kompiliert - für Streams siehe die Cleanup-Stage in stream_pipeline
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_DUPLICATE_PUNCTUATION_PATTERN = re.compile(r'([.!?]){2,}')
+
 def generate_message_hash(content: str) -> str:
     """
     Generate hash for message content.
@@ -133,10 +138,9 @@ def clean_message_content(content: str) -> str:
     cleaned = content.strip()
     
     # Remove excessive whitespace
-    import re
-    cleaned = re.sub(r'\s+', ' ', cleaned)
+    cleaned = _WHITESPACE_PATTERN.sub(' ', cleaned)
     
     # Remove duplicate punctuation
-    cleaned = re.sub(r'([.!?]){2,}', r'\1', cleaned)
+    cleaned = _DUPLICATE_PUNCTUATION_PATTERN.sub(r'\1', cleaned)
     
     return cleaned 
\ No newline at end of file
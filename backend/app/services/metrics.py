@@ -0,0 +1,230 @@
+"""
+TextRPG Metrics Registry
+In-Process Metriken (Counter, Gauges, Histogramme) mit Prometheus Text-Export
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelValues:
+    """Normalisiert Labels zu einem hashbaren, sortierten Tuple"""
+    if not labels:
+        return ()
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Counter:
+    """Monoton steigender Counter mit optionalen Labels"""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, labels: Optional[Dict[str, str]] = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, labels: Optional[Dict[str, str]] = None) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def items(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge:
+    """Gauge mit optionalen Labels (set/max)"""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def set_max(self, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            if value > self._values.get(key, float("-inf")):
+                self._values[key] = value
+
+    def get(self, labels: Optional[Dict[str, str]] = None) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def items(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+# Default Buckets in Sekunden (5ms bis 60s)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+class Histogram:
+    """Bucketed Histogramm mit optionalen Labels (kumulativ wie Prometheus)"""
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # label key -> [bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+                self._counts[key] = counts
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def snapshot(self) -> Dict[LabelValues, Tuple[List[int], float]]:
+        """Kopie der (nicht-kumulativen) Bucket-Counts und Summen pro Label-Set"""
+        with self._lock:
+            return {key: (list(counts), self._sums[key]) for key, counts in self._counts.items()}
+
+    def quantile(self, q: float, labels: Optional[Dict[str, str]] = None) -> Optional[float]:
+        """Approximiertes Quantil (obere Bucket-Grenze) für ein Label-Set"""
+        key = _label_key(labels)
+        with self._lock:
+            counts = list(self._counts.get(key, []))
+        total = sum(counts)
+        if not total:
+            return None
+        threshold = q * total
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            if running >= threshold:
+                return bound
+        return float("inf")
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in pairs) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class MetricsRegistry:
+    """
+    Zentrale Registry für alle In-Process Metriken
+    Metriken werden per Name einmalig registriert und wiederverwendet
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class, name: str, description: str):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, description)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric '{name}' already registered as {type(metric).__name__}")
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(
+        self,
+        name: str,
+        description: str = "",
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Histogram(name, description, buckets)
+                self._metrics[name] = metric
+            elif not isinstance(metric, Histogram):
+                raise ValueError(f"Metric '{name}' already registered as {type(metric).__name__}")
+            return metric
+
+    def all_metrics(self) -> Dict[str, object]:
+        with self._lock:
+            return dict(self._metrics)
+
+    def render_prometheus(self) -> str:
+        """
+        Exportiert alle Metriken im Prometheus Text Exposition Format
+
+        Returns:
+            Text für den /metrics Endpoint
+        """
+        lines: List[str] = []
+
+        for name, metric in sorted(self.all_metrics().items()):
+            if isinstance(metric, Histogram):
+                lines.append(f"# HELP {name} {metric.description}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, (counts, total) in sorted(metric.snapshot().items()):
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float("inf"),), counts):
+                        cumulative += count
+                        lines.append(
+                            f"{name}_bucket{_format_labels(labels, ('le', _format_bound(bound)))} {cumulative}"
+                        )
+                    lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+            else:
+                metric_type = "counter" if isinstance(metric, Counter) else "gauge"
+                lines.append(f"# HELP {name} {metric.description}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in sorted(metric.items().items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Global Registry Instance
+_metrics_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Singleton Getter für Metrics Registry
+
+    Returns:
+        MetricsRegistry instance
+    """
+    global _metrics_registry
+
+    if _metrics_registry is None:
+        _metrics_registry = MetricsRegistry()
+
+    return _metrics_registry
@@ -0,0 +1,168 @@
+"""
+TextRPG Repetition Detector
+Erkennt degenerierte Ausgaben (Schleifen, Wiederholung des letzten Turns) während des Streamings
+
+Der Detector läuft inkrementell auf dem Token-Stream: Wörter werden gehasht und
+per Rolling Hash zu Wort-n-Gramm-Shingles zusammengefasst (O(1) pro Wort).
+Zwei Signale:
+- Schleife: Anteil doppelter Shingles in einem gleitenden Fenster
+- Wiederholung: Anteil der Shingles, die schon in der vorigen Antwort vorkamen
+
+Anders als die nachträglichen Checks in `message_utils` greift das, bevor die
+komplette Antwort generiert (und bezahlt) ist - der Aufrufer bricht den Stream ab.
+"""
+
+import re
+import zlib
+from collections import Counter, deque
+from typing import Deque, Optional, Set, Tuple
+
+_BASE = 1_000_003
+_MODULUS = (1 << 61) - 1
+_WORD_PATTERN = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"[.!?…][\"'»“”)]*\s")
+
+
+def _word_hash(word: str) -> int:
+    return zlib.crc32(word.encode("utf-8"))
+
+
+class ShingleHasher:
+    """Rolling Hash über die letzten n Wörter (ein Shingle pro neuem Wort)"""
+
+    def __init__(self, ngram: int = 4):
+        self.ngram = ngram
+        self._high_power = pow(_BASE, ngram - 1, _MODULUS)
+        self._words: Deque[Tuple[int, int]] = deque()
+        self._rolling = 0
+
+    def push(self, word: str, offset: int) -> Optional[Tuple[int, int]]:
+        """
+        Args:
+            word: Normalisiertes Wort
+            offset: Zeichen-Offset des Worts im Text
+
+        Returns:
+            (Shingle-Hash, Offset des ersten Worts) sobald n Wörter vorliegen
+        """
+        word_hash = _word_hash(word)
+        if len(self._words) == self.ngram:
+            out_hash, _ = self._words.popleft()
+            self._rolling = (self._rolling - out_hash * self._high_power) % _MODULUS
+        self._words.append((word_hash, offset))
+        self._rolling = (self._rolling * _BASE + word_hash) % _MODULUS
+        if len(self._words) < self.ngram:
+            return None
+        return self._rolling, self._words[0][1]
+
+
+def shingle_hashes(text: str, ngram: int = 4) -> Set[int]:
+    """Alle Wort-n-Gramm-Shingles eines Texts"""
+    hasher = ShingleHasher(ngram)
+    shingles = (hasher.push(match.group().casefold(), match.start()) for match in _WORD_PATTERN.finditer(text))
+    return {shingle[0] for shingle in shingles if shingle is not None}
+
+
+class RepetitionDetector:
+    """
+    Inkrementeller Detector für Schleifen und Wiederholungen im Token-Stream
+    """
+
+    def __init__(
+        self,
+        previous: Optional[str] = None,
+        ngram: int = 4,
+        window: int = 64,
+        min_shingles: int = 24,
+        loop_ratio: float = 0.5,
+        previous_ratio: float = 0.8
+    ):
+        """
+        Args:
+            previous: Vorige Antwort (Vergleich auf Wiederholung), None = nur Schleifen
+            ngram: Wörter pro Shingle
+            window: Gleitendes Fenster (Shingles) für die Schleifen-Erkennung
+            min_shingles: Mindestanzahl Shingles bevor ein Signal auslöst
+            loop_ratio: Anteil doppelter Shingles im Fenster ab dem eine Schleife vorliegt
+            previous_ratio: Anteil aus der vorigen Antwort bekannter Shingles ab dem wiederholt wird
+        """
+        self.window = window
+        self.min_shingles = min_shingles
+        self.loop_ratio = loop_ratio
+        self.previous_ratio = previous_ratio
+
+        self.text = ""
+        self.reason: Optional[str] = None
+        self.shingles = 0
+        # Zeichen-Offset des ersten wiederholten Shingles (Ende des "sauberen" Texts)
+        self.repeat_offset: Optional[int] = None
+
+        self._scanned = 0
+        self._hasher = ShingleHasher(ngram)
+        self._window: Deque[int] = deque()
+        self._counts: Counter = Counter()
+        self._previous = shingle_hashes(previous, ngram) if previous else set()
+        self._previous_hits = 0
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Verarbeitet den nächsten Stream-Chunk
+
+        Args:
+            chunk: Neuer Text (beliebig geschnitten, Wörter dürfen über Chunks laufen)
+
+        Returns:
+            "loop" oder "repeat_previous" sobald die Ausgabe degeneriert, sonst None
+        """
+        if self.reason is not None:
+            return self.reason
+        self.text += chunk
+        # Nur abgeschlossene Wörter verarbeiten - das letzte kann noch weiterlaufen
+        for match in _WORD_PATTERN.finditer(self.text, self._scanned):
+            if match.end() == len(self.text):
+                break
+            self._scanned = match.end()
+            shingle = self._hasher.push(match.group().casefold(), match.start())
+            if shingle is not None:
+                self._add_shingle(*shingle)
+                if self.reason is not None:
+                    break
+        return self.reason
+
+    def _add_shingle(self, shingle: int, offset: int) -> None:
+        self.shingles += 1
+        # Beginn der aktuellen Folge wiederholter Shingles merken
+        repeated = shingle in self._counts or shingle in self._previous
+        if not repeated:
+            self.repeat_offset = None
+        elif self.repeat_offset is None:
+            self.repeat_offset = offset
+
+        self._window.append(shingle)
+        self._counts[shingle] += 1
+        if len(self._window) > self.window:
+            old = self._window.popleft()
+            self._counts[old] -= 1
+            if not self._counts[old]:
+                del self._counts[old]
+        if shingle in self._previous:
+            self._previous_hits += 1
+
+        if self.shingles < self.min_shingles:
+            return
+        if 1 - len(self._counts) / len(self._window) >= self.loop_ratio:
+            self.reason = "loop"
+        elif self._previous and self._previous_hits / self.shingles >= self.previous_ratio:
+            self.reason = "repeat_previous"
+
+    def clean_prefix(self) -> str:
+        """
+        Text vor der Wiederholung, auf das letzte Satzende gekürzt
+
+        Returns:
+            Verwertbarer Anfang der Ausgabe (ggf. leer)
+        """
+        end = self.repeat_offset if self.repeat_offset is not None else len(self.text)
+        prefix = self.text[:end]
+        sentence_ends = [match.end() for match in _SENTENCE_END.finditer(prefix + " ")]
+        return prefix[:sentence_ends[-1]].strip() if sentence_ends else ""
@@ -0,0 +1,206 @@
+"""
+TextRPG Stream Segmenter
+Fasst Tokens zu SSE-Frames an Satz-, Teilsatz- und Markdown-Block-Grenzen zusammen
+
+Frames enden bevorzugt an einem Absatz bzw. einer Zeile (Markdown-Blöcke, Optionen
+"A) ..."; kurze Zeilen werden zusammengefasst), sonst am Satzende. Ein Frame wird erst ab `min_chars` an einem Satzende
+geschnitten; wächst der Puffer über `max_chars`, wird am letzten Teilsatz (Komma,
+Semikolon, Gedankenstrich) bzw. Wort geschnitten. Kommen Tokens zu langsam, geht
+der Puffer nach `max_latency` bis zum letzten vollständigen Wort raus.
+
+Abkürzungen ("z.B.", "d.h.", "Nr.") und Ordinalzahlen ("3. Kapitel") sind kein
+Satzende.
+"""
+
+import asyncio
+import re
+import time
+from typing import AsyncIterable, AsyncIterator, Iterator, List, Optional
+
+# Satzende: Satzzeichen (auch "..." / "?!"), schließende Anführungszeichen/Klammern, Whitespace
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'»«“”‘’)\]*_]*(?=\s)")
+# Teilsatz: Komma, Semikolon, Doppelpunkt, Gedankenstrich
+_CLAUSE_END = re.compile(r"(?:[,;:]|\s[–—-])(?=\s)")
+_WORD_END = re.compile(r"\S(?=\s)")
+_ABBREVIATIONS = frozenset({
+    "z.b", "d.h", "u.a", "o.ä", "usw", "bzw", "ca", "vgl", "evtl", "ggf", "inkl", "etc",
+    "dr", "nr", "st", "str", "hr", "fr", "mr", "mrs", "ms", "e.g", "i.e", "vs"
+})
+
+
+def _is_abbreviation(text: str, dot: int) -> bool:
+    """Steht der Punkt an Position `dot` hinter einer Abkürzung, Initiale oder Zahl?"""
+    start = dot
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    word = text[start:dot].strip("\"'„“»«(").casefold()
+    return word in _ABBREVIATIONS or word.isdigit() or (len(word) == 1 and word.isalpha())
+
+
+class StreamSegmenter:
+    """
+    Inkrementeller Segmenter: Tokens rein, wohlgeformte Frames raus
+    """
+
+    def __init__(self, min_chars: int = 40, max_chars: int = 400):
+        """
+        Args:
+            min_chars: Mindestgröße eines Frames, der an einem Satzende geschnitten wird
+            max_chars: Maximale Frame-Größe (darüber wird an Teilsatz/Wort geschnitten)
+        """
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def push(self, token: str) -> List[str]:
+        """
+        Nimmt ein Token auf
+
+        Returns:
+            Fertige Frames (ggf. leer)
+        """
+        self.buffer += token
+        frames = []
+        while True:
+            cut = self._cut()
+            if cut is None:
+                return frames
+            frames.append(self._take(cut))
+
+    def _cut(self) -> Optional[int]:
+        text = self.buffer
+        # Markdown-Block / Zeile: Schnitt hinter dem ersten Absatz bzw. der ersten
+        # Zeile ab min_chars (kurze Zeilen werden zusammengefasst)
+        newline = text.find("\n", 0, self.max_chars + 1)
+        while newline >= 0:
+            end = newline + 1
+            # Aufeinanderfolgende Leerzeilen zusammenhalten
+            while end < len(text) and text[end] == "\n":
+                end += 1
+            if end == len(text):
+                break
+            if end >= self.min_chars or end - newline > 1:
+                return end
+            newline = text.find("\n", end, self.max_chars + 1)
+        if len(text) <= self.min_chars:
+            return None
+
+        sentence = self._last(_SENTENCE_END, text, self.max_chars, sentence=True)
+        if sentence is not None and sentence >= self.min_chars:
+            return sentence
+        if len(text) <= self.max_chars:
+            return None
+        # Zu groß: Teilsatz, sonst Wort, sonst harter Schnitt
+        for candidate in (sentence, self._last(_CLAUSE_END, text, self.max_chars), self._last(_WORD_END, text, self.max_chars)):
+            if candidate:
+                return candidate
+        return self.max_chars
+
+    @staticmethod
+    def _last(pattern: "re.Pattern[str]", text: str, limit: int, sentence: bool = False) -> Optional[int]:
+        """Ende des letzten Treffers innerhalb der ersten `limit` Zeichen"""
+        last = None
+        for match in pattern.finditer(text, 0, limit + 1):
+            if sentence and text[match.start()] == "." and match.end() - match.start() == 1 \
+                    and _is_abbreviation(text, match.start()):
+                continue
+            last = match.end()
+        return last
+
+    def _take(self, end: int) -> str:
+        # Whitespace hinter dem Schnitt gehört noch zum Frame (Client konkateniert)
+        while end < len(self.buffer) and self.buffer[end] in " \t":
+            end += 1
+        frame, self.buffer = self.buffer[:end], self.buffer[end:]
+        return frame
+
+    def flush_words(self) -> Optional[str]:
+        """Latenz-Flush: Puffer bis zum letzten vollständigen Wort"""
+        end = self._last(_WORD_END, self.buffer, len(self.buffer))
+        if not end:
+            return None
+        return self._take(end)
+
+    def flush(self) -> Optional[str]:
+        """Stream-Ende: restlicher Puffer"""
+        frame, self.buffer = self.buffer, ""
+        return frame or None
+
+
+def segment_text(text: str, min_chars: int = 40, max_chars: int = 400) -> Iterator[str]:
+    """
+    Zerlegt einen fertigen Text in Frames
+
+    Args:
+        text: Vollständige Antwort
+        min_chars: Mindestgröße eines Frames am Satzende
+        max_chars: Maximale Frame-Größe
+
+    Returns:
+        Frames, deren Konkatenation den Text ergibt
+    """
+    segmenter = StreamSegmenter(min_chars, max_chars)
+    yield from segmenter.push(text)
+    rest = segmenter.flush()
+    if rest:
+        yield rest
+
+
+async def segment_stream(
+    tokens: AsyncIterable[str],
+    min_chars: int = 40,
+    max_chars: int = 400,
+    max_latency: Optional[float] = 0.25
+) -> AsyncIterator[str]:
+    """
+    Segmentiert einen Token-Stream
+
+    Args:
+        tokens: Async Token-Quelle (z.B. LLM Stream)
+        min_chars: Mindestgröße eines Frames am Satzende
+        max_chars: Maximale Frame-Größe
+        max_latency: Maximale Wartezeit in Sekunden, bis gepufferter Text rausgeht (None = keine)
+
+    Returns:
+        Frames, deren Konkatenation den Token-Stream ergibt
+    """
+    segmenter = StreamSegmenter(min_chars, max_chars)
+    iterator = tokens.__aiter__()
+    # Laufendes __anext__ wird bei einem Timeout nicht abgebrochen, sondern weiter erwartet
+    pending: Optional[asyncio.Future] = None
+    buffered_since: Optional[float] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = None
+            if max_latency is not None and buffered_since is not None:
+                timeout = max(buffered_since + max_latency - time.monotonic(), 0.0)
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                frame = segmenter.flush_words()
+                buffered_since = time.monotonic() if segmenter.buffer else None
+                if frame:
+                    yield frame
+                continue
+
+            try:
+                token = pending.result()
+            except StopAsyncIteration:
+                pending = None
+                break
+            pending = None
+            frames = segmenter.push(token)
+            for frame in frames:
+                yield frame
+            if not segmenter.buffer:
+                buffered_since = None
+            elif frames or buffered_since is None:
+                buffered_since = time.monotonic()
+
+        rest = segmenter.flush()
+        if rest:
+            yield rest
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,380 @@
+"""
+TextRPG Stream Pipeline
+Komponierbare Async-Generator-Stages für die Nachbearbeitung von Antworten
+
+Eine Stage ist ein Async Generator `stage(tokens, context)`, der Text-Stücke
+konsumiert und (ggf. andere) Text-Stücke liefert. Die Pipeline verkettet Stages,
+misst die Eigenzeit jeder Stage (ohne Warten auf Upstream) als Turn-Stage
+`stream:<name>` und schließt bei einem Abbruch die ganze Kette inkl. Quelle.
+
+Zwei Konfigurationen, von allen Agents gemeinsam genutzt:
+- Generation (LLM Token-Stream in `run_llm`): Repetition Guard, Marker, Zustands-Block, Cleanup, Metrics Tap
+- Delivery (Antwort → SSE-Frames im Session Manager): Segmentierung, Metrics Tap
+"""
+
+import re
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Collection, Dict, List, Optional, Sequence, Tuple
+
+from .metrics import get_metrics_registry
+from .repetition import RepetitionDetector
+from .segmenter import segment_stream
+from .timing import record_stage
+
+Stage = Callable[[AsyncIterator[str], "StreamContext"], AsyncIterator[str]]
+
+
+class StreamContext:
+    """Kontext eines Pipeline-Laufs (Eingaben der Stages und gesammelte Ergebnisse)"""
+
+    def __init__(self, agent: Optional[str] = None, previous: Optional[str] = None):
+        """
+        Args:
+            agent: Agent-Name (Metrik-Labels)
+            previous: Vorige Antwort des Agents (Repetition Guard)
+        """
+        self.agent = agent
+        self.previous = previous
+        self.markers: List[str] = []
+        self.blocks: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+
+    def reset_results(self) -> None:
+        """Verwirft gesammelte Marker und Blöcke (z.B. vor einem Retry)"""
+        self.markers.clear()
+        self.blocks.clear()
+
+
+class DegenerateOutput(Exception):
+    """Repetition Guard: Ausgabe degeneriert - der Stream wird abgebrochen"""
+
+    def __init__(self, reason: str, detector: RepetitionDetector):
+        super().__init__(f"Degenerate output ({reason})")
+        self.reason = reason
+        self.detector = detector
+
+
+class _TimedIterator:
+    """Misst die Zeit in __anext__ (inkl. Upstream) eines Iterators"""
+
+    def __init__(self, iterator: AsyncIterator[str]):
+        self.iterator = iterator
+        self.elapsed = 0.0
+
+    def __aiter__(self) -> "_TimedIterator":
+        return self
+
+    async def __anext__(self) -> str:
+        start = time.perf_counter()
+        try:
+            return await self.iterator.__anext__()
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    async def aclose(self) -> None:
+        close = getattr(self.iterator, "aclose", None)
+        if close is not None:
+            await close()
+
+
+async def text_source(text: str) -> AsyncIterator[str]:
+    """Fertiger Text als Stream-Quelle"""
+    yield text
+
+
+class StreamPipeline:
+    """
+    Verkettung benannter Stages
+    """
+
+    def __init__(self, stages: Sequence[Tuple[str, Stage]]):
+        """
+        Args:
+            stages: (Name, Stage) in Verarbeitungsreihenfolge
+        """
+        self.stages = list(stages)
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.stages]
+
+    async def run(
+        self,
+        source: AsyncIterable[str],
+        context: Optional[StreamContext] = None,
+        exclude: Collection[str] = ()
+    ) -> AsyncIterator[str]:
+        """
+        Lässt einen Stream durch alle Stages laufen
+
+        Args:
+            source: Text-Quelle (z.B. LLM Tokens)
+            context: Kontext des Laufs (default: leerer Kontext)
+            exclude: Stage-Namen, die übersprungen werden
+
+        Returns:
+            Ausgabe der letzten Stage
+        """
+        context = context or StreamContext()
+        chain = [_TimedIterator(source.__aiter__())]
+        names = []
+        for name, stage in self.stages:
+            if name in exclude:
+                continue
+            chain.append(_TimedIterator(stage(chain[-1], context)))
+            names.append(name)
+        try:
+            async for piece in chain[-1]:
+                yield piece
+        finally:
+            # Von außen nach innen schließen - ein Abbruch beendet auch die Quelle
+            for iterator in reversed(chain):
+                await iterator.aclose()
+            for index, name in enumerate(names, start=1):
+                own = max(chain[index].elapsed - chain[index - 1].elapsed, 0.0)
+                context.timings[name] = own
+                record_stage(f"stream:{name}", own)
+
+    async def process(self, text: str, context: Optional[StreamContext] = None, exclude: Collection[str] = ()) -> str:
+        """Fertigen Text durch die Pipeline schicken (Ausgabe zusammengefügt)"""
+        async with aclosing(self.run(text_source(text), context, exclude)) as pieces:
+            return "".join([piece async for piece in pieces])
+
+
+# --- Stages ---
+
+def _partial_suffix(text: str, candidates: Sequence[str]) -> int:
+    """Länge des Text-Endes, das noch der Anfang eines der Kandidaten sein kann"""
+    longest = max((len(candidate) for candidate in candidates), default=0)
+    for size in range(min(longest - 1, len(text)), 0, -1):
+        tail = text[-size:]
+        if any(candidate.startswith(tail) for candidate in candidates):
+            return size
+    return 0
+
+
+def repetition_guard(**detector_options: Any) -> Stage:
+    """
+    Bricht mit DegenerateOutput ab, sobald die Ausgabe schleift oder die vorige Antwort wiederholt
+
+    Args:
+        detector_options: Parameter für RepetitionDetector (ngram, window, ...)
+    """
+    async def stage(tokens: AsyncIterator[str], context: StreamContext) -> AsyncIterator[str]:
+        detector = RepetitionDetector(previous=context.previous, **detector_options)
+        async for token in tokens:
+            reason = detector.feed(token)
+            yield token
+            if reason is not None:
+                raise DegenerateOutput(reason, detector)
+    return stage
+
+
+def strip_markers(markers: Sequence[str]) -> Stage:
+    """
+    Entfernt System-Marker (z.B. "[NEUES-KAPITEL]") aus dem Stream und merkt sie im Kontext
+
+    Args:
+        markers: Marker-Strings
+    """
+    pattern = re.compile("|".join(re.escape(marker) for marker in markers) + r"[ \t]*") if markers else None
+
+    async def stage(tokens: AsyncIterator[str], context: StreamContext) -> AsyncIterator[str]:
+        if pattern is None:
+            async for token in tokens:
+                yield token
+            return
+        pending = ""
+        async for token in tokens:
+            pending += token
+            for match in pattern.finditer(pending):
+                context.markers.append(match.group().strip())
+            pending = pattern.sub("", pending)
+            keep = _partial_suffix(pending, markers)
+            ready, pending = pending[:len(pending) - keep], pending[len(pending) - keep:]
+            if ready:
+                yield ready
+        if pending:
+            yield pending
+    return stage
+
+
+def capture_block(tag: str) -> Stage:
+    """
+    Entfernt einen Block "[TAG] ... [/TAG]" aus dem Stream und legt den Inhalt in context.blocks ab
+
+    Args:
+        tag: Block-Name (z.B. "ZUSTAND")
+    """
+    opening, closing = f"[{tag}]", f"[/{tag}]"
+
+    async def stage(tokens: AsyncIterator[str], context: StreamContext) -> AsyncIterator[str]:
+        pending = ""
+        captured: List[str] = []
+        inside = False
+        async for token in tokens:
+            pending += token
+            while True:
+                marker = closing if inside else opening
+                index = pending.find(marker)
+                if index < 0:
+                    keep = _partial_suffix(pending, [marker])
+                    ready, pending = pending[:len(pending) - keep], pending[len(pending) - keep:]
+                    if inside:
+                        captured.append(ready)
+                    elif ready:
+                        yield ready
+                    break
+                if inside:
+                    captured.append(pending[:index])
+                    context.blocks[tag] = "".join(captured).strip()
+                    captured = []
+                elif index:
+                    yield pending[:index]
+                pending = pending[index + len(marker):]
+                inside = not inside
+        if inside:
+            # Nicht geschlossener Block am Ende der Antwort
+            context.blocks[tag] = "".join(captured + [pending]).strip()
+        elif pending:
+            yield pending
+    return stage
+
+
+_TRAILING_SPACES = re.compile(r"[ \t]+\n")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_INNER_SPACES = re.compile(r"(?<=\S)[ \t]{2,}")
+_REPEATED_MARKS = re.compile(r"([!?])\1+")
+_OPEN_TAIL = re.compile(r"[\s!?]+$")
+
+
+def cleanup() -> Stage:
+    """
+    Whitespace- und Satzzeichen-Bereinigung (Markdown-sicher: Zeilen und Einrückung bleiben)
+
+    Mehrfache Leerzeichen im Satz, Leerzeichen am Zeilenende, mehr als eine Leerzeile
+    und "!!"/"??" werden zusammengefasst; führender und abschließender Whitespace entfällt.
+    """
+    def normalize(text: str, before: str) -> str:
+        # Ein Zeichen Vorlauf, damit Regeln über Chunk-Grenzen greifen
+        text = before + text
+        text = _TRAILING_SPACES.sub("\n", text)
+        text = _BLANK_LINES.sub("\n\n", text)
+        text = _INNER_SPACES.sub(" ", text)
+        text = _REPEATED_MARKS.sub(r"\1", text)
+        return text[len(before):]
+
+    async def stage(tokens: AsyncIterator[str], context: StreamContext) -> AsyncIterator[str]:
+        pending = ""
+        before = ""
+        async for token in tokens:
+            pending += token
+            if not before:
+                pending = pending.lstrip()
+            # Offenes Ende (Whitespace, !/?) zurückhalten, bis klar ist wie es weitergeht
+            tail = _OPEN_TAIL.search(pending)
+            cut = tail.start() if tail else len(pending)
+            if cut:
+                ready = normalize(pending[:cut], before)
+                pending = pending[cut:]
+                before = ready[-1:] or before
+                if ready:
+                    yield ready
+        rest = normalize(pending.rstrip() if before else pending.strip(), before)
+        if rest:
+            yield rest
+    return stage
+
+
+def segmentation(min_chars: int = 40, max_chars: int = 400, max_latency: Optional[float] = None) -> Stage:
+    """Frames an Absatz-, Zeilen- und Satzgrenzen (siehe segmenter)"""
+    async def stage(tokens: AsyncIterator[str], context: StreamContext) -> AsyncIterator[str]:
+        async with aclosing(segment_stream(tokens, min_chars, max_chars, max_latency)) as frames:
+            async for frame in frames:
+                yield frame
+    return stage
+
+
+def metrics_tap(pipeline: str) -> Stage:
+    """
+    Reicht den Stream unverändert durch und misst Stück-Größen
+
+    Args:
+        pipeline: Label der Pipeline (generation / delivery)
+    """
+    chunk_chars = get_metrics_registry().histogram(
+        "textrpg_stream_chunk_chars",
+        "Characters per chunk leaving a stream pipeline",
+        buckets=(1, 4, 16, 32, 64, 128, 256, 512, 1024)
+    )
+
+    async def stage(tokens: AsyncIterator[str], context: StreamContext) -> AsyncIterator[str]:
+        labels = {"pipeline": pipeline, "agent": context.agent or "none"}
+        async for token in tokens:
+            chunk_chars.observe(len(token), labels)
+            yield token
+    return stage
+
+
+# Global Pipeline Instances
+_generation_pipeline: Optional[StreamPipeline] = None
+_delivery_pipeline: Optional[StreamPipeline] = None
+
+
+def get_generation_pipeline() -> StreamPipeline:
+    """
+    Singleton Getter für die Pipeline auf dem LLM Token-Stream (alle Agents)
+
+    Returns:
+        StreamPipeline instance
+    """
+    global _generation_pipeline
+
+    if _generation_pipeline is None:
+        from ..config import settings
+
+        stages: List[Tuple[str, Stage]] = []
+        if settings.repetition_detection_enabled:
+            stages.append(("repetition_guard", repetition_guard(
+                ngram=settings.repetition_ngram,
+                window=settings.repetition_window,
+                min_shingles=settings.repetition_min_shingles,
+                loop_ratio=settings.repetition_loop_ratio,
+                previous_ratio=settings.repetition_previous_ratio
+            )))
+        stages.append(("markers", strip_markers(settings.stream_strip_markers)))
+        if settings.world_state_enabled:
+            from ..agents.world_state import WORLD_STATE_TAG
+
+            stages.append(("world_state", capture_block(WORLD_STATE_TAG)))
+        if settings.stream_cleanup_enabled:
+            stages.append(("cleanup", cleanup()))
+        stages.append(("token_tap", metrics_tap("generation")))
+        _generation_pipeline = StreamPipeline(stages)
+
+    return _generation_pipeline
+
+
+def get_delivery_pipeline() -> StreamPipeline:
+    """
+    Singleton Getter für die Pipeline Antwort → SSE-Frames
+
+    Returns:
+        StreamPipeline instance
+    """
+    global _delivery_pipeline
+
+    if _delivery_pipeline is None:
+        from ..config import settings
+
+        _delivery_pipeline = StreamPipeline([
+            ("segmentation", segmentation(
+                settings.stream_segment_min_chars,
+                settings.stream_segment_max_chars,
+                settings.stream_segment_max_latency_ms / 1000
+            )),
+            ("frame_tap", metrics_tap("delivery"))
+        ])
+
+    return _delivery_pipeline
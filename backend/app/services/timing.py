@@ -0,0 +1,181 @@
+"""
+TextRPG Turn Timing
+Strukturierte Latenz-Aufschlüsselung pro Turn und Server-Timing für normale Routes
+
+Stages eines Turns: session_lookup, graph_entry, node:<agent>, llm_queue_wait,
+llm_ttft, llm_generation, sse_flush, state_write_back. Die Werte landen in
+Histogrammen (gelabelt nach agent und model) und werden unter /metrics exportiert.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+import structlog
+
+from .metrics import get_metrics_registry
+
+logger = structlog.get_logger()
+
+
+class StageTimings:
+    """Akkumuliert Stage-Dauern (Sekunden) in Aufruf-Reihenfolge"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.started_at = time.perf_counter()
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def as_ms(self) -> Dict[str, float]:
+        return {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()}
+
+    def server_timing_header(self) -> str:
+        """Formatiert die Stages als Server-Timing Header (dur in ms)"""
+        entries: List[str] = [
+            f"{stage.replace(':', '_')};dur={seconds * 1000:.2f}"
+            for stage, seconds in self.stages.items()
+        ]
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+
+class TurnTimer(StageTimings):
+    """
+    Timing eines Chat-Turns
+    Agents/Nodes setzen agent und model, finish() schreibt in die Histogramme
+    """
+
+    def __init__(self, session_id: Optional[str] = None):
+        super().__init__()
+        self.session_id = session_id
+        self.agent: Optional[str] = None
+        self.model: Optional[str] = None
+        self.graph_started_at: Optional[float] = None
+        self._finished = False
+
+    def mark_graph_start(self) -> None:
+        self.graph_started_at = time.perf_counter()
+
+    def mark_node_entry(self) -> None:
+        """Erste Node-Ausführung: Zeit seit ainvoke als graph_entry verbuchen"""
+        if self.graph_started_at is not None and "graph_entry" not in self.stages:
+            self.add("graph_entry", time.perf_counter() - self.graph_started_at)
+
+    def labels(self) -> Dict[str, str]:
+        return {"agent": self.agent or "unknown", "model": self.model or "unknown"}
+
+    def finish(self) -> None:
+        """Schreibt Stage- und Turn-Dauern in die Histogramme (einmalig)"""
+        if self._finished:
+            return
+        self._finished = True
+
+        labels = self.labels()
+        for stage, seconds in self.stages.items():
+            _stage_histogram().observe(seconds, {**labels, "stage": stage})
+        _turn_histogram().observe(self.elapsed(), labels)
+
+        logger.debug("Turn timing",
+                    session_id=self.session_id,
+                    total_ms=round(self.elapsed() * 1000, 3),
+                    stages_ms=self.as_ms(),
+                    **labels)
+
+
+def _stage_histogram():
+    return get_metrics_registry().histogram(
+        "textrpg_turn_stage_seconds",
+        "Duration of individual turn stages"
+    )
+
+
+def _turn_histogram():
+    return get_metrics_registry().histogram(
+        "textrpg_turn_duration_seconds",
+        "End-to-end turn duration"
+    )
+
+
+_current_turn: ContextVar[Optional[TurnTimer]] = ContextVar("textrpg_turn_timer", default=None)
+_current_request: ContextVar[Optional[StageTimings]] = ContextVar("textrpg_request_timings", default=None)
+
+
+@contextmanager
+def turn_timer(session_id: Optional[str] = None) -> Iterator[TurnTimer]:
+    """Context Manager: TurnTimer für den Block (Kind-Tasks erben ihn)"""
+    timer = TurnTimer(session_id)
+    token = _current_turn.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_turn.reset(token)
+
+
+def get_turn_timer() -> Optional[TurnTimer]:
+    """Aktueller TurnTimer oder None"""
+    return _current_turn.get()
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Verbucht eine Stage im aktuellen Turn und im aktuellen Request (falls vorhanden)"""
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.add(stage, seconds)
+    request = _current_request.get()
+    if request is not None and request is not turn:
+        request.add(stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Context Manager: misst den Block als Stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI Middleware: Server-Timing Header mit den Stages des Requests
+
+    Normale Routes verbuchen ihre Stages über timed_stage (z.B. store_refresh,
+    history_page, cold_history_thaw, snapshot_decode), dazu kommt immer total.
+    SSE-Responses (text/event-stream) werden übersprungen, da ihre Stages erst
+    nach dem Header-Versand entstehen - dort greifen die Turn-Histogramme.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = StageTimings()
+        token = _current_request.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                is_stream = any(
+                    name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in headers
+                )
+                if not is_stream:
+                    headers.append((b"server-timing", timings.server_timing_header().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
@@ -0,0 +1,165 @@
+"""
+TextRPG Trace Sampling
+Deterministisches Session-Sampling für LangSmith Tracing
+
+Ob eine Session getraced wird, entscheidet ein Hash der session_id gegen
+langsmith_sample_rate - alle Turns einer Session landen also vollständig
+(oder gar nicht) in LangSmith. Für nicht gesampelte Sessions wird Tracing per
+Context abgeschaltet, LangChain hängt dann keinen Tracer an die Runs.
+"""
+
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, Optional
+import uuid
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+class TraceSampler:
+    """Deterministisches Sampling pro Session (Hash der session_id gegen rate)"""
+
+    def __init__(self, rate: float = 1.0, salt: str = ""):
+        """
+        Args:
+            rate: Anteil getracter Sessions (0.0 - 1.0)
+            salt: Optionaler Salt, um eine andere Session-Stichprobe zu ziehen
+        """
+        self.rate = max(0.0, min(1.0, rate))
+        self.salt = salt
+
+    def is_sampled(self, session_id: Optional[str]) -> bool:
+        if self.rate >= 1.0:
+            return True
+        if self.rate <= 0.0 or not session_id:
+            return False
+        digest = hashlib.blake2b(f"{self.salt}{session_id}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2**64 < self.rate
+
+
+class SessionTracker:
+    """
+    Manages session-level tracing for LangSmith
+    Bounded (LRU) - älteste Sessions fallen raus, Einträge enden mit der Session
+    """
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self.session_runs: "OrderedDict[str, str]" = OrderedDict()  # session_id -> parent_run_id
+
+    def get_or_create_session_run(self, session_id: str) -> str:
+        """Get or create a parent run ID for the session"""
+        parent_run_id = self.session_runs.get(session_id)
+        if parent_run_id is not None:
+            self.session_runs.move_to_end(session_id)
+            return parent_run_id
+
+        # Create a new parent run ID for this session
+        parent_run_id = str(uuid.uuid4())
+        self.session_runs[session_id] = parent_run_id
+        if len(self.session_runs) > self.max_sessions:
+            evicted, _ = self.session_runs.popitem(last=False)
+            logger.debug("Evicted session run", session_id=evicted)
+        logger.info("Created session run", session_id=session_id, parent_run_id=parent_run_id)
+        return parent_run_id
+
+    def end_session_run(self, session_id: str):
+        """Remove session run when session ends"""
+        parent_run_id = self.session_runs.pop(session_id, None)
+        if parent_run_id is not None:
+            logger.info("Ended session run", session_id=session_id, parent_run_id=parent_run_id)
+
+
+@contextmanager
+def _traced_session(session_id: str, metadata: Dict[str, Any]) -> Iterator[None]:
+    from langsmith.run_helpers import tracing_context
+
+    with tracing_context(
+        enabled=True,
+        tags=[f"session:{session_id}"],
+        metadata={"session_id": session_id, **metadata},
+        client=get_langsmith_client()
+    ):
+        yield
+
+
+def session_tracing(session_id: Optional[str], **metadata: Any) -> ContextManager[None]:
+    """
+    Tracing-Context für einen Turn
+
+    - Tracing global aus: nullcontext (kein Overhead)
+    - Session nicht gesampelt: Tracing per Context deaktiviert (kein Tracer, keine Run-Serialisierung)
+    - Session gesampelt: Tracing an, Runs mit session Tag und Metadata
+
+    Args:
+        session_id: Session ID
+        **metadata: Zusätzliche Run-Metadata
+
+    Returns:
+        Context Manager für den LLM-/Workflow-Aufruf (nicht über yields halten)
+    """
+    from ..config import settings
+
+    if not settings.langsmith_tracing:
+        return nullcontext()
+
+    if not get_trace_sampler().is_sampled(session_id):
+        from langsmith.run_helpers import tracing_context
+        return tracing_context(enabled=False)
+
+    return _traced_session(session_id, metadata)
+
+
+# Global Instances
+_trace_sampler: Optional[TraceSampler] = None
+_langsmith_client = None
+
+
+def get_trace_sampler() -> TraceSampler:
+    """
+    Singleton Getter für Trace Sampler (konfiguriert über Settings)
+
+    Returns:
+        TraceSampler instance
+    """
+    global _trace_sampler
+
+    if _trace_sampler is None:
+        from ..config import settings
+
+        _trace_sampler = TraceSampler(settings.langsmith_sample_rate)
+
+    return _trace_sampler
+
+
+def get_langsmith_client():
+    """
+    Geteilter LangSmith Client - Runs werden im Hintergrund-Thread gebatcht hochgeladen
+
+    Returns:
+        langsmith.Client instance
+    """
+    global _langsmith_client
+
+    if _langsmith_client is None:
+        from langsmith import Client
+
+        _langsmith_client = Client(auto_batch_tracing=True)
+
+    return _langsmith_client
+
+
+def close_tracing() -> None:
+    """Flusht ausstehende Trace-Batches und resettet Sampler und Client"""
+    global _trace_sampler, _langsmith_client
+
+    if _langsmith_client is not None:
+        try:
+            _langsmith_client.flush()
+        except Exception as e:
+            logger.warning("LangSmith flush failed", error=str(e))
+    _trace_sampler = None
+    _langsmith_client = None
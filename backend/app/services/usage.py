@@ -0,0 +1,250 @@
+"""
+TextRPG Token Usage & Cost Accounting
+Extrahiert Provider-Usage aus LLM Responses, berechnet Kosten und aggregiert pro Turn und Model
+
+Pro Turn wird eine UsageCapture im Context gesetzt; jeder LLM-Call meldet seine
+Usage dort (und an alle umschließenden Captures). Nodes nutzen eine eigene
+Capture für die Message-Metadata, der SessionManager eine für die Session-Totals.
+
+Eine Token-Reservierung im Context (z.B. spekulative Turns) begrenzt die
+Completion-Tokens der LLM-Calls im Block auf das noch nicht verbrauchte Budget.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+import structlog
+
+from .metrics import get_metrics_registry
+
+logger = structlog.get_logger()
+
+
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens")
+
+
+def empty_usage() -> Dict[str, Any]:
+    """Leeres Usage-Dict (Tokens, Kosten, Anzahl Calls)"""
+    return {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "total_tokens": 0,
+        "cost_usd": 0.0,
+        "calls": 0
+    }
+
+
+def add_usage(target: Dict[str, Any], usage: Dict[str, Any]) -> Dict[str, Any]:
+    """Addiert usage in target (in-place) und gibt target zurück"""
+    for field in USAGE_FIELDS:
+        target[field] = target.get(field, 0) + int(usage.get(field, 0) or 0)
+    target["cost_usd"] = round(target.get("cost_usd", 0.0) + float(usage.get("cost_usd", 0.0) or 0.0), 8)
+    target["calls"] = target.get("calls", 0) + int(usage.get("calls", 1))
+    return target
+
+
+def extract_usage(message: Any) -> Optional[Dict[str, int]]:
+    """
+    Liest Token-Usage aus einer LangChain Message (oder aggregiertem Stream-Chunk)
+
+    Bevorzugt das normalisierte usage_metadata, fällt auf den rohen Provider-Block
+    (response_metadata.token_usage) zurück.
+
+    Args:
+        message: AIMessage / AIMessageChunk
+
+    Returns:
+        Usage-Dict oder None wenn der Provider keine Usage geliefert hat
+    """
+    usage_metadata = getattr(message, "usage_metadata", None)
+    if usage_metadata:
+        details = usage_metadata.get("input_token_details") or {}
+        prompt_tokens = usage_metadata.get("input_tokens", 0)
+        completion_tokens = usage_metadata.get("output_tokens", 0)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": details.get("cache_read", 0) or 0,
+            "total_tokens": usage_metadata.get("total_tokens", prompt_tokens + completion_tokens)
+        }
+
+    response_metadata = getattr(message, "response_metadata", None) or {}
+    token_usage = response_metadata.get("token_usage") or response_metadata.get("usage")
+    if token_usage:
+        details = token_usage.get("prompt_tokens_details") or {}
+        prompt_tokens = token_usage.get("prompt_tokens", 0)
+        completion_tokens = token_usage.get("completion_tokens", 0)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": details.get("cached_tokens", 0) or 0,
+            "total_tokens": token_usage.get("total_tokens", prompt_tokens + completion_tokens)
+        }
+        # OpenRouter liefert bei Usage Accounting die tatsächlichen Kosten mit
+        if "cost" in token_usage:
+            usage["provider_cost_usd"] = float(token_usage["cost"])
+        return usage
+
+    return None
+
+
+def compute_cost(model: str, usage: Dict[str, Any], pricing: Optional[Dict[str, Dict[str, float]]] = None) -> float:
+    """
+    Berechnet Kosten in USD aus Usage und Preistabelle (USD pro 1M Tokens)
+
+    Cached Tokens sind Teil der Prompt Tokens und werden zum cached-Preis abgerechnet.
+    Von OpenRouter gelieferte Kosten haben Vorrang.
+
+    Args:
+        model: Model-Name
+        usage: Usage-Dict aus extract_usage
+        pricing: Preistabelle (default: settings.llm_pricing)
+
+    Returns:
+        Kosten in USD (0.0 für Models ohne Preis)
+    """
+    if "provider_cost_usd" in usage:
+        return usage["provider_cost_usd"]
+
+    if pricing is None:
+        from ..config import settings
+        pricing = settings.llm_pricing
+
+    prices = pricing.get(model)
+    if not prices:
+        return 0.0
+
+    cached = min(usage.get("cached_tokens", 0), usage.get("prompt_tokens", 0))
+    uncached = usage.get("prompt_tokens", 0) - cached
+    cost = (
+        uncached * prices.get("prompt", 0.0)
+        + cached * prices.get("cached", prices.get("prompt", 0.0))
+        + usage.get("completion_tokens", 0) * prices.get("completion", 0.0)
+    ) / 1_000_000
+    return round(cost, 8)
+
+
+class UsageCapture:
+    """Sammelt die Usage aller LLM-Calls innerhalb eines Context-Blocks"""
+
+    def __init__(self, parent: Optional["UsageCapture"] = None):
+        self.parent = parent
+        self.totals = empty_usage()
+        self.models: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, model: str, usage: Dict[str, Any]) -> None:
+        capture: Optional[UsageCapture] = self
+        while capture is not None:
+            add_usage(capture.totals, usage)
+            add_usage(capture.models.setdefault(model, empty_usage()), usage)
+            capture = capture.parent
+
+    @property
+    def has_usage(self) -> bool:
+        return self.totals["calls"] > 0
+
+
+_current_capture: ContextVar[Optional[UsageCapture]] = ContextVar("textrpg_usage_capture", default=None)
+
+
+@contextmanager
+def capture_usage() -> Iterator[UsageCapture]:
+    """Context Manager: sammelt Usage aller LLM-Calls im Block (verschachtelbar)"""
+    capture = UsageCapture(parent=_current_capture.get())
+    token = _current_capture.set(capture)
+    try:
+        yield capture
+    finally:
+        _current_capture.reset(token)
+
+
+class TokenReservation:
+    """Reserviertes Token-Budget für die LLM-Calls eines Blocks"""
+
+    def __init__(self, tokens: int, usage: UsageCapture):
+        """
+        Args:
+            tokens: Reservierte Tokens (Prompt + Completion)
+            usage: Capture, in der die Calls des Blocks verbucht werden
+        """
+        self.tokens = tokens
+        self.usage = usage
+
+    @property
+    def remaining(self) -> int:
+        return max(self.tokens - self.usage.totals["total_tokens"], 0)
+
+
+_current_reservation: ContextVar[Optional[TokenReservation]] = ContextVar("textrpg_token_reservation", default=None)
+
+
+@contextmanager
+def reserve_tokens(tokens: int, usage: UsageCapture) -> Iterator[TokenReservation]:
+    """Context Manager: LLM-Calls im Block dürfen höchstens `tokens` (abzüglich Verbrauch) erzeugen"""
+    reservation = TokenReservation(tokens, usage)
+    token = _current_reservation.set(reservation)
+    try:
+        yield reservation
+    finally:
+        _current_reservation.reset(token)
+
+
+def get_token_reservation() -> Optional[TokenReservation]:
+    """Aktive Token-Reservierung oder None (unbegrenzter Call)"""
+    return _current_reservation.get()
+
+
+def record_llm_usage(model: str, message: Any, session_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Verbucht die Usage einer LLM Response (Metriken + aktive Captures)
+
+    Args:
+        model: Model-Name
+        message: AIMessage / aggregierter AIMessageChunk
+        session_id: Optional Session ID für das Log
+
+    Returns:
+        Usage-Dict inkl. cost_usd oder None ohne Provider-Usage
+    """
+    usage = extract_usage(message)
+    if usage is None:
+        logger.debug("LLM response without usage block", model=model, session_id=session_id)
+        return None
+
+    usage["cost_usd"] = compute_cost(model, usage)
+    usage.pop("provider_cost_usd", None)
+    usage["calls"] = 1
+
+    registry = get_metrics_registry()
+    tokens = registry.counter("textrpg_llm_tokens_total", "LLM tokens by model and kind")
+    for kind in ("prompt", "completion", "cached"):
+        tokens.inc(usage[f"{kind}_tokens"], {"model": model, "kind": kind})
+    registry.counter("textrpg_llm_cost_usd_total", "Computed LLM cost in USD by model").inc(
+        usage["cost_usd"], {"model": model}
+    )
+    registry.counter("textrpg_llm_calls_total", "LLM calls with usage by model").inc(1, {"model": model})
+
+    capture = _current_capture.get()
+    if capture is not None:
+        capture.add(model, usage)
+
+    return usage
+
+
+def record_precomputed_usage(models: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Verbucht vorab erzeugte Usage (z.B. Opener Pool) in den aktiven Captures
+
+    Metriken wurden bereits bei der Generierung gezählt - hier nur die Zuordnung
+    zum Turn bzw. zur Session, die das Ergebnis verwendet.
+
+    Args:
+        models: Usage pro Model (UsageCapture.models der Generierung)
+    """
+    capture = _current_capture.get()
+    if capture is None:
+        return
+    for model, usage in models.items():
+        capture.add(model, usage)
@@ -0,0 +1,22 @@
+"""
+TextRPG Testing Package
+Offline LLM Stand-ins für CI, Regression-Tests und Load-Tests
+"""
+
+from .fake_llm import (
+    FakeLLMConfig,
+    FakeLLMError,
+    ScriptedResponder,
+    FakeChatModel,
+    install_fake_agents
+)
+from .fake_redis import FakeRedis
+
+__all__ = [
+    "FakeLLMConfig",
+    "FakeLLMError",
+    "ScriptedResponder",
+    "FakeChatModel",
+    "install_fake_agents",
+    "FakeRedis"
+]
@@ -0,0 +1,452 @@
+"""
+TextRPG Fake LLM
+Deterministisches BaseChatModel für Offline-Tests ohne OpenRouter Key und Netzwerk
+
+Der ScriptedResponder erzeugt reproduzierbare Setup- und Gameplay-Antworten und wird
+sowohl vom FakeChatModel (in-process) als auch vom OpenRouter Stand-in Server genutzt.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Literal, Optional
+
+from pydantic import BaseModel, Field, PrivateAttr
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+# Error-Arten die injiziert werden können
+FakeErrorKind = Literal["rate_limit", "overloaded", "timeout"]
+
+_ERROR_STATUS_CODES: Dict[str, int] = {
+    "rate_limit": 429,
+    "overloaded": 503
+}
+
+_TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+class FakeLLMConfig(BaseModel):
+    """
+    Konfiguration für Fake LLM und Stand-in Server
+    """
+
+    ttft_seconds: float = Field(default=0.0, description="Time-to-first-token in Sekunden")
+    tokens_per_second: float = Field(
+        default=0.0,
+        description="Generierungsgeschwindigkeit (0 = ohne Verzögerung)"
+    )
+    response_words: int = Field(default=120, description="Ungefähre Wortanzahl für Gameplay-Antworten")
+    setup_complete_turns: List[int] = Field(
+        default_factory=lambda: [3],
+        description="User-Turns (1-basiert) an denen der Setup Agent [SETUP-COMPLETE] sendet"
+    )
+    responses: List[str] = Field(
+        default_factory=list,
+        description="Optionale feste Antworten, zyklisch pro User-Turn (überschreibt Templates)"
+    )
+
+    # Error Injection
+    error_turns: Dict[int, FakeErrorKind] = Field(
+        default_factory=dict,
+        description="Call-Index (1-basiert) -> injizierter Fehler"
+    )
+    error_rate: float = Field(default=0.0, description="Zufällige Fehlerrate (0.0 - 1.0)")
+    error_kinds: List[FakeErrorKind] = Field(
+        default_factory=lambda: ["rate_limit", "overloaded", "timeout"],
+        description="Fehlerarten für error_rate"
+    )
+    timeout_seconds: float = Field(
+        default=30.0,
+        description="Wartezeit bevor ein Timeout ausgelöst wird (blockiert auch den sync Pfad, 0 = sofort)"
+    )
+    retry_after: Optional[int] = Field(default=None, description="Retry-After für 429/503 Fehler")
+
+    seed: int = Field(default=42, description="Seed für deterministische Texte und Fehler")
+
+
+class FakeLLMError(Exception):
+    """Simulierter HTTP-Fehler des Providers (wird von classify_error über status_code erkannt)"""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[int] = None):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+# Textbausteine für deterministische Antworten
+_SETUP_QUESTIONS = [
+    "Willkommen! Ich erstelle für dich ein spannendes Adventure für dein TextRPG.\n\n"
+    "Möchtest du:\nA) Mir eigene Vorgaben geben (Setting, Atmosphäre, Charaktertyp, etc.)\n"
+    "B) Mich komplett frei eine literarische Geschichte entwickeln lassen\n\nWas bevorzugst du?",
+    "Welches Setting reizt dich? (Fantasy, Sci-Fi, Horror, Modern, Steampunk, etc.)",
+    "Welche Atmosphäre schwebt dir vor? (Düster & Melancholisch / Episch & Hoffnungsvoll / "
+    "Mysteriös & Rätselhaft / Grimmig & Realistisch)",
+    "Gibt es Themen oder Genres, die du definitiv vermeiden möchtest?"
+]
+
+_NARRATIVE_SENTENCES = [
+    "Der Nebel hängt schwer über den Dächern der alten Stadt.",
+    "Irgendwo schlägt eine Glocke, dumpf und zögernd.",
+    "Du spürst das Gewicht des Briefes in deiner Manteltasche.",
+    "Die Wirtin mustert dich mit einem Blick, der mehr weiß als er verrät.",
+    "Zwischen den Pflastersteinen sammelt sich Regenwasser, dunkel wie Tinte.",
+    "Ein Händler ruft seine Waren aus, doch seine Stimme klingt gehetzt.",
+    "Am Ende der Gasse flackert eine Laterne, als würde sie dir etwas sagen wollen.",
+    "Deine Hände erinnern sich an eine Arbeit, die dein Kopf vergessen hat.",
+    "Der Wind trägt den Geruch von Salz und verbranntem Holz heran.",
+    "Ein Kind drückt dir wortlos eine kleine Münze mit fremdem Wappen in die Hand.",
+    "Hinter dir fällt eine Tür ins Schloss, und plötzlich ist es sehr still.",
+    "Die Karte auf dem Tisch zeigt einen Weg, der auf keiner anderen Karte existiert.",
+    "Du erkennst die Handschrift auf dem Umschlag, obwohl das unmöglich sein sollte.",
+    "Ein alter Wächter nickt dir zu, als hätte er dich seit Jahren erwartet.",
+    "Das Feuer im Kamin wirft Schatten, die sich nicht ganz an die Regeln halten.",
+    "Über dem Hafen kreisen Möwen, laut und ungeduldig."
+]
+
+_OPTION_TEMPLATES = [
+    "Folge der Spur zum Hafen",
+    "Sprich die Wirtin direkt auf den Brief an",
+    "Warte im Schatten und beobachte die Gasse",
+    "Untersuche die fremde Münze genauer",
+    "Suche den alten Wächter auf",
+    "Verlasse die Stadt noch vor Einbruch der Nacht"
+]
+
+
+class ScriptedResponder:
+    """
+    Deterministischer Antwort-Generator für Fake LLM und Stand-in Server
+
+    Erkennt den Setup-Kontext am System-Prompt (enthält [SETUP-COMPLETE]) und zählt
+    User-Turns im Request. Fehler werden pro Call-Index injiziert.
+    """
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None):
+        self.config = config or FakeLLMConfig()
+        self._call_counter = itertools.count(1)
+
+    def next_call_index(self) -> int:
+        """Vergibt den nächsten (1-basierten) Call-Index"""
+        return next(self._call_counter)
+
+    def error_for_call(self, call_index: int) -> Optional[FakeErrorKind]:
+        """
+        Bestimmt ob für diesen Call ein Fehler injiziert wird
+
+        Args:
+            call_index: 1-basierter Call-Index
+
+        Returns:
+            Fehlerart oder None
+        """
+        if call_index in self.config.error_turns:
+            return self.config.error_turns[call_index]
+
+        if self.config.error_rate > 0 and self.config.error_kinds:
+            rng = random.Random(f"{self.config.seed}:error:{call_index}")
+            if rng.random() < self.config.error_rate:
+                return rng.choice(self.config.error_kinds)
+
+        return None
+
+    def raise_error(self, kind: FakeErrorKind) -> None:
+        """
+        Wirft die zur Fehlerart passende Exception
+
+        Die Wartezeit eines Timeouts simulieren die Aufrufer vorher: FakeChatModel
+        schläft timeout_seconds (sync per time.sleep, async per asyncio.sleep), der
+        Stand-in Server hält den Request so lange offen. Tests setzen timeout_seconds=0.
+        """
+        if kind == "timeout":
+            raise TimeoutError(f"Request timed out after {self.config.timeout_seconds}s")
+        raise FakeLLMError(
+            _ERROR_STATUS_CODES[kind],
+            "rate limited" if kind == "rate_limit" else "model overloaded",
+            retry_after=self.config.retry_after
+        )
+
+    def respond(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Erzeugt die Antwort für eine OpenAI-kompatible Message-Liste
+
+        Args:
+            messages: Liste von {"role": ..., "content": ...} dicts
+
+        Returns:
+            Antworttext
+        """
+        system_text = "\n".join(m["content"] for m in messages if m["role"] == "system")
+        user_messages = [m["content"] for m in messages if m["role"] == "user"]
+        user_turn = max(len(user_messages), 1)
+        last_user = user_messages[-1] if user_messages else ""
+
+        if self.config.responses:
+            return self.config.responses[(user_turn - 1) % len(self.config.responses)]
+
+        if "[SETUP-COMPLETE]" in system_text:
+            return self._setup_response(user_turn)
+
+        return self._gameplay_response(user_turn, last_user)
+
+    def _setup_response(self, user_turn: int) -> str:
+        """Setup-Frage oder Setup-Abschluss für den gegebenen Turn"""
+        if user_turn in self.config.setup_complete_turns:
+            setup_data = {
+                "setting": "agent_choice, literarisch und atmosphärisch, mit vollständig entwickeltem Charakter",
+                "difficulty": "Standard",
+                "creation_mode": "free"
+            }
+            return (
+                "Perfekt! Ich entwickle eine überraschende literarische Geschichte für dich.\n\n"
+                f"[SETUP-COMPLETE]\n{json.dumps(setup_data, ensure_ascii=False)}"
+            )
+
+        return _SETUP_QUESTIONS[(user_turn - 1) % len(_SETUP_QUESTIONS)]
+
+    def _gameplay_response(self, user_turn: int, last_user: str) -> str:
+        """Narrativer Absatz mit Handlungsoptionen A) - C)"""
+        rng = random.Random(f"{self.config.seed}:gameplay:{user_turn}:{last_user}")
+
+        sentences: List[str] = []
+        word_count = 0
+        pool = list(_NARRATIVE_SENTENCES)
+        while word_count < self.config.response_words:
+            if not pool:
+                pool = list(_NARRATIVE_SENTENCES)
+            sentence = pool.pop(rng.randrange(len(pool)))
+            sentences.append(sentence)
+            word_count += len(sentence.split())
+
+        paragraphs = [" ".join(sentences[i:i + 4]) for i in range(0, len(sentences), 4)]
+        options = rng.sample(_OPTION_TEMPLATES, 3)
+
+        return (
+            "\n\n".join(paragraphs)
+            + "\n\n--- ENTWICKLUNGSBASIERTE FOLGEOPTIONEN ---\n"
+            + "\n".join(f"{letter}) {option}" for letter, option in zip("ABC", options))
+            + "\n\nWie gehst du mit den Konsequenzen um?"
+        )
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Zerlegt Text in wort-artige Tokens (inkl. folgendem Whitespace)"""
+        return _TOKEN_PATTERN.findall(text)
+
+    @staticmethod
+    def count_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+        """Grobe Prompt-Token-Schätzung (~4 Zeichen pro Token)"""
+        return max(1, sum(len(m["content"]) for m in messages) // 4)
+
+    def token_delay(self) -> float:
+        """Verzögerung zwischen zwei Tokens in Sekunden"""
+        if self.config.tokens_per_second <= 0:
+            return 0.0
+        return 1.0 / self.config.tokens_per_second
+
+    def usage(self, messages: List[Dict[str, str]], completion_tokens: int) -> Dict[str, int]:
+        """OpenAI-kompatibler usage-Block"""
+        prompt_tokens = self.count_prompt_tokens(messages)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+
+def _to_role_dicts(messages: List[BaseMessage]) -> List[Dict[str, str]]:
+    """Konvertiert LangChain Messages in OpenAI-Rollen-Dicts"""
+    role_map = {"human": "user", "ai": "assistant", "system": "system"}
+    return [
+        {"role": role_map.get(msg.type, "user"), "content": str(msg.content)}
+        for msg in messages
+    ]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministisches BaseChatModel als Ersatz für ChatOpenAI
+
+    Unterstützt invoke/ainvoke und stream/astream mit konfigurierbarer TTFT,
+    Tokens/Sekunde und Error Injection.
+    """
+
+    config: FakeLLMConfig = Field(default_factory=FakeLLMConfig)
+    model_name: str = Field(default="fake/textrpg-stand-in")
+
+    _responder: ScriptedResponder = PrivateAttr()
+
+    def __init__(self, responder: Optional[ScriptedResponder] = None, **kwargs: Any):
+        if responder is not None:
+            kwargs.setdefault("config", responder.config)
+        super().__init__(**kwargs)
+        self._responder = responder or ScriptedResponder(self.config)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-openrouter"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name}
+
+    def _prepare(self, messages: List[BaseMessage], max_tokens: Optional[int] = None) -> tuple:
+        """Ermittelt Call-Index, Fehler, Antwort-Tokens und Usage für einen Call (max_tokens kürzt wie der Provider)"""
+        call_index = self._responder.next_call_index()
+        error = self._responder.error_for_call(call_index)
+        role_dicts = _to_role_dicts(messages)
+        text = self._responder.respond(role_dicts)
+        tokens = self._responder.tokenize(text)
+        if max_tokens is not None and len(tokens) > max_tokens:
+            tokens = tokens[:max_tokens]
+            text = "".join(tokens)
+        usage = self._responder.usage(role_dicts, len(tokens))
+        return error, text, tokens, usage
+
+    def _usage_metadata(self, usage: Dict[str, int]) -> Dict[str, int]:
+        return {
+            "input_tokens": usage["prompt_tokens"],
+            "output_tokens": usage["completion_tokens"],
+            "total_tokens": usage["total_tokens"]
+        }
+
+    def _response_metadata(self, usage: Dict[str, int]) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "finish_reason": "stop",
+            "token_usage": usage
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        error, text, tokens, usage = self._prepare(messages, kwargs.get("max_tokens"))
+        if error == "timeout":
+            time.sleep(self.config.timeout_seconds)
+        if error:
+            self._responder.raise_error(error)
+
+        time.sleep(self.config.ttft_seconds + len(tokens) * self._responder.token_delay())
+
+        message = AIMessage(
+            content=text,
+            usage_metadata=self._usage_metadata(usage),
+            response_metadata=self._response_metadata(usage)
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        error, text, tokens, usage = self._prepare(messages, kwargs.get("max_tokens"))
+        if error == "timeout":
+            await asyncio.sleep(self.config.timeout_seconds)
+        if error:
+            self._responder.raise_error(error)
+
+        await asyncio.sleep(self.config.ttft_seconds + len(tokens) * self._responder.token_delay())
+
+        message = AIMessage(
+            content=text,
+            usage_metadata=self._usage_metadata(usage),
+            response_metadata=self._response_metadata(usage)
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        error, text, tokens, usage = self._prepare(messages, kwargs.get("max_tokens"))
+        if error == "timeout":
+            time.sleep(self.config.timeout_seconds)
+        if error:
+            self._responder.raise_error(error)
+
+        time.sleep(self.config.ttft_seconds)
+        delay = self._responder.token_delay()
+
+        for token in tokens:
+            if delay:
+                time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            usage_metadata=self._usage_metadata(usage),
+            response_metadata=self._response_metadata(usage)
+        ))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        error, text, tokens, usage = self._prepare(messages, kwargs.get("max_tokens"))
+        if error == "timeout":
+            await asyncio.sleep(self.config.timeout_seconds)
+        if error:
+            self._responder.raise_error(error)
+
+        await asyncio.sleep(self.config.ttft_seconds)
+        delay = self._responder.token_delay()
+
+        for token in tokens:
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            usage_metadata=self._usage_metadata(usage),
+            response_metadata=self._response_metadata(usage)
+        ))
+
+
+def install_fake_agents(config: Optional[FakeLLMConfig] = None) -> ScriptedResponder:
+    """
+    Ersetzt die Agent-Singletons durch Agents mit FakeChatModel
+
+    Args:
+        config: Fake LLM Konfiguration (default: FakeLLMConfig())
+
+    Returns:
+        Der gemeinsam genutzte ScriptedResponder
+    """
+    from ..agents.setup_agent import SetupAgent
+    from ..agents.gameplay_agent import GameplayAgent
+    from ..config import settings
+    from ..graph import nodes_agents
+
+    responder = ScriptedResponder(config)
+    nodes_agents._setup_agent = SetupAgent(
+        FakeChatModel(responder=responder, model_name=settings.llm_creator)
+    )
+    nodes_agents._gameplay_agent = GameplayAgent(
+        FakeChatModel(responder=responder, model_name=settings.llm_gamemaster)
+    )
+    return responder
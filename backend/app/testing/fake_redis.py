@@ -0,0 +1,65 @@
+"""
+TextRPG Fake Redis
+In-Process Stand-in für die Redis-Befehle des RedisSessionStore
+
+Unterstützt get/set (NX, PX)/mset/delete mit Key-Ablauf und das
+Compare-and-Delete Script für Lock-Releases. Für lokale Entwicklung und Tests
+(session_redis_url=memory://) - geteilt nur innerhalb eines Prozesses.
+"""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class FakeRedis:
+    """Minimaler async Redis-Client (Subset von redis.asyncio.Redis)"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def _get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._get(key)
+
+    async def set(self, key: str, value: Any, nx: bool = False, px: Optional[int] = None) -> Optional[bool]:
+        if nx and self._get(key) is not None:
+            return None
+        expires_at = time.monotonic() + px / 1000 if px is not None else None
+        self._data[key] = (_encode(value), expires_at)
+        return True
+
+    async def mset(self, mapping: Dict[str, Any]) -> bool:
+        for key, value in mapping.items():
+            self._data[key] = (_encode(value), None)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+    async def eval(self, script: str, numkeys: int, *keys_and_args: Any) -> int:
+        from ..graph.session_store import RELEASE_LOCK_SCRIPT
+
+        if script != RELEASE_LOCK_SCRIPT:
+            raise NotImplementedError("FakeRedis only supports the lock release script")
+        key, token = keys_and_args[0], _encode(keys_and_args[1])
+        if self._get(key) == token:
+            return await self.delete(key)
+        return 0
+
+    async def aclose(self) -> None:
+        self._data.clear()
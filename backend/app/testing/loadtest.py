@@ -0,0 +1,466 @@
+"""
+TextRPG Load Test
+Asyncio Load-Generator für /chat/stream mit Latenz-Histogrammen
+
+Simuliert Spieler-Sessions durch Setup, Handoff und Gameplay und misst TTFB,
+Time-to-first-token, Inter-Chunk-Gaps, Turn-Latenz, Event-Loop-Lag und RSS.
+Die Ergebnisse werden als JSON geschrieben, damit Runs über Commits vergleichbar sind.
+
+In-Process Modus (Default, aus backend/): startet den OpenRouter Stand-in als
+Subprozess und die App via uvicorn im selben Event Loop - Loop-Lag und RSS
+gelten damit für den Server.
+    python -m app.testing.loadtest --sessions 50 --concurrency 10 --output run.json
+
+Gegen einen laufenden Server (Loop-Lag dann nur clientseitig, kein Server-RSS):
+    python -m app.testing.loadtest --target http://127.0.0.1:8000
+
+Vergleich zweier Runs:
+    python -m app.testing.loadtest --compare base.json run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+BACKEND_DIR = Path(__file__).parent.parent.parent
+
+# Spieler-Eingaben: Setup (Option B → Handoff am 3. Turn), danach Gameplay-Optionen
+SETUP_INPUTS = ["Hi", "B", "Keine Romance"]
+GAMEPLAY_INPUTS = ["A", "B", "C", "Ich schaue mich vorsichtig um.", "Ich folge der Spur."]
+
+# Histogramm-Buckets in Millisekunden
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """
+    Nearest-rank Perzentile für eine Liste von Millisekunden-Werten
+
+    Args:
+        values: Messwerte in ms
+
+    Returns:
+        Dict mit count, mean, p50, p90, p95, p99, max
+    """
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p90": None, "p95": None, "p99": None, "max": None}
+
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+        return round(ordered[index], 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": rank(50),
+        "p90": rank(90),
+        "p95": rank(95),
+        "p99": rank(99),
+        "max": round(ordered[-1], 3)
+    }
+
+
+def histogram(values: List[float]) -> Dict[str, int]:
+    """Bucketed Histogramm (obere Grenzen in ms, '+Inf' für den Rest)"""
+    counts = {f"le_{bucket}": 0 for bucket in HISTOGRAM_BUCKETS_MS}
+    counts["le_inf"] = 0
+    for value in values:
+        for bucket in HISTOGRAM_BUCKETS_MS:
+            if value <= bucket:
+                counts[f"le_{bucket}"] += 1
+                break
+        else:
+            counts["le_inf"] += 1
+    return counts
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Aktuelles RSS des Prozesses (Linux /proc, sonst Peak-RSS via resource)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class LoopLagProbe:
+    """Misst Event-Loop-Scheduling-Lag über periodische Sleeps"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples_ms: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples_ms.append(max(0.0, (loop.time() - start - self.interval) * 1000))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class LoadTestRecorder:
+    """Sammelt Messwerte aller Turns"""
+
+    def __init__(self):
+        self.ttfb_ms: List[float] = []
+        self.ttft_ms: List[float] = []
+        self.gap_ms: List[float] = []
+        self.turn_ms: Dict[str, List[float]] = {"setup": [], "handoff": [], "gameplay": []}
+        self.errors: Dict[str, int] = {}
+        self.turns = 0
+        self.sessions: List[Dict[str, Any]] = []
+
+    def record_error(self, error_type: str) -> None:
+        self.errors[error_type] = self.errors.get(error_type, 0) + 1
+
+
+async def run_turn(
+    client: httpx.AsyncClient,
+    recorder: LoadTestRecorder,
+    message: str,
+    session_id: Optional[str],
+    phase: str
+) -> Dict[str, Any]:
+    """
+    Führt einen Turn über /chat/stream aus und misst die SSE-Zeitpunkte
+
+    Returns:
+        Dict mit session_id, agent und error (falls aufgetreten)
+    """
+    params = {"message": message}
+    if session_id:
+        params["session_id"] = session_id
+
+    start = time.perf_counter()
+    first_event = None
+    first_chunk = None
+    last_chunk = None
+    result: Dict[str, Any] = {"session_id": session_id, "agent": None, "error": None}
+
+    try:
+        async with client.stream("GET", "/chat/stream", params=params) as response:
+            if response.status_code != 200:
+                result["error"] = f"http_{response.status_code}"
+                recorder.record_error(result["error"])
+                return result
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                now = time.perf_counter()
+                if first_event is None:
+                    first_event = now
+                    recorder.ttfb_ms.append((now - start) * 1000)
+
+                data = line[6:]
+                if data == "[DONE]":
+                    break
+
+                event = json.loads(data)
+                event_type = event.get("type")
+                if event_type == "session_info":
+                    result["session_id"] = event.get("session_id")
+                elif event_type == "ai_chunk":
+                    if first_chunk is None:
+                        first_chunk = now
+                        recorder.ttft_ms.append((now - start) * 1000)
+                    elif last_chunk is not None:
+                        recorder.gap_ms.append((now - last_chunk) * 1000)
+                    last_chunk = now
+                elif event_type == "completion":
+                    result["agent"] = event.get("agent")
+                elif event_type == "error":
+                    result["error"] = event.get("error_type", "unknown")
+                    recorder.record_error(result["error"])
+
+    except (httpx.HTTPError, json.JSONDecodeError) as e:
+        result["error"] = type(e).__name__
+        recorder.record_error(result["error"])
+        return result
+
+    recorder.turn_ms[phase].append((time.perf_counter() - start) * 1000)
+    recorder.turns += 1
+    return result
+
+
+async def run_player_session(
+    client: httpx.AsyncClient,
+    recorder: LoadTestRecorder,
+    index: int,
+    gameplay_turns: int,
+    think_time: float,
+    seed: int
+) -> None:
+    """Ein simulierter Spieler: Setup-Dialog, Handoff, dann Gameplay-Turns"""
+    rng = random.Random(f"{seed}:{index}")
+    session_id: Optional[str] = None
+    session_start = time.perf_counter()
+    errors = 0
+    agent = None
+
+    inputs = [(msg, "setup") for msg in SETUP_INPUTS[:-1]]
+    inputs.append((SETUP_INPUTS[-1], "handoff"))
+    inputs += [(rng.choice(GAMEPLAY_INPUTS), "gameplay") for _ in range(gameplay_turns)]
+
+    for message, phase in inputs:
+        result = await run_turn(client, recorder, message, session_id, phase)
+        session_id = result["session_id"] or session_id
+        agent = result["agent"] or agent
+        if result["error"]:
+            errors += 1
+        if think_time:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * think_time)
+
+    recorder.sessions.append({
+        "index": index,
+        "session_id": session_id,
+        "final_agent": agent,
+        "errors": errors,
+        "duration_ms": round((time.perf_counter() - session_start) * 1000, 3)
+    })
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_http(url: str, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Server unter {url} nicht erreichbar")
+                await asyncio.sleep(0.1)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Führt den Load Test aus
+
+    Returns:
+        JSON-serialisierbares Ergebnis-Dict
+    """
+    stub_process = None
+    server = None
+    server_task = None
+    target = args.target
+
+    if not target:
+        # Stand-in als Subprozess, App im selben Event Loop
+        stub_port = _free_port()
+        stub_process = subprocess.Popen(
+            [
+                sys.executable, "-m", "app.testing.openrouter_stub",
+                "--port", str(stub_port),
+                "--ttft", str(args.ttft),
+                "--tps", str(args.tps),
+                "--words", str(args.words),
+                "--error-rate", str(args.error_rate)
+            ],
+            cwd=BACKEND_DIR
+        )
+        await _wait_for_http(f"http://127.0.0.1:{stub_port}/api/v1/models")
+
+        os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{stub_port}/api/v1"
+        os.environ.setdefault("OPENROUTER_API_KEY", "loadtest-key")
+
+        import uvicorn
+        from app.main import app
+
+        app_port = _free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=app_port, log_level="warning"))
+        server_task = asyncio.create_task(server.serve())
+        target = f"http://127.0.0.1:{app_port}"
+        await _wait_for_http(f"{target}/")
+
+    recorder = LoadTestRecorder()
+    probe = LoopLagProbe()
+    rss_start = current_rss_bytes() if not args.target else None
+    rss_peak = rss_start
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def player(index: int) -> None:
+        nonlocal rss_peak
+        async with semaphore:
+            await run_player_session(client, recorder, index, args.gameplay_turns, args.think_time, args.seed)
+        if rss_start is not None:
+            rss_peak = max(rss_peak, current_rss_bytes() or 0)
+
+    started = time.perf_counter()
+    probe.start()
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=target, timeout=args.request_timeout, limits=limits) as client:
+            await asyncio.gather(*(player(i) for i in range(args.sessions)))
+    finally:
+        await probe.stop()
+        if server is not None:
+            server.should_exit = True
+            await server_task
+        if stub_process is not None:
+            stub_process.terminate()
+            stub_process.wait(timeout=10)
+
+    duration = time.perf_counter() - started
+    rss_end = current_rss_bytes() if not args.target else None
+    all_turns = [value for values in recorder.turn_ms.values() for value in values]
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "mode": "external" if args.target else "in_process",
+            "target": target,
+            "config": {
+                "sessions": args.sessions,
+                "concurrency": args.concurrency,
+                "gameplay_turns": args.gameplay_turns,
+                "think_time": args.think_time,
+                "ttft": args.ttft,
+                "tps": args.tps,
+                "words": args.words,
+                "error_rate": args.error_rate,
+                "seed": args.seed
+            }
+        },
+        "summary": {
+            "sessions": len(recorder.sessions),
+            "turns": recorder.turns,
+            "errors": recorder.errors,
+            "duration_s": round(duration, 3),
+            "turns_per_second": round(recorder.turns / duration, 3) if duration else None,
+            "sessions_reached_gameplay": sum(1 for s in recorder.sessions if s["final_agent"] == "gameplay_agent")
+        },
+        "latency_ms": {
+            "ttfb": percentiles(recorder.ttfb_ms),
+            "ttft": percentiles(recorder.ttft_ms),
+            "inter_chunk_gap": percentiles(recorder.gap_ms),
+            "turn": percentiles(all_turns),
+            "turn_by_phase": {phase: percentiles(values) for phase, values in recorder.turn_ms.items()}
+        },
+        "histograms_ms": {
+            "ttft": histogram(recorder.ttft_ms),
+            "turn": histogram(all_turns)
+        },
+        "event_loop_lag_ms": {
+            "scope": "client" if args.target else "server",
+            **percentiles(probe.samples_ms)
+        },
+        "rss": {
+            "start_mb": round(rss_start / 2**20, 3) if rss_start else None,
+            "peak_mb": round(rss_peak / 2**20, 3) if rss_peak else None,
+            "end_mb": round(rss_end / 2**20, 3) if rss_end else None,
+            "per_session_kb": (
+                round((rss_end - rss_start) / 1024 / max(len(recorder.sessions), 1), 3)
+                if rss_start and rss_end else None
+            )
+        },
+        "sessions": recorder.sessions if args.include_sessions else None
+    }
+
+
+def compare_runs(base_path: str, new_path: str) -> None:
+    """Gibt p50/p95-Deltas zweier Ergebnis-Dateien aus"""
+    base = json.loads(Path(base_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+
+    print(f"Compare {base['meta'].get('commit')} → {new['meta'].get('commit')}")
+    for metric in ["ttfb", "ttft", "inter_chunk_gap", "turn"]:
+        for stat in ["p50", "p95", "p99"]:
+            old_value = base["latency_ms"][metric][stat]
+            new_value = new["latency_ms"][metric][stat]
+            if old_value is None or new_value is None:
+                continue
+            delta = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            print(f"  {metric:16s} {stat}: {old_value:10.2f} → {new_value:10.2f} ms ({delta:+.1f}%)")
+
+    for key in ["p95", "max"]:
+        print(f"  loop_lag         {key}: {base['event_loop_lag_ms'][key]} → {new['event_loop_lag_ms'][key]} ms")
+    print(f"  turns/s: {base['summary']['turns_per_second']} → {new['summary']['turns_per_second']}")
+
+
+def main() -> None:
+    """CLI Entry Point"""
+    parser = argparse.ArgumentParser(description="TextRPG /chat/stream Load Test")
+    parser.add_argument("--target", default=None, help="Base URL eines laufenden Servers (sonst In-Process)")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--gameplay-turns", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mittlere Pause zwischen Turns (s)")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Stand-in TTFT (s)")
+    parser.add_argument("--tps", type=float, default=200.0, help="Stand-in Tokens/s")
+    parser.add_argument("--words", type=int, default=120, help="Stand-in Wörter pro Gameplay-Antwort")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stand-in Fehlerrate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--include-sessions", action="store_true", help="Per-Session Details ins JSON")
+    parser.add_argument("--output", default=None, help="JSON-Datei (sonst stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Zwei Ergebnis-Dateien vergleichen")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_runs(*args.compare)
+        return
+
+    results = asyncio.run(run_load_test(args))
+    output = json.dumps(results, indent=2)
+
+    if args.output:
+        Path(args.output).write_text(output)
+        summary = results["summary"]
+        latency = results["latency_ms"]
+        print(
+            f"✅ {summary['turns']} turns in {summary['duration_s']}s "
+            f"({summary['turns_per_second']} turns/s) - "
+            f"turn p95={latency['turn']['p95']}ms, ttft p95={latency['ttft']['p95']}ms, "
+            f"loop lag max={results['event_loop_lag_ms']['max']}ms → {args.output}"
+        )
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
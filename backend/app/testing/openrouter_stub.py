@@ -0,0 +1,167 @@
+"""
+TextRPG OpenRouter Stand-in Server
+Lokaler OpenAI-kompatibler HTTP-Server mit gescripteten Antworten
+
+Start (aus backend/):
+    python -m app.testing.openrouter_stub --port 8100 --ttft 0.4 --tps 40
+
+Danach OPENROUTER_BASE_URL=http://127.0.0.1:8100/api/v1 setzen.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncGenerator, Dict, List
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .fake_llm import FakeLLMConfig, ScriptedResponder, _ERROR_STATUS_CODES
+
+
+def _normalize_messages(raw_messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Reduziert OpenAI Messages (auch Multi-Part Content) auf role/content Strings"""
+    messages = []
+    for msg in raw_messages:
+        content = msg.get("content") or ""
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        messages.append({"role": msg.get("role", "user"), "content": content})
+    return messages
+
+
+def create_stub_app(config: FakeLLMConfig = None) -> FastAPI:
+    """
+    Erstellt die Stand-in FastAPI App
+
+    Args:
+        config: Fake LLM Konfiguration (TTFT, Tokens/s, Error Injection)
+
+    Returns:
+        FastAPI App mit /api/v1/chat/completions und /api/v1/models
+    """
+    responder = ScriptedResponder(config)
+    router = APIRouter(prefix="/api/v1")
+
+    def error_response(kind: str) -> JSONResponse:
+        status_code = _ERROR_STATUS_CODES[kind]
+        headers = {}
+        if responder.config.retry_after is not None:
+            headers["Retry-After"] = str(responder.config.retry_after)
+        return JSONResponse(
+            status_code=status_code,
+            content={"error": {"code": status_code, "message": f"Injected {kind} error"}},
+            headers=headers
+        )
+
+    @router.get("/models")
+    async def list_models():
+        return {"data": [{"id": "fake/textrpg-stand-in", "object": "model"}]}
+
+    @router.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake/textrpg-stand-in")
+        messages = _normalize_messages(body.get("messages", []))
+
+        call_index = responder.next_call_index()
+        error = responder.error_for_call(call_index)
+        if error == "timeout":
+            # Hängt bis der Client-Timeout greift
+            await asyncio.sleep(responder.config.timeout_seconds)
+            return JSONResponse(status_code=504, content={"error": {"code": 504, "message": "Injected timeout"}})
+        if error:
+            return error_response(error)
+
+        text = responder.respond(messages)
+        tokens = responder.tokenize(text)
+        usage = responder.usage(messages, len(tokens))
+        completion_id = f"gen-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(responder.config.ttft_seconds + len(tokens) * responder.token_delay())
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        async def event_stream() -> AsyncGenerator[str, None]:
+            def frame(choices: List[Dict[str, Any]], **extra: Any) -> str:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": choices,
+                    **extra
+                }
+                return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+            await asyncio.sleep(responder.config.ttft_seconds)
+            yield frame([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+
+            delay = responder.token_delay()
+            for token in tokens:
+                if delay:
+                    await asyncio.sleep(delay)
+                yield frame([{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+
+            yield frame([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if include_usage:
+                yield frame([], usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    app = FastAPI(title="TextRPG OpenRouter Stand-in")
+    app.include_router(router)
+    app.state.responder = responder
+    return app
+
+
+def main() -> None:
+    """CLI Entry Point"""
+    parser = argparse.ArgumentParser(description="OpenAI-kompatibler OpenRouter Stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft", type=float, default=0.0, help="Time-to-first-token in Sekunden")
+    parser.add_argument("--tps", type=float, default=0.0, help="Tokens pro Sekunde (0 = sofort)")
+    parser.add_argument("--words", type=int, default=120, help="Wörter pro Gameplay-Antwort")
+    parser.add_argument("--setup-complete-turns", default="3",
+                        help="Kommagetrennte User-Turns mit [SETUP-COMPLETE]")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-kinds", default="rate_limit,overloaded,timeout")
+    parser.add_argument("--timeout-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        ttft_seconds=args.ttft,
+        tokens_per_second=args.tps,
+        response_words=args.words,
+        setup_complete_turns=[int(t) for t in args.setup_complete_turns.split(",") if t.strip()],
+        error_rate=args.error_rate,
+        error_kinds=[k.strip() for k in args.error_kinds.split(",") if k.strip()],
+        timeout_seconds=args.timeout_seconds,
+        seed=args.seed
+    )
+
+    import uvicorn
+    uvicorn.run(create_stub_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+TextRPG Allocation Benchmark
+Misst Allokationen pro Turn über lange Sessions (tracemalloc)
+
+Eine Session spielt Setup → Handoff → Gameplay über --turns Turns (Fake LLM,
+kurze Antworten). Pro Turn werden die transienten Allokationen (Peak während
+des Turns über dem Stand davor), die bleibenden Allokationen und die CPU-Zeit
+des Loop-Threads gemessen (Wall-Time wird von den SSE-Pausen dominiert).
+Kopiert der Graph die Historie pro Node, wachsen Peak und CPU mit der
+Session-Länge (quadratische Gesamtarbeit); mit Append-only Channel bleiben sie
+flach. --history füllt die Session nach dem Handoff mit zusätzlichen Messages
+vor, um den Effekt sehr langer Sessions sichtbar zu machen.
+
+    python bench_allocations.py --turns 500
+    python bench_allocations.py --turns 100 --history 20000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+backend_path = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+os.environ.setdefault("OPENROUTER_API_KEY", "offline-test-key")
+
+from backend.app.logging_config import configure_logging
+from backend.app.testing import FakeLLMConfig, install_fake_agents
+
+
+async def run_session(turns: int, history: int):
+    from backend.app.graph import get_session_manager
+    from backend.app.models import MessageRecord
+
+    session_manager = await get_session_manager()
+    session_id = session_manager.create_session()
+
+    # Setup + Handoff (nicht gemessen)
+    for message in ["Hi", "B", "Keine Romance"]:
+        async for _ in session_manager.stream_process_message(session_id, message):
+            pass
+
+    state = session_manager.get_session(session_id)
+    for index in range(history):
+        message_type = "human" if index % 2 == 0 else "ai"
+        state.messages.append(MessageRecord.create(message_type, f"Vorherige Runde {index}"))
+
+    results = []
+    for _ in range(turns):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        cpu_start = time.thread_time()
+        async for _ in session_manager.stream_process_message(session_id, "Ich gehe weiter."):
+            pass
+        cpu = time.thread_time() - cpu_start
+        current, peak = tracemalloc.get_traced_memory()
+        results.append((peak - baseline, current - baseline, cpu))
+
+    return results, len(state.messages)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TextRPG Allocation Benchmark")
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--history", type=int, default=0, help="Zusätzliche Messages nach dem Handoff")
+    parser.add_argument("--window", type=int, default=50, help="Turns pro Mittelwert-Fenster")
+    args = parser.parse_args()
+
+    configure_logging(log_level="CRITICAL", async_writer=False)
+    install_fake_agents(FakeLLMConfig(response_words=3, setup_complete_turns=[3]))
+
+    tracemalloc.start()
+    results, message_count = asyncio.run(run_session(args.turns, args.history))
+    tracemalloc.stop()
+
+    print(f"🧪 Allocation Benchmark: {args.turns} Turns, {message_count} Messages am Ende\n")
+    print(f"{'Turns':<14}{'Peak/Turn':>12}{'Retained/Turn':>16}{'CPU/Turn':>12}")
+    for start in range(0, args.turns, args.window):
+        window = results[start:start + args.window]
+        print(f"{start + 1:>5}-{start + len(window):<8}"
+              f"{statistics.mean(r[0] for r in window) / 1024:>10.1f}KB"
+              f"{statistics.mean(r[1] for r in window) / 1024:>14.1f}KB"
+              f"{statistics.median(r[2] for r in window) * 1000:>10.1f}ms")
+
+    first, last = results[args.window:2 * args.window], results[-args.window:]
+    growth = statistics.mean(r[0] for r in last) - statistics.mean(r[0] for r in first)
+    print(f"\nPeak-Wachstum pro Turn zwischen zweitem und letztem Fenster: {growth / 1024:+.1f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+TextRPG Cold History Benchmark
+Misst den Speicher idle Sessions vor und nach der Kompression sowie die Zugriffskosten
+
+Sessions werden mit variierender Narrative (Wörter aus einem festen Vokabular,
+deterministisch gewürfelt) und AI-Metadata wie im Betrieb aufgebaut. Gemessen
+werden die residenten Bytes pro Session (tracemalloc, inkl. Content), die Zeit
+zum Einfrieren und zum Auftauen beim ersten Zugriff.
+
+    python bench_cold_history.py --sessions 50 --turns 100
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+backend_path = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+os.environ.setdefault("OPENROUTER_API_KEY", "offline-test-key")
+
+from backend.app.logging_config import configure_logging
+
+VOCABULARY = (
+    "der die das Nebel Tal Ruinen Festung Wächter Schwert Fackel Schatten Wind Stein Pfad Tür "
+    "Halle Drache Händler Taverne Karte Zauber Ritter Wald Fluss Brücke Turm Licht Stimme Blut "
+    "langsam leise dunkel alt kalt plötzlich vorsichtig zögernd siehst hörst spürst öffnet schließt "
+    "flüstert ruft kämpft flieht wartet und aber doch noch nicht mehr über unter hinter neben vor"
+).split()
+
+
+def _narrative(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words)) + "."
+
+
+async def build_sessions(count: int, turns: int, words: int):
+    from backend.app.graph import get_session_manager
+    from backend.app.models import MessageRecord
+
+    rng = random.Random(42)
+    session_manager = await get_session_manager()
+    session_ids = []
+    for _ in range(count):
+        session_id = session_manager.create_session()
+        state = session_manager.active_sessions[session_id]
+        for turn in range(turns):
+            state.messages.append(MessageRecord.create("human", _narrative(rng, 8)))
+            state.messages.append(MessageRecord.create("ai", _narrative(rng, words), {
+                "agent": "gameplay_agent",
+                "model": "google/gemini-2.5-pro-preview",
+                "usage": {"prompt_tokens": 1800 + turn, "completion_tokens": 350, "total_tokens": 2150 + turn}
+            }))
+        session_manager.update_session(session_id, state)
+        session_ids.append(session_id)
+    return session_manager, session_ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TextRPG Cold History Benchmark")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--words", type=int, default=300, help="Wörter pro Narrative-Antwort")
+    parser.add_argument("--codec", choices=["zstd", "zlib", "none"], default=None)
+    args = parser.parse_args()
+
+    configure_logging(log_level="CRITICAL", async_writer=False)
+
+    # Imports und Singletons vor der Messung anlegen
+    from backend.app.graph import get_session_manager
+    asyncio.run(get_session_manager())
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    session_manager, session_ids = asyncio.run(build_sessions(args.sessions, args.turns, args.words))
+    gc.collect()
+    hot = tracemalloc.get_traced_memory()[0] - baseline
+
+    compactor = session_manager.compactor
+    compactor.idle_seconds = 0.0
+    if args.codec:
+        compactor.codec = args.codec
+
+    start = time.perf_counter()
+    session_manager.compact_idle_sessions()
+    freeze_time = time.perf_counter() - start
+    gc.collect()
+    cold = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    stats = session_manager.get_cold_history_stats()
+
+    thaw_times = []
+    for session_id in session_ids:
+        start = time.perf_counter()
+        session_manager.get_session(session_id)
+        thaw_times.append(time.perf_counter() - start)
+    thaw_times.sort()
+
+    print(f"🧪 Cold History: {args.sessions} idle Sessions × {args.turns} Turns "
+          f"({args.words} Wörter pro Antwort, Codec {compactor.codec or 'default'})\n")
+    print(f"Resident pro Session   heiß {hot / args.sessions / 1024:>9.1f} KiB")
+    print(f"                      kalt {cold / args.sessions / 1024:>9.1f} KiB  (Faktor {hot / cold:.1f}x)")
+    print(f"Kompressionsrate            {stats['compression_ratio']:>9.2f}x  (msgpack → komprimiert)")
+    print(f"Einfrieren pro Session      {freeze_time / args.sessions * 1000:>9.2f} ms")
+    print(f"Erster Zugriff (Auftauen)   {thaw_times[len(thaw_times) // 2] * 1000:>9.2f} ms p50, "
+          f"{thaw_times[int(len(thaw_times) * 0.95)] * 1000:.2f} ms p95")
+
+
+if __name__ == "__main__":
+    main()
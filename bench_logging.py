@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+TextRPG Logging Benchmark
+Misst den Logging-Overhead pro Turn für die verschiedenen Logging-Modi
+
+Pro Modus laufen dieselben Offline-Turns (Fake LLM, ohne Latenz) durch den
+SessionManager (jeder Modus in eigenem Prozess, da structlog Logger beim
+ersten Aufruf cached). Gemessen werden CPU-Zeit des Event-Loop-Threads pro Turn und
+die Zeit, die der Loop-Thread in stdout-Writes blockiert (langsamer Sink
+simuliert ein volles Pipe / langsames Log-Shipping).
+
+    python bench_logging.py --turns 40 --sink-delay-ms 2
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+backend_path = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+os.environ.setdefault("OPENROUTER_API_KEY", "offline-test-key")
+
+from backend.app.logging_config import configure_logging, shutdown_logging
+from backend.app.testing import FakeLLMConfig, install_fake_agents
+
+
+class SlowSink(io.TextIOBase):
+    """Sink mit fester Latenz pro write(); zählt Zeit, die der Loop-Thread darin verbringt"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.loop_thread = threading.get_ident()
+        self.loop_blocked = 0.0
+        self.lines = 0
+
+    def write(self, text: str) -> int:
+        start = time.perf_counter()
+        if self.delay:
+            time.sleep(self.delay)
+        self.lines += text.count("\n")
+        if threading.get_ident() == self.loop_thread:
+            self.loop_blocked += time.perf_counter() - start
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+MODES = {
+    "disabled": {"log_level": "CRITICAL", "log_format": "console", "async_writer": False},
+    "console-sync": {"log_level": "INFO", "log_format": "console", "async_writer": False},
+    "json-sync": {"log_level": "INFO", "log_format": "json", "async_writer": False},
+    "json-async (production)": {"log_level": "INFO", "log_format": "json", "async_writer": True},
+    "json-async DEBUG": {"log_level": "DEBUG", "log_format": "json", "async_writer": True},
+}
+
+
+async def _run_turns(turns: int) -> None:
+    from backend.app.graph import get_session_manager
+
+    session_manager = await get_session_manager()
+
+    inputs = ["Hi", "B", "Keine Romance"]
+    session_id = session_manager.create_session()
+    for turn in range(turns):
+        if turn and turn % 12 == 0:
+            session_id = session_manager.create_session()
+        message = inputs[turn % 12] if turn % 12 < len(inputs) else "A"
+        async for _ in session_manager.stream_process_message(session_id, message):
+            pass
+
+
+def bench_mode(name: str, options: dict, turns: int, sink_delay: float) -> dict:
+    sink = SlowSink(0.0)
+    configure_logging(stream=sink, **options)
+    install_fake_agents(FakeLLMConfig(response_words=120, setup_complete_turns=[3]))
+
+    # Warm-up: Imports, Prompt-Loading, Graph-Compile
+    asyncio.run(_run_turns(1))
+    sink.delay, sink.loop_blocked, sink.lines = sink_delay, 0.0, 0
+
+    cpu_start = time.thread_time()
+    wall_start = time.perf_counter()
+    asyncio.run(_run_turns(turns))
+    cpu = time.thread_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    shutdown_logging()
+    return {
+        "mode": name,
+        "cpu_ms_per_turn": cpu * 1000 / turns,
+        "loop_blocked_ms_per_turn": sink.loop_blocked * 1000 / turns,
+        "wall_ms_per_turn": wall * 1000 / turns,
+        "lines_per_turn": sink.lines / turns,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TextRPG Logging Benchmark")
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--sink-delay-ms", type=float, default=2.0, help="Latenz pro stdout write()")
+    parser.add_argument("--mode", choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        result = bench_mode(args.mode, MODES[args.mode], args.turns, args.sink_delay_ms / 1000)
+        sys.__stdout__.write(json.dumps(result) + "\n")
+        return
+
+    print(f"🧪 Logging Benchmark: {args.turns} Turns pro Modus, Sink-Latenz {args.sink_delay_ms}ms\n")
+    results = []
+    for name in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", name,
+             "--turns", str(args.turns), "--sink-delay-ms", str(args.sink_delay_ms)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    baseline = results[0]["cpu_ms_per_turn"]
+
+    print(f"{'Modus':<26}{'CPU/Turn':>11}{'Overhead':>11}{'Loop blockiert':>16}{'Zeilen/Turn':>13}")
+    for result in results:
+        print(f"{result['mode']:<26}"
+              f"{result['cpu_ms_per_turn']:>9.2f}ms"
+              f"{result['cpu_ms_per_turn'] - baseline:>9.2f}ms"
+              f"{result['loop_blocked_ms_per_turn']:>14.2f}ms"
+              f"{result['lines_per_turn']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
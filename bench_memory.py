@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+TextRPG Message Memory Benchmark
+Misst Speicher pro Message und pro 100-Turn-Session: ChatMessage (Pydantic) vs. MessageRecord
+
+Content-Strings werden vorab erzeugt und für beide Varianten geteilt - gemessen
+wird also der Overhead der Darstellung (IDs, Timestamps, Metadata, Objekte).
+AI Messages tragen wie im Betrieb agent/model/usage Metadata.
+
+    python bench_memory.py --turns 100
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+
+backend_path = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+os.environ.setdefault("OPENROUTER_API_KEY", "offline-test-key")
+
+from backend.app.models import MessageRecord, create_ai_message, create_human_message
+
+
+def _contents(turns: int, ai_chars: int):
+    narrative = ("Der Nebel lichtet sich über dem Tal, und du siehst die Ruinen der alten Festung. " * 40)[:ai_chars]
+    return [(f"Ich gehe weiter Richtung Norden ({turn}).", f"{narrative} [{turn}]") for turn in range(turns)]
+
+
+def _ai_metadata(turn: int) -> dict:
+    return {
+        "agent": "gameplay_agent",
+        "model": "google/gemini-2.5-pro-preview",
+        "usage": {
+            "prompt_tokens": 1800 + turn, "completion_tokens": 350, "cached_tokens": 0,
+            "total_tokens": 2150 + turn, "cost_usd": 0.0057, "calls": 1
+        }
+    }
+
+
+def build_chat_messages(contents):
+    messages = []
+    for turn, (human, ai) in enumerate(contents):
+        messages.append(create_human_message(human))
+        messages.append(create_ai_message(ai, _ai_metadata(turn)))
+    return messages
+
+
+def build_records(contents):
+    messages = []
+    for turn, (human, ai) in enumerate(contents):
+        messages.append(MessageRecord.create("human", human))
+        messages.append(MessageRecord.create("ai", ai, _ai_metadata(turn)))
+    return messages
+
+
+def measure(builder, contents) -> int:
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    messages = builder(contents)
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del messages
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TextRPG Message Memory Benchmark")
+    parser.add_argument("--turns", type=int, default=100, help="Turns pro Session (2 Messages pro Turn)")
+    parser.add_argument("--ai-chars", type=int, default=2000, help="Länge einer Narrative-Antwort")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions für den Mittelwert")
+    args = parser.parse_args()
+
+    contents = [_contents(args.turns, args.ai_chars) for _ in range(args.sessions)]
+    content_bytes = sum(sys.getsizeof(human) + sys.getsizeof(ai) for human, ai in contents[0])
+    messages_per_session = args.turns * 2
+
+    # Warm-up (Pydantic Validatoren, uuid, Interning)
+    build_chat_messages(contents[0][:2])
+    build_records(contents[0][:2])
+
+    print(f"🧪 Message Memory: {args.sessions} Sessions × {args.turns} Turns "
+          f"({messages_per_session} Messages, Content {content_bytes / 1024:.0f} KiB pro Session)\n")
+    print(f"{'Darstellung':<26}{'Bytes/Message':>15}{'KiB/Session':>14}{'inkl. Content':>16}")
+
+    results = {}
+    for name, builder in (("ChatMessage (Pydantic)", build_chat_messages), ("MessageRecord (slots)", build_records)):
+        total = sum(measure(builder, session_contents) for session_contents in contents) / args.sessions
+        results[name] = total
+        print(f"{name:<26}{total / messages_per_session:>15.0f}{total / 1024:>14.1f}"
+              f"{(total + content_bytes) / 1024:>16.1f}")
+
+    before, after = results.values()
+    print(f"\nOverhead-Reduktion: {(1 - after / before) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+TextRPG Snapshot Benchmark
+Misst Snapshot- und Restore-Zeit sowie Größe für 10-, 100- und 1000-Turn-Sessions
+
+Verglichen werden JSON (State-Felder + ChatMessage-Dicts wie in der API) als
+Baseline und das binäre Snapshot-Format mit den Codecs none, zlib und zstd.
+AI Messages tragen wie im Betrieb agent/model/usage Metadata.
+
+    python bench_snapshots.py --turns 10 100 1000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+backend_path = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+os.environ.setdefault("OPENROUTER_API_KEY", "offline-test-key")
+
+from backend.app.models import ChatMessage, ChatState, MessageRecord, decode_snapshot, encode_snapshot
+from backend.app.models.snapshot import zstandard
+
+
+def build_state(turns: int, ai_chars: int) -> ChatState:
+    narrative = ("Der Nebel lichtet sich über dem Tal, und du siehst die Ruinen der alten Festung. " * 40)[:ai_chars]
+    state = ChatState(session_id="bench", story_phase="gameplay", current_agent="gameplay_agent",
+                      handoff_data={"genre": "Fantasy", "tone": "düster", "content_restrictions": ["Keine Romance"]})
+    for turn in range(turns):
+        state.messages.append(MessageRecord.create("human", f"Ich gehe weiter Richtung Norden ({turn})."))
+        state.messages.append(MessageRecord.create("ai", f"{narrative} [{turn}]", {
+            "agent": "gameplay_agent",
+            "model": "google/gemini-2.5-pro-preview",
+            "usage": {"prompt_tokens": 1800 + turn, "completion_tokens": 350, "total_tokens": 2150 + turn}
+        }))
+    state.interaction_count = turns
+    return state
+
+
+def json_dump(state: ChatState) -> bytes:
+    payload = state.model_dump(mode="json", exclude={"messages"})
+    payload["messages"] = [message.to_chat_message().model_dump(mode="json") for message in state.messages]
+    return json.dumps(payload, ensure_ascii=False).encode()
+
+
+def json_load(data: bytes) -> ChatState:
+    payload = json.loads(data)
+    payload["messages"] = [MessageRecord.from_chat_message(ChatMessage(**message)) for message in payload["messages"]]
+    return ChatState(**payload)
+
+
+def _time(func, repeat: int):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TextRPG Snapshot Benchmark")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--ai-chars", type=int, default=2000, help="Länge einer Narrative-Antwort")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    codecs = ["none", "zlib"] + (["zstd"] if zstandard is not None else [])
+
+    print("🧪 Snapshot Benchmark (Median über", args.repeat, "Läufe)\n")
+    print(f"{'Turns':>6}  {'Format':<14}{'Größe':>12}{'Snapshot':>12}{'Restore':>12}")
+    for turns in args.turns:
+        state = build_state(turns, args.ai_chars)
+
+        encode_time, data = _time(lambda: json_dump(state), args.repeat)
+        decode_time, _ = _time(lambda: json_load(data), args.repeat)
+        print(f"{turns:>6}  {'JSON':<14}{len(data) / 1024:>10.1f}KB"
+              f"{encode_time * 1000:>10.2f}ms{decode_time * 1000:>10.2f}ms")
+
+        for codec in codecs:
+            encode_time, data = _time(lambda: encode_snapshot(state, codec), args.repeat)
+            decode_time, restored = _time(lambda: decode_snapshot(data), args.repeat)
+            assert len(restored.messages) == len(state.messages)
+            print(f"{'':>6}  {'msgpack+' + codec:<14}{len(data) / 1024:>10.1f}KB"
+                  f"{encode_time * 1000:>10.2f}ms{decode_time * 1000:>10.2f}ms")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+TextRPG Tracing Benchmark
+Misst den Tracing-Overhead pro Turn: Tracing aus, an + Session nicht gesampelt, an + gesampelt
+
+Jeder Modus läuft in eigenem Prozess (Settings und LangChain lesen die
+Tracing-Konfiguration beim Import). LangSmith zeigt auf einen toten Endpoint,
+die Runs werden gezählt statt hochgeladen - gemessen wird nur der Hot Path.
+
+    python bench_tracing.py --turns 30
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+backend_path = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+
+MODES = {
+    "tracing off": {"LANGSMITH_TRACING": "false", "LANGSMITH_SAMPLE_RATE": "1.0"},
+    "tracing on, unsampled": {"LANGSMITH_TRACING": "true", "LANGSMITH_SAMPLE_RATE": "0.0"},
+    "tracing on, sampled": {"LANGSMITH_TRACING": "true", "LANGSMITH_SAMPLE_RATE": "1.0"},
+}
+
+
+async def _run_turns(turns: int) -> None:
+    from backend.app.graph import get_session_manager
+
+    session_manager = await get_session_manager()
+    inputs = ["Hi", "B", "Keine Romance"]
+    session_id = session_manager.create_session()
+    for turn in range(turns):
+        if turn and turn % 12 == 0:
+            session_id = session_manager.create_session()
+        message = inputs[turn % 12] if turn % 12 < len(inputs) else "A"
+        async for _ in session_manager.stream_process_message(session_id, message):
+            pass
+
+
+def bench_mode(name: str, turns: int) -> dict:
+    from backend.app.logging_config import configure_logging
+    from backend.app.services import tracing
+    from backend.app.testing import FakeLLMConfig, install_fake_agents
+
+    configure_logging("CRITICAL")
+    logging.getLogger("langsmith").setLevel(logging.CRITICAL)
+    install_fake_agents(FakeLLMConfig(response_words=120, setup_complete_turns=[3]))
+
+    # Runs zählen statt hochladen
+    from langsmith import Client
+
+    runs = {"created": 0}
+
+    class CountingClient(Client):
+        def create_run(self, *args, **kwargs):
+            runs["created"] += 1
+
+        def update_run(self, *args, **kwargs):
+            pass
+
+    tracing._langsmith_client = CountingClient(auto_batch_tracing=False)
+
+    asyncio.run(_run_turns(1))
+    runs["created"] = 0
+
+    cpu_start = time.thread_time()
+    wall_start = time.perf_counter()
+    asyncio.run(_run_turns(turns))
+    cpu = time.thread_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    return {
+        "mode": name,
+        "cpu_ms_per_turn": cpu * 1000 / turns,
+        "wall_ms_per_turn": wall * 1000 / turns,
+        "runs_per_turn": runs["created"] / turns,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TextRPG Tracing Benchmark")
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--mode", choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        sys.__stdout__.write(json.dumps(bench_mode(args.mode, args.turns)) + "\n")
+        return
+
+    print(f"🧪 Tracing Benchmark: {args.turns} Turns pro Modus\n")
+    results = []
+    for name, env in MODES.items():
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", name, "--turns", str(args.turns)],
+            env={
+                **os.environ,
+                "OPENROUTER_API_KEY": os.environ.get("OPENROUTER_API_KEY", "offline-test-key"),
+                "LANGSMITH_API_KEY": "offline-bench-key",
+                "LANGSMITH_ENDPOINT": "http://127.0.0.1:9",
+                **env,
+            },
+            capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    baseline = results[0]["cpu_ms_per_turn"]
+
+    print(f"{'Modus':<26}{'CPU/Turn':>11}{'Overhead':>11}{'Runs/Turn':>11}")
+    for result in results:
+        print(f"{result['mode']:<26}"
+              f"{result['cpu_ms_per_turn']:>9.2f}ms"
+              f"{result['cpu_ms_per_turn'] - baseline:>9.2f}ms"
+              f"{result['runs_per_turn']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
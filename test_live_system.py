@@ -119,24 +119,15 @@ async def test_gameplay_agent(setup_messages, setup_state):
             user_msg = create_human_message(user_input)
             messages.append(user_msg)
             
-            # Call agent
-            response_text, command = agent.process_message(messages, state)
+            # Call agent (Pipeline entfernt Marker und Zustands-Block)
+            response_text = await agent.aprocess_message(messages, state)
             
             print(f"🎮 Gameplay Agent: {response_text}")
-            print(f"⚡ Command: {command}")
             
             # Add AI response
             ai_msg = create_ai_message(response_text)
             messages.append(ai_msg)
             
-            # Check für neue Kapitel oder Session Ende
-            if command:
-                if command.get("goto") == "new_chapter":
-                    print("📖 Neues Kapitel detected!")
-                elif command.get("goto") == "end":
-                    print("🔚 Session Ende detected!")
-                    break
-            
             print()
         
         print("✅ Gameplay Agent test completed!")
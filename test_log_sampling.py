@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+TextRPG Log Sampling Test
+Sampling, Token-Bucket Rate Limits und Suppressed-Summaries pro event_type,
+JSON Rendering und der bounded Background-Writer
+"""
+
+import io
+import json
+import logging
+import random
+import sys
+import threading
+from pathlib import Path
+
+# Add backend to path
+backend_path = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+import structlog
+
+from backend.app.logging_config import (
+    AsyncLogWriter,
+    LogSampler,
+    QueueLogger,
+    configure_logging,
+    get_log_sampler,
+    get_log_writer,
+    shutdown_logging
+)
+
+
+def _emit(sampler, event_type, count, method="info"):
+    """Schickt count Events durch den Sampler und zählt die durchgelassenen"""
+    passed = 0
+    for _ in range(count):
+        try:
+            sampler(None, method, {"event": "x", "event_type": event_type})
+            passed += 1
+        except structlog.DropEvent:
+            pass
+    return passed
+
+
+def test_sampling_and_rate_limit():
+    """sample_rate und rate_limit greifen pro event_type, Warnings/Errors und unbekannte Typen passieren"""
+    print("🧪 LOG SAMPLING TEST")
+
+    sampler = LogSampler({
+        "sampled": {"sample_rate": 0.1},
+        "limited": {"rate_limit": {"per_second": 0.001, "burst": 5}},
+    }, summary_interval=3600, rng=random.Random(1))
+
+    sampled = _emit(sampler, "sampled", 1000)
+    assert 50 < sampled < 150
+    assert _emit(sampler, "limited", 100) == 5
+    assert _emit(sampler, "limited", 10, method="error") == 10
+    assert _emit(sampler, "sampled", 10, method="warning") == 10
+    assert _emit(sampler, "unknown", 10) == 10
+
+    suppressed = sampler._suppressed
+    assert suppressed["sampled"]["sampled_out"] == 1000 - sampled
+    assert suppressed["limited"]["rate_limited"] == 95
+    print(f"✅ Sampling: {sampled}/1000 durchgelassen, Rate Limit: 5/100")
+
+
+def test_suppressed_summary_is_logged():
+    """Unterdrückte Events erscheinen als log_suppression Summary im Output"""
+    stream = io.StringIO()
+    configure_logging(
+        "DEBUG",
+        log_format="json",
+        stream=stream,
+        sampling=True,
+        sampling_overrides={"session_lookup": {"rate_limit": {"per_second": 0.001, "burst": 2}}}
+    )
+    logger = structlog.get_logger("test.sampling")
+
+    for _ in range(10):
+        logger.debug("Session retrieved", session_id="s1", event_type="session_lookup")
+    get_log_sampler().emit_summary()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    lookups = [line for line in lines if line["event"] == "Session retrieved"]
+    summary = next(line for line in lines if line.get("event_type") == "log_suppression")
+
+    assert len(lookups) == 2
+    assert summary["suppressed"]["session_lookup"]["rate_limited"] == 8
+    shutdown_logging()
+    print("✅ Suppressed-Summary geloggt")
+
+
+def test_summary_is_emitted_without_further_events():
+    """Die Summary kommt vom Timer-Thread, auch wenn danach nichts mehr geloggt wird"""
+    import time
+
+    stream = io.StringIO()
+    configure_logging(
+        "DEBUG",
+        log_format="json",
+        stream=stream,
+        sampling=True,
+        summary_interval=0.05,
+        sampling_overrides={"session_lookup": {"rate_limit": {"per_second": 0.001, "burst": 1}}}
+    )
+    logger = structlog.get_logger("test.sampling")
+    for _ in range(5):
+        logger.debug("Session retrieved", session_id="s1", event_type="session_lookup")
+    logger.warning("Session not found", session_id="s2", event_type="session_lookup")
+
+    deadline = time.monotonic() + 2.0
+    while "log_suppression" not in stream.getvalue() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    shutdown_logging()
+
+    summary = next(line for line in lines if line.get("event_type") == "log_suppression")
+    assert summary["suppressed"]["session_lookup"]["rate_limited"] == 4
+    assert any(line["event"] == "Session not found" for line in lines)
+    print("✅ Summary vom Timer-Thread geloggt")
+
+
+def test_json_rendering_for_structlog_and_stdlib():
+    """JSON-Modus: structlog und stdlib Logs landen als eine JSON-Zeile pro Event über den Writer"""
+    stream = io.StringIO()
+    configure_logging("INFO", log_format="json", async_writer=True, stream=stream)
+    assert get_log_writer() is not None
+
+    structlog.get_logger("test.json").info("Turn finished", session_id="s1", chunks=3, event_type="message_flow")
+    structlog.get_logger("test.json").debug("Below level")
+    logging.getLogger("test.stdlib").warning("Agent fallback %s", "setup")
+    shutdown_logging()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["event"] for line in lines] == ["Turn finished", "Agent fallback setup"]
+    assert lines[0]["level"] == "info" and lines[0]["chunks"] == 3 and lines[0]["session_id"] == "s1"
+    assert lines[1]["level"] == "warning" and lines[1]["logger"] == "test.stdlib"
+    assert all("timestamp" in line for line in lines)
+    print("✅ JSON Rendering für structlog und stdlib")
+
+
+def test_bounded_writer_drops_instead_of_blocking():
+    """Volle Queue: write() verwirft und zählt, statt den Aufrufer zu blockieren"""
+
+    class BlockingStream(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.release = threading.Event()
+
+        def write(self, text):
+            self.release.wait(timeout=5)
+            return super().write(text)
+
+    stream = BlockingStream()
+    writer = AsyncLogWriter(stream, max_queue_size=4, batch_size=1)
+    logger = QueueLogger(writer)
+    for index in range(50):
+        logger.info(f"line {index}")
+
+    # Writer-Thread hängt im ersten write(), die Queue hält max. 4 weitere Zeilen
+    assert writer.dropped >= 50 - 1 - 4
+    stream.release.set()
+    writer.close()
+    written = stream.getvalue().splitlines()
+    assert written[0] == "line 0" and len(written) == 50 - writer.dropped
+    print(f"✅ Bounded Writer: {writer.dropped}/50 verworfen")
+
+
+if __name__ == "__main__":
+    test_sampling_and_rate_limit()
+    test_suppressed_summary_is_logged()
+    test_summary_is_emitted_without_further_events()
+    test_json_rendering_for_structlog_and_stdlib()
+    test_bounded_writer_drops_instead_of_blocking()
+    print("\n🎉 LOG SAMPLING TESTS BESTANDEN!")